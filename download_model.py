@@ -1,11 +1,43 @@
 # download_model.py
+import argparse
 import os
 
 from sentence_transformers import SentenceTransformer
 
+MODEL_DIR = "./models/all-MiniLM-L6-v2"
+
+parser = argparse.ArgumentParser(description="Baixa o modelo de embeddings para ./models")
+parser.add_argument(
+    "--onnx",
+    action="store_true",
+    help="Exporta também os arquivos ONNX (EMBEDDER_BACKEND=onnx e onnx-int8)",
+)
+parser.add_argument(
+    "--quantization",
+    default="avx2",
+    choices=["avx2", "avx512", "avx512_vnni", "arm64"],
+    help="Conjunto de instruções da quantização int8 (padrão: avx2)",
+)
+args = parser.parse_args()
+
 os.makedirs("./models", exist_ok=True)
 
 print("⬇️ Baixando modelo all-MiniLM-L6-v2...")
 model = SentenceTransformer("all-MiniLM-L6-v2")
-model.save("./models/all-MiniLM-L6-v2")
-print("✅ Modelo salvo em ./models/all-MiniLM-L6-v2")
+model.save(MODEL_DIR)
+print(f"✅ Modelo salvo em {MODEL_DIR}")
+
+if args.onnx:
+    from brew_oracle.benchmarks.embedder import compare_backends, failing, format_report, load_texts
+    from brew_oracle.benchmarks.retrieval import DEFAULT_QUERIES
+    from brew_oracle.utils.config import Settings
+    from brew_oracle.utils.models import export_onnx
+
+    print(f"⚙️ Exportando ONNX (int8 {args.quantization})...")
+    for backend, path in export_onnx(MODEL_DIR, args.quantization).items():
+        print(f"✅ {backend}: {path}")
+
+    reports = compare_backends(MODEL_DIR, ["onnx", "onnx-int8"], load_texts(DEFAULT_QUERIES))
+    print(format_report(reports))
+    if failing(reports, Settings().EMBEDDER_MIN_COSINE):
+        raise SystemExit("❌ Os vetores ONNX divergem do PyTorch; mantenha EMBEDDER_BACKEND=torch.")
@@ -0,0 +1,284 @@
+"""Collection profile benchmark: latency, recall and memory of each tuning profile.
+
+Copies the dense vectors and payloads of an existing collection into one
+scratch collection per profile of :data:`PROFILES`, waits for indexing, and
+replays sampled stored vectors as queries. Recall@k is measured against an
+exact (brute-force) cosine search done with NumPy, so it shows what HNSW and
+quantization give away; RAM is estimated from the profile and the corpus size.
+
+HNSW and quantization only exist on a Qdrant server: the embedded
+``:memory:`` mode always searches exhaustively, so run this against
+``QDRANT_URL``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import time
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import numpy as np
+from qdrant_client.http import models
+
+from brew_oracle.benchmarks.retrieval import percentile
+from brew_oracle.knowledge.retrieval import search_params_from_settings
+from brew_oracle.scripts.create_collections import PROFILES, CollectionProfile, collection_config
+from brew_oracle.utils.config import Settings
+from brew_oracle.utils.qdrant import get_qdrant_client, is_embedded, wait_until_indexed
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProfileReport:
+    """Aggregated results of one collection profile."""
+
+    profile: str
+    points: int
+    build_seconds: float
+    p50_ms: float
+    p95_ms: float
+    qps: float
+    recall_at_k: float
+    ram_mb: float
+    k: int
+
+
+def estimate_ram_bytes(profile: CollectionProfile, points: int, dim: int) -> int:
+    """Rough resident size of the vectors and HNSW graph of a collection.
+
+    Counts the float32 originals unless they are on disk, the quantized copy
+    (1 byte per dimension for scalar, 1 bit for binary) and about ``2 * m``
+    4-byte links per point on the base layer of the graph unless it is on disk.
+    Payload storage is not included.
+    """
+    total = 0
+    if not profile.vectors_on_disk:
+        total += points * dim * 4
+    if profile.quantization == "scalar":
+        total += points * dim
+    elif profile.quantization == "binary":
+        total += points * ((dim + 7) // 8)
+    if not profile.hnsw_on_disk:
+        total += points * profile.hnsw_m * 2 * 4
+    return total
+
+
+def load_points(
+    client: Any, collection: str, vector_name: str | None, max_points: int | None = None
+) -> tuple[list[Any], np.ndarray, list[dict]]:
+    """Scroll ``collection`` and return its ids, dense vectors and payloads."""
+    ids: list[Any] = []
+    vectors: list[list[float]] = []
+    payloads: list[dict] = []
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection,
+            limit=256,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        for record in records:
+            vector = record.vector
+            if isinstance(vector, dict):
+                vector = vector.get(vector_name) if vector_name else None
+            if vector is None:
+                continue
+            ids.append(record.id)
+            vectors.append(vector)
+            payloads.append(record.payload or {})
+        if offset is None or (max_points is not None and len(ids) >= max_points):
+            break
+    if max_points is not None:
+        ids, vectors, payloads = ids[:max_points], vectors[:max_points], payloads[:max_points]
+    return ids, np.asarray(vectors, dtype=np.float32), payloads
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` nearest ``vectors`` of each query by cosine similarity."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    normalized = vectors / np.maximum(norms, 1e-12)
+    query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = (queries / np.maximum(query_norms, 1e-12)) @ normalized.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def build_collection(
+    client: Any,
+    name: str,
+    s: Settings,
+    profile: str,
+    ids: list[Any],
+    vectors: np.ndarray,
+    payloads: list[dict],
+    *,
+    batch_size: int = 256,
+    timeout: float = 600.0,
+) -> float:
+    """Create ``name`` with ``profile``, load the points and wait for indexing.
+
+    Returns
+    -------
+    float
+        Seconds from creation until the collection reports ``green``.
+    """
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    start = time.perf_counter()
+    client.create_collection(collection_name=name, **collection_config(s, profile=profile))
+    client.upload_collection(
+        collection_name=name,
+        vectors=vectors,
+        payload=payloads,
+        ids=ids,
+        batch_size=batch_size,
+        wait=True,
+    )
+    wait_until_indexed(client, name, timeout)
+    return time.perf_counter() - start
+
+
+def run_profile(
+    client: Any,
+    name: str,
+    profile: str,
+    queries: np.ndarray,
+    expected: list[set],
+    *,
+    k: int,
+    search_params: models.SearchParams | None = None,
+    build_seconds: float = 0.0,
+    points: int = 0,
+    dim: int = 0,
+) -> ProfileReport:
+    """Time the ``queries`` against collection ``name`` and score them against ``expected``."""
+    if len(queries):
+        client.query_points(name, query=queries[0].tolist(), limit=k, search_params=search_params)
+
+    latencies: list[float] = []
+    recalls: list[float] = []
+    for query, relevant in zip(queries, expected, strict=True):
+        start = time.perf_counter()
+        response = client.query_points(
+            name, query=query.tolist(), limit=k, search_params=search_params
+        )
+        latencies.append(time.perf_counter() - start)
+        found = {point.id for point in response.points}
+        recalls.append(len(found & relevant) / len(relevant) if relevant else 0.0)
+
+    n = len(latencies)
+    total = sum(latencies)
+    return ProfileReport(
+        profile=profile,
+        points=points,
+        build_seconds=build_seconds,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p95_ms=percentile(latencies, 95) * 1000,
+        qps=n / total if total > 0 else 0.0,
+        recall_at_k=sum(recalls) / n if n else 0.0,
+        ram_mb=estimate_ram_bytes(PROFILES[profile], points, dim) / 1024**2,
+        k=k,
+    )
+
+
+def format_report(reports: list[ProfileReport]) -> str:
+    """Render the reports as a fixed-width table."""
+    k = reports[0].k if reports else 10
+    header = (
+        f"{'perfil':<13}{'pontos':>9}{'build s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'QPS':>8}{f'recall@{k}':>11}{'RAM MB':>9}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in reports:
+        lines.append(
+            f"{r.profile:<13}{r.points:>9}{r.build_seconds:>9.1f}{r.p50_ms:>9.2f}{r.p95_ms:>9.2f}"
+            f"{r.qps:>8.1f}{r.recall_at_k:>11.3f}{r.ram_mb:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark dos perfis de coleção do Qdrant")
+    parser.add_argument(
+        "--source", help="Coleção de onde copiar os vetores (padrão: QDRANT_COLLECTION)"
+    )
+    parser.add_argument(
+        "--profiles",
+        default=",".join(PROFILES),
+        help=f"Perfis separados por vírgula (padrão: {','.join(PROFILES)})",
+    )
+    parser.add_argument("--queries", type=int, default=100, help="Consultas amostradas")
+    parser.add_argument("--k", type=int, default=10, help="Corte do recall@k (padrão: 10)")
+    parser.add_argument("--max-points", type=int, help="Limita os pontos copiados")
+    parser.add_argument("--ef", type=int, help="hnsw_ef na busca (padrão: SEARCH_HNSW_EF)")
+    parser.add_argument(
+        "--oversampling", type=float, help="Oversampling na busca (padrão: SEARCH_OVERSAMPLING)"
+    )
+    parser.add_argument("--keep", action="store_true", help="Mantém as coleções de teste")
+    parser.add_argument("--output", help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+
+    s = Settings()
+    if args.ef is not None:
+        s.SEARCH_HNSW_EF = args.ef
+    if args.oversampling is not None:
+        s.SEARCH_OVERSAMPLING = args.oversampling
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    unknown = [p for p in profiles if p not in PROFILES]
+    if unknown:
+        parser.error(f"perfis desconhecidos: {', '.join(unknown)}")
+
+    if is_embedded(s):
+        logger.warning(
+            "VECTOR_BACKEND=%s busca sempre de forma exaustiva: os perfis só diferem num servidor.",
+            s.VECTOR_BACKEND,
+        )
+    client = get_qdrant_client(s)
+    source = args.source or s.QDRANT_COLLECTION
+    ids, vectors, payloads = load_points(client, source, s.DENSE_VECTOR_NAME, args.max_points)
+    if not ids:
+        parser.error(f"a coleção '{source}' não tem vetores densos")
+    sample = random.Random(0).sample(range(len(ids)), min(args.queries, len(ids)))
+    queries = vectors[sample]
+    expected = [{ids[i] for i in row} for row in exact_neighbours(vectors, queries, args.k)]
+    search_params = search_params_from_settings(s)
+
+    reports = []
+    for profile in profiles:
+        name = f"{source}__bench_{profile.replace('-', '_')}"
+        try:
+            build_seconds = build_collection(client, name, s, profile, ids, vectors, payloads)
+            reports.append(
+                run_profile(
+                    client,
+                    name,
+                    profile,
+                    queries,
+                    expected,
+                    k=args.k,
+                    search_params=search_params,
+                    build_seconds=build_seconds,
+                    points=len(ids),
+                    dim=vectors.shape[1],
+                )
+            )
+        except Exception as e:
+            logger.error("Perfil '%s' falhou: %s", profile, e)
+        finally:
+            if not args.keep and client.collection_exists(name):
+                client.delete_collection(name)
+
+    print(format_report(reports))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([asdict(r) for r in reports], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Embedder backend benchmark: agreement with PyTorch and throughput.
+
+The ONNX backends of ``EMBEDDER_BACKEND`` trade a little precision for CPU
+speed. This encodes a sample of texts with the PyTorch model and with each
+backend, and reports the cosine similarity between the two vectors of every
+text and the encoding throughput in sentences/s.
+
+The run exits with status 1 when the lowest cosine of a backend is under
+``--min-cosine`` (default ``EMBEDDER_MIN_COSINE``): vectors that drift from
+the ones already stored in Qdrant degrade retrieval, so a backend should only
+be switched on (or re-exported) after it passes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from brew_oracle.benchmarks.retrieval import DEFAULT_QUERIES
+from brew_oracle.utils.config import Settings
+from brew_oracle.utils.models import EMBEDDER_BACKENDS, get_sentence_transformer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BackendReport:
+    """Agreement with the PyTorch vectors and speed of one backend."""
+
+    backend: str
+    sentences: int
+    sentences_per_second: float
+    speedup: float
+    min_cosine: float
+    mean_cosine: float
+
+
+def load_texts(path: str | Path) -> list[str]:
+    """Read the sample: the ``question`` of each line of a JSONL file, or one text per line."""
+    texts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            texts.append(json.loads(line)["question"] if str(path).endswith(".jsonl") else line)
+    return texts
+
+
+def cosine_agreement(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """Cosine similarity between the rows of ``reference`` and ``candidate``."""
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    dot = np.einsum("ij,ij->i", reference, candidate)
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    return dot / np.maximum(norms, 1e-12)
+
+
+def throughput(model: Any, texts: list[str], batch_size: int = 32, repeats: int = 3) -> float:
+    """Sentences encoded per second by ``model``, after one untimed warm-up pass."""
+    model.encode(texts[:batch_size], batch_size=batch_size)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.encode(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return len(texts) * repeats / elapsed if elapsed > 0 else float("inf")
+
+
+def compare_backends(
+    model_id: str,
+    backends: list[str],
+    texts: list[str],
+    *,
+    batch_size: int = 32,
+    repeats: int = 3,
+    load: Callable[[str, str], Any] = get_sentence_transformer,
+) -> list[BackendReport]:
+    """Compare each backend with the PyTorch model on ``texts``.
+
+    Returns
+    -------
+    list[BackendReport]
+        The PyTorch reference first (cosine ``1.0``, speedup ``1.0``), then
+        one report per other backend.
+    """
+    torch_model = load(model_id, "torch")
+    reference = torch_model.encode(texts, batch_size=batch_size)
+    torch_speed = throughput(torch_model, texts, batch_size, repeats)
+    reports = [BackendReport("torch", len(texts), torch_speed, 1.0, 1.0, 1.0)]
+    for backend in backends:
+        if backend == "torch":
+            continue
+        model = load(model_id, backend)
+        cosines = cosine_agreement(reference, model.encode(texts, batch_size=batch_size))
+        speed = throughput(model, texts, batch_size, repeats)
+        reports.append(
+            BackendReport(
+                backend=backend,
+                sentences=len(texts),
+                sentences_per_second=speed,
+                speedup=speed / torch_speed,
+                min_cosine=float(cosines.min()),
+                mean_cosine=float(cosines.mean()),
+            )
+        )
+    return reports
+
+
+def failing(reports: list[BackendReport], min_cosine: float) -> list[BackendReport]:
+    """Reports whose lowest cosine is under ``min_cosine``, each logged as an error."""
+    bad = [r for r in reports if r.min_cosine < min_cosine]
+    for r in bad:
+        logger.error(
+            "Backend '%s' diverge do PyTorch: cosseno mínimo %.4f < %.4f.",
+            r.backend,
+            r.min_cosine,
+            min_cosine,
+        )
+    return bad
+
+
+def format_report(reports: list[BackendReport]) -> str:
+    """Render the reports as a fixed-width table."""
+    header = f"{'backend':<12}{'frases/s':>10}{'speedup':>9}{'cos mín':>9}{'cos médio':>11}"
+    lines = [header, "-" * len(header)]
+    for r in reports:
+        lines.append(
+            f"{r.backend:<12}{r.sentences_per_second:>10.1f}{r.speedup:>8.2f}x"
+            f"{r.min_cosine:>9.4f}{r.mean_cosine:>11.4f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compara os backends do embedder com o PyTorch (concordância e vazão)"
+    )
+    parser.add_argument("--model", help="Modelo de embeddings (padrão: EMBEDDER_ID)")
+    parser.add_argument(
+        "--backends",
+        default="onnx,onnx-int8",
+        help="Backends separados por vírgula (padrão: onnx,onnx-int8)",
+    )
+    parser.add_argument(
+        "--texts",
+        default=str(DEFAULT_QUERIES),
+        help="Amostra: JSONL com 'question' ou um texto por linha (padrão: perguntas do benchmark)",
+    )
+    parser.add_argument(
+        "--min-cosine", type=float, help="Cosseno mínimo aceito (padrão: EMBEDDER_MIN_COSINE)"
+    )
+    parser.add_argument("--batch-size", type=int, default=32, help="Lote do encode (padrão: 32)")
+    parser.add_argument("--repeats", type=int, default=3, help="Repetições cronometradas")
+    parser.add_argument("--output", help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+
+    s = Settings()
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = [b for b in backends if b not in EMBEDDER_BACKENDS]
+    if unknown:
+        parser.error(f"backends desconhecidos: {', '.join(unknown)}")
+    min_cosine = args.min_cosine if args.min_cosine is not None else s.EMBEDDER_MIN_COSINE
+
+    reports = compare_backends(
+        args.model or s.EMBEDDER_ID,
+        backends,
+        load_texts(args.texts),
+        batch_size=args.batch_size,
+        repeats=args.repeats,
+    )
+    print(format_report(reports))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([asdict(r) for r in reports], f, ensure_ascii=False, indent=2)
+    if failing(reports, min_cosine):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,359 @@
+"""Offline retrieval benchmark: latency and quality of each retrieval mode.
+
+Replays a JSONL query set through the orchestrator's retrieval path
+(``BrewingOrchestrator.search``, what the agent's retriever returns) with a
+stubbed LLM and reports, per mode, p50/p95/p99 latency, queries per second,
+recall@k and MRR.
+
+Each line of the query set is an object with a ``question`` and the expected
+sources: ``pages`` maps a PDF document name (file name without extension, as
+stored by agno) to page numbers, and ``recipes`` lists recipe names.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import time
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from agno.models.base import Model
+from agno.models.response import ModelResponse
+
+from brew_oracle.knowledge.beerxml_kb import iter_recipe_documents
+from brew_oracle.knowledge.ingest import upsert_documents
+from brew_oracle.knowledge.pdf_kb import PDFIngestionPipeline
+from brew_oracle.utils.config import Settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERIES = Path(__file__).with_name("queries.jsonl")
+
+# mode name -> (hybrid, rerank)
+MODES: dict[str, tuple[bool, bool]] = {
+    "dense": (False, False),
+    "hybrid": (True, False),
+    "rerank": (False, True),
+    "hybrid+rerank": (True, True),
+}
+
+
+@dataclass
+class StubModel(Model):
+    """Offline stand-in for the LLM: answers every prompt with a fixed text."""
+
+    id: str = "stub"
+    name: str = "StubModel"
+    provider: str = "stub"
+    answer: str = "Resposta simulada."
+
+    def invoke(self, *args, **kwargs) -> Any:
+        return self.answer
+
+    async def ainvoke(self, *args, **kwargs) -> Any:
+        return self.answer
+
+    def invoke_stream(self, *args, **kwargs) -> Iterator[Any]:
+        yield self.answer
+
+    # Unannotated like agno's providers: the base declares a coroutine, but
+    # ``Model`` iterates the result with ``async for``.
+    async def ainvoke_stream(self, *args, **kwargs):
+        yield self.answer
+
+    def parse_provider_response(self, response: Any, **kwargs) -> ModelResponse:
+        return ModelResponse(role="assistant", content=response)
+
+    def parse_provider_response_delta(self, response: Any) -> ModelResponse:
+        return ModelResponse(role="assistant", content=response)
+
+
+@dataclass
+class BenchQuery:
+    """A question and the sources a good retrieval should return."""
+
+    question: str
+    pages: dict[str, list[int]] = field(default_factory=dict)
+    recipes: list[str] = field(default_factory=list)
+
+    @property
+    def relevant(self) -> set[tuple]:
+        """Source keys (see :func:`doc_key`) of the expected documents."""
+        keys: set[tuple] = {("recipe", name) for name in self.recipes}
+        for name, pages in self.pages.items():
+            keys.update(("page", name, page) for page in pages)
+        return keys
+
+
+@dataclass
+class ModeReport:
+    """Aggregated results of one retrieval mode."""
+
+    mode: str
+    queries: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    qps: float
+    recall_at_k: float
+    mrr: float
+    k: int
+
+
+def load_queries(path: str | Path) -> list[BenchQuery]:
+    """Read a JSONL query set, skipping blank lines."""
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                queries.append(BenchQuery(**json.loads(line)))
+    return queries
+
+
+def doc_key(doc: Any) -> tuple | None:
+    """Return the source of a retrieved document: a PDF page or a recipe."""
+    meta = getattr(doc, "meta_data", None) or {}
+    if "page" in meta:
+        return ("page", getattr(doc, "name", None), meta["page"])
+    if "name" in meta:
+        return ("recipe", meta["name"])
+    return None
+
+
+def ranked_sources(docs: list[Any]) -> list[tuple]:
+    """Return the distinct sources of ``docs`` in rank order."""
+    sources: list[tuple] = []
+    for doc in docs:
+        key = doc_key(doc)
+        if key is not None and key not in sources:
+            sources.append(key)
+    return sources
+
+
+def recall_at_k(sources: list[tuple], relevant: set[tuple], k: int) -> float:
+    """Fraction of the relevant sources found among the first ``k`` sources."""
+    if not relevant:
+        return 0.0
+    return len(relevant.intersection(sources[:k])) / len(relevant)
+
+
+def reciprocal_rank(sources: list[tuple], relevant: set[tuple]) -> float:
+    """``1 / rank`` of the first relevant source, ``0`` if none was retrieved."""
+    for rank, source in enumerate(sources, 1):
+        if source in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Linearly interpolated percentile (``pct`` in ``[0, 100]``) of ``values``."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _clear_caches(orchestrator: Any) -> None:
+    """Drop cached embeddings, searches and rerank scores so every query runs cold."""
+    orchestrator.embedding_cache.clear()
+    orchestrator.search_cache.clear()
+    if orchestrator.reranker is not None:
+        orchestrator.reranker.cache.clear()
+
+
+def run_mode(
+    mode: str,
+    orchestrator: Any,
+    queries: list[BenchQuery],
+    *,
+    k: int = 5,
+    limit: int = 5,
+    repeat: int = 1,
+) -> ModeReport:
+    """Replay ``queries`` through ``orchestrator.search``.
+
+    One untimed warm-up query loads the models; caches are cleared before each
+    timed query.
+
+    Parameters
+    ----------
+    mode : str
+        Label of the mode in the report.
+    orchestrator : BrewingOrchestrator
+        Orchestrator configured for the mode.
+    queries : list[BenchQuery]
+        Query set.
+    k : int, optional
+        Cut-off of recall@k, by default ``5``.
+    limit : int, optional
+        Number of documents requested from each knowledge base, by default ``5``.
+    repeat : int, optional
+        Number of passes over the query set, by default ``1``.
+
+    Returns
+    -------
+    ModeReport
+        Latency percentiles, throughput, mean recall@k and MRR.
+    """
+    search = orchestrator.search
+    if queries:
+        search(queries[0].question, limit)
+
+    latencies: list[float] = []
+    recalls: list[float] = []
+    reciprocal_ranks: list[float] = []
+    total = 0.0
+    for _ in range(repeat):
+        for query in queries:
+            _clear_caches(orchestrator)
+            start = time.perf_counter()
+            docs = search(query.question, limit)
+            elapsed = time.perf_counter() - start
+            total += elapsed
+            latencies.append(elapsed)
+            sources = ranked_sources(docs)
+            recalls.append(recall_at_k(sources, query.relevant, k))
+            reciprocal_ranks.append(reciprocal_rank(sources, query.relevant))
+
+    n = len(latencies)
+    return ModeReport(
+        mode=mode,
+        queries=n,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p95_ms=percentile(latencies, 95) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        qps=n / total if total > 0 else 0.0,
+        recall_at_k=sum(recalls) / n if n else 0.0,
+        mrr=sum(reciprocal_ranks) / n if n else 0.0,
+        k=k,
+    )
+
+
+def load_in_memory(orchestrator: Any, client: Any, s: Settings) -> None:
+    """Point the orchestrator at ``client`` and ingest the local PDFs and recipes.
+
+    Collections that already hold points in ``client`` are reused, so modes
+    sharing a search type ingest only once.
+    """
+    pdf_db = orchestrator.pdf_kb.vector_db
+    recipe_db = orchestrator.recipe_kb
+    for db in (pdf_db, recipe_db):
+        db._client = client
+        if not db.exists():
+            db.create()
+
+    if pdf_db.get_count() == 0:
+        pdfs = sorted(Path(s.PDF_PATH).glob("**/*.pdf"))
+        PDFIngestionPipeline(
+            orchestrator.pdf_kb.reader, pdf_db, batch_size=s.INGEST_BATCH_SIZE
+        ).run(pdfs)
+    if recipe_db.get_count() == 0:
+        recipe_dir = Path(s.BEERXML_PATH)
+        filenames = sorted(p.name for p in recipe_dir.glob("*.xml"))
+        documents = (
+            doc for _, docs in iter_recipe_documents(filenames, str(recipe_dir)) for doc in docs
+        )
+        upsert_documents(recipe_db, documents, s.INGEST_BATCH_SIZE)
+
+
+def format_report(reports: list[ModeReport]) -> str:
+    """Render the reports as a fixed-width table."""
+    k = reports[0].k if reports else 5
+    header = (
+        f"{'modo':<15}{'consultas':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'QPS':>8}{f'recall@{k}':>11}{'MRR':>7}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in reports:
+        lines.append(
+            f"{r.mode:<15}{r.queries:>10}{r.p50_ms:>10.1f}{r.p95_ms:>10.1f}{r.p99_ms:>10.1f}"
+            f"{r.qps:>8.1f}{r.recall_at_k:>11.3f}{r.mrr:>7.3f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de recuperação (latência e qualidade)")
+    parser.add_argument(
+        "--queries",
+        default=str(DEFAULT_QUERIES),
+        help="Arquivo JSONL com perguntas e fontes esperadas",
+    )
+    parser.add_argument(
+        "--modes",
+        default=",".join(MODES),
+        help=f"Modos separados por vírgula (padrão: {','.join(MODES)})",
+    )
+    parser.add_argument("--k", type=int, default=5, help="Corte do recall@k (padrão: 5)")
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Documentos pedidos a cada base (padrão: NUM_DOCUMENTS)",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Passadas pelo conjunto de perguntas")
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Usa a busca paralela nas coleções",
+    )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help=(
+            "Usa um Qdrant em memória, ingerindo os PDFs e receitas locais "
+            "(implícito com VECTOR_BACKEND=memory)"
+        ),
+    )
+    parser.add_argument("--output", help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args()
+
+    from brew_oracle.orchestrator.brewing_orchestrator import BrewingOrchestrator
+
+    s = Settings()
+    queries = load_queries(args.queries)
+    limit = args.limit or s.NUM_DOCUMENTS
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"modos desconhecidos: {', '.join(unknown)}")
+
+    in_memory = args.in_memory or s.VECTOR_BACKEND == "memory"
+    clients: dict[bool, Any] = {}
+    reports = []
+    for mode in modes:
+        hybrid, rerank = MODES[mode]
+        orchestrator = BrewingOrchestrator(
+            model=StubModel(), rerank=rerank, hybrid=hybrid, parallel=args.parallel
+        )
+        try:
+            if in_memory:
+                if hybrid not in clients:
+                    from qdrant_client import QdrantClient
+
+                    clients[hybrid] = QdrantClient(location=":memory:")
+                load_in_memory(orchestrator, clients[hybrid], s)
+            reports.append(
+                run_mode(mode, orchestrator, queries, k=args.k, limit=limit, repeat=args.repeat)
+            )
+        except Exception as e:
+            logger.error("Modo '%s' falhou: %s", mode, e)
+        finally:
+            if orchestrator.retriever is not None:
+                orchestrator.retriever.close()
+
+    print(format_report(reports))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([asdict(r) for r in reports], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
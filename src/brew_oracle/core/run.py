@@ -1,24 +1,147 @@
 import argparse
 
-from brew_oracle.orchestrator.brewing_orchestrator import BrewingOrchestrator
+from brew_oracle.utils.startup import BackgroundLoader, StartupProfile
 
+# Imported (and timed) by the warm-up thread instead of at module load, so
+# ``--help`` and the prompt do not wait for agno, qdrant-client and torch.
+HEAVY_IMPORTS = (
+    "qdrant_client",
+    "agno.agent",
+    "agno.models.google",
+    "sentence_transformers",
+    "brew_oracle.orchestrator.brewing_orchestrator",
+)
 
-def main():
-    parser = argparse.ArgumentParser()
+
+def build_orchestrator(args: argparse.Namespace, profile: StartupProfile):
+    """Import the heavy dependencies and build the orchestrator (loads the models)."""
+    modules = {name: profile.import_module(name) for name in HEAVY_IMPORTS}
+    orchestrator_cls = modules["brew_oracle.orchestrator.brewing_orchestrator"].BrewingOrchestrator
+    with profile.step("BrewingOrchestrator()"):
+        return orchestrator_cls(
+            rerank=args.rerank,
+            hybrid=args.hybrid,
+            parallel=args.parallel,
+            answer_cache=args.answer_cache,
+        )
+
+
+def add_retrieval_args(parser: argparse.ArgumentParser, default=False) -> None:
+    """Add the retrieval flags shared by the REPL and ``serve``."""
     parser.add_argument(
         "--rerank",
         action="store_true",
+        default=default,
         help="Reordena os resultados da busca com CrossEncoder",
     )
     parser.add_argument(
         "--hybrid",
         action="store_true",
+        default=default,
         help="Combina busca densa e BM25 via fusion scoring",
     )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        default=default,
+        help="Busca nas coleções em paralelo com um único embedding da pergunta",
+    )
+    parser.add_argument(
+        "--answer-cache",
+        action="store_true",
+        default=default,
+        help="Reaproveita a resposta de perguntas parecidas (ver ANSWER_CACHE_THRESHOLD)",
+    )
+    parser.add_argument(
+        "--trace",
+        nargs="?",
+        const="",
+        default=argparse.SUPPRESS if default is argparse.SUPPRESS else None,
+        metavar="ARQUIVO",
+        help="Mede cada etapa (embedding, busca, rerank, geração) e grava em JSONL "
+        "(padrão: TRACE_PATH)",
+    )
+
+
+def setup_tracing(args: argparse.Namespace, sinks: list | None = None) -> str | None:
+    """Enable tracing for ``--trace`` or ``TRACE_ENABLED``; return the JSONL path used."""
+    from brew_oracle.utils.config import Settings
+    from brew_oracle.utils.tracing import configure_tracing
+
+    s = Settings()
+    trace = getattr(args, "trace", None)
+    if trace is None and not s.TRACE_ENABLED:
+        return None
+    path = trace or s.TRACE_PATH
+    configure_tracing(path, sinks)
+    return path
+
+
+def run_server(args: argparse.Namespace, profile: StartupProfile) -> None:
+    """Build the orchestrator once and serve it over HTTP until interrupted."""
+    from brew_oracle.core.server import serve
+    from brew_oracle.utils.config import Settings
+
+    s = Settings()
+    setup_tracing(args)
+    orchestrator = build_orchestrator(args, profile)
+    if args.profile_startup:
+        print(profile.report())
+    serve(
+        orchestrator,
+        args.host or s.SERVER_HOST,
+        s.SERVER_PORT if args.port is None else args.port,
+        workers=args.workers or s.SERVER_WORKERS,
+        max_pending=s.SERVER_MAX_PENDING if args.max_pending is None else args.max_pending,
+    )
+
+
+def main():
+    profile = StartupProfile()
+    parser = argparse.ArgumentParser()
+    add_retrieval_args(parser)
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Mostra o tempo de cada import e da carga dos modelos na inicialização",
+    )
+    commands = parser.add_subparsers(dest="command")
+    serve_parser = commands.add_parser(
+        "serve", help="Servidor HTTP/JSON residente (/ask, /ask/stream, /search)"
+    )
+    # SUPPRESS keeps flags given before ``serve`` from being reset by the subparser.
+    add_retrieval_args(serve_parser, default=argparse.SUPPRESS)
+    serve_parser.add_argument("--host", help="Endereço de escuta (padrão: SERVER_HOST)")
+    serve_parser.add_argument("--port", type=int, help="Porta (padrão: SERVER_PORT)")
+    serve_parser.add_argument(
+        "--workers", type=int, help="Requisições atendidas em paralelo (padrão: SERVER_WORKERS)"
+    )
+    serve_parser.add_argument(
+        "--max-pending",
+        type=int,
+        help="Requisições em espera antes de responder 503 (padrão: SERVER_MAX_PENDING)",
+    )
     args = parser.parse_args()
 
-    agent = BrewingOrchestrator(rerank=args.rerank, hybrid=args.hybrid)
+    if args.command == "serve":
+        run_server(args, profile)
+        return
+
+    # Traces of the REPL are also printed after each answer.
+    traces: list = []
+    setup_tracing(args, [traces.append])
+
+    # Models load in the background while the prompt is already shown; the
+    # first question waits for them if needed.
+    loader = BackgroundLoader(lambda: build_orchestrator(args, profile))
+    profile.mark_prompt()
+    if args.profile_startup:
+        try:
+            loader.result()
+        finally:
+            print(profile.report())
     print("Digite uma pergunta (ou 'exit' para sair):")
+    agent = None
     while True:
         try:
             question = input("> ").strip()
@@ -29,12 +152,28 @@ def main():
             break
         if not question:
             continue
-        text, refs = agent.ask_with_refs(question)
-        print(text)
+        if agent is None:
+            if not loader.ready():
+                print("Carregando modelos...", flush=True)
+            agent = loader.result()
+        stream = agent.ask_stream(question)
+        while True:
+            try:
+                print(next(stream), end="", flush=True)
+            except StopIteration as stop:
+                _, refs = stop.value
+                break
+        print()
         if refs:
             print("\nReferências:")
             for ref in refs:
                 print(f"- {ref}")
+        if traces:
+            from brew_oracle.utils.tracing import format_trace
+
+            print("\nEtapas:")
+            while traces:
+                print(format_trace(traces.pop(0)))
     print("Até logo!")
 
 
@@ -0,0 +1,348 @@
+"""Resident HTTP/JSON service around :class:`BrewingOrchestrator`.
+
+Built on ``asyncio`` streams only (no web framework is a dependency). The
+event loop parses requests and writes responses; the blocking retrieval and
+LLM calls run in a bounded thread pool, each ``/ask`` on its own fork of the
+orchestrator so the models, Qdrant clients and caches stay warm and shared.
+
+Endpoints
+---------
+``POST /search``      ``{"query": str, "limit": int?}`` -> ``{"documents": [...]}``
+``POST /ask``         ``{"question": str}`` -> ``{"answer": str, "references": [...],
+                      "degraded": [...]}``
+``POST /ask/stream``  ``{"question": str}`` -> NDJSON lines ``{"delta": str}``, then
+                      ``{"done": true, "answer": str, "references": [...], "degraded": [...]}``
+
+``degraded`` lists the collections whose search failed or timed out, so the
+answer was built from incomplete context (empty when retrieval was complete).
+``GET /health``       worker and queue occupancy
+
+When ``workers + max_pending`` requests are already in flight, new requests
+get ``503`` with ``Retry-After`` instead of queueing without bound.
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADER_BYTES = 16 * 1024
+
+_STREAM_END = object()
+
+
+class HTTPError(Exception):
+    """An error answered with ``status`` and a JSON ``{"error": message}`` body."""
+
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _to_json(value: Any) -> Any:
+    """``json.dumps`` fallback for agno documents and references."""
+    for method in ("model_dump", "to_dict"):
+        if callable(getattr(value, method, None)):
+            return getattr(value, method)()
+    return str(value)
+
+
+def _encode(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, default=_to_json).encode()
+
+
+class BrewServer:
+    """Serve an orchestrator over HTTP with a bounded worker pool.
+
+    Parameters
+    ----------
+    orchestrator : BrewingOrchestrator
+        Warm orchestrator; ``workers`` forks of it answer ``/ask`` requests.
+    workers : int, optional
+        Threads running searches and agent runs concurrently, by default ``4``.
+    max_pending : int, optional
+        Requests allowed to wait for a free worker before the server answers
+        ``503``, by default ``32``.
+    """
+
+    def __init__(self, orchestrator: Any, *, workers: int = 4, max_pending: int = 32) -> None:
+        self.orchestrator = orchestrator
+        self.workers = max(workers, 1)
+        self.max_pending = max(max_pending, 0)
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="brew-server")
+        self._agents: queue.Queue = queue.Queue()
+        for _ in range(self.workers):
+            self._agents.put(orchestrator.fork())
+        self._in_flight = 0
+        self._server: asyncio.Server | None = None
+
+    @property
+    def port(self) -> int:
+        """Port actually bound (useful when started on port ``0``)."""
+        assert self._server is not None
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str, port: int) -> None:
+        self._server = await asyncio.start_server(
+            self._handle_connection, host, port, limit=MAX_HEADER_BYTES
+        )
+
+    async def serve_forever(self, host: str, port: int) -> None:
+        await self.start(host, port)
+        assert self._server is not None
+        logger.info(
+            "Servidor pronto em http://%s:%d (%d workers, fila de %d).",
+            host,
+            self.port,
+            self.workers,
+            self.max_pending,
+        )
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # -- blocking work, run in the pool ------------------------------------
+
+    def _search(self, query: str, limit: int) -> list:
+        return self.orchestrator.search(query, limit)
+
+    def _ask(self, question: str) -> tuple[str, list, list[str]]:
+        agent = self._agents.get()
+        try:
+            answer, refs = agent.ask_with_refs(question)
+            return answer, refs, list(agent.degraded)
+        finally:
+            self._agents.put(agent)
+
+    def _ask_stream(
+        self,
+        question: str,
+        loop: asyncio.AbstractEventLoop,
+        deltas: asyncio.Queue,
+        cancelled: threading.Event,
+    ) -> tuple[str, list, list[str]] | None:
+        agent = self._agents.get()
+        try:
+            stream = agent.ask_stream(question)
+            while not cancelled.is_set():
+                try:
+                    delta = next(stream)
+                except StopIteration as stop:
+                    answer, refs = stop.value
+                    return answer, refs, list(agent.degraded)
+                loop.call_soon_threadsafe(deltas.put_nowait, delta)
+            stream.close()
+            return None
+        finally:
+            self._agents.put(agent)
+            loop.call_soon_threadsafe(deltas.put_nowait, _STREAM_END)
+
+    # -- HTTP ----------------------------------------------------------------
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            try:
+                method, path, body = await self._read_request(reader)
+                if path == "/health":
+                    # Health checks must answer even when the workers are saturated.
+                    await self._dispatch(method, path, body, writer)
+                    return
+                if self._in_flight >= self.workers + self.max_pending:
+                    raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "servidor ocupado")
+                self._in_flight += 1
+                try:
+                    await self._dispatch(method, path, body, writer)
+                finally:
+                    self._in_flight -= 1
+            except HTTPError as e:
+                headers = {"Retry-After": "1"} if e.status == HTTPStatus.SERVICE_UNAVAILABLE else {}
+                await self._respond(writer, e.status, {"error": e.message}, headers)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            except Exception as e:
+                logger.exception("Erro ao atender a requisição: %s", e)
+                await self._respond(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, Any]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError as e:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "cabeçalho grande") from e
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "linha de requisição inválida") from e
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length inválido") from e
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "corpo muito grande")
+        body = None
+        if length:
+            raw = await reader.readexactly(length)
+            try:
+                body = json.loads(raw)
+            except json.JSONDecodeError as e:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "JSON inválido") from e
+        return method.upper(), target.split("?", 1)[0], body
+
+    async def _dispatch(
+        self, method: str, path: str, body: Any, writer: asyncio.StreamWriter
+    ) -> None:
+        routes = {
+            "/health": ("GET", self._health),
+            "/search": ("POST", self._handle_search),
+            "/ask": ("POST", self._handle_ask),
+            "/ask/stream": ("POST", self._handle_ask_stream),
+        }
+        if path not in routes:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"rota desconhecida: {path}")
+        expected, handler = routes[path]
+        if method != expected:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"use {expected} em {path}")
+        await handler(body, writer)
+
+    @staticmethod
+    def _field(body: Any, name: str) -> str:
+        value = body.get(name) if isinstance(body, dict) else None
+        if not isinstance(value, str) or not value.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"campo '{name}' obrigatório")
+        return value
+
+    async def _run(self, fn, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _health(self, body: Any, writer: asyncio.StreamWriter) -> None:
+        await self._respond(
+            writer,
+            HTTPStatus.OK,
+            {
+                "status": "ok",
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+            },
+        )
+
+    async def _handle_search(self, body: Any, writer: asyncio.StreamWriter) -> None:
+        query = self._field(body, "query")
+        limit = body.get("limit", 5)
+        # bool is a subclass of int; {"limit": true} is not a limit.
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit <= 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "campo 'limit' deve ser inteiro positivo")
+        docs = await self._run(self._search, query, limit)
+        await self._respond(writer, HTTPStatus.OK, {"documents": docs})
+
+    async def _handle_ask(self, body: Any, writer: asyncio.StreamWriter) -> None:
+        answer, refs, degraded = await self._run(self._ask, self._field(body, "question"))
+        await self._respond(
+            writer,
+            HTTPStatus.OK,
+            {"answer": answer, "references": refs, "degraded": degraded},
+        )
+
+    async def _handle_ask_stream(self, body: Any, writer: asyncio.StreamWriter) -> None:
+        question = self._field(body, "question")
+        loop = asyncio.get_running_loop()
+        deltas: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        result = loop.run_in_executor(
+            self._executor, self._ask_stream, question, loop, deltas, cancelled
+        )
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/x-ndjson; charset=utf-8\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        try:
+            while (delta := await deltas.get()) is not _STREAM_END:
+                await self._write_chunk(writer, {"delta": delta})
+            outcome = await result
+            if outcome is None:
+                raise RuntimeError("a resposta foi interrompida")
+            answer, refs, degraded = outcome
+            await self._write_chunk(
+                writer,
+                {"done": True, "answer": answer, "references": refs, "degraded": degraded},
+            )
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except ConnectionError:
+            # The client left: stop the agent run at the next token.
+            cancelled.set()
+            await asyncio.wait([result])
+        except Exception as e:
+            logger.exception("Erro durante o streaming: %s", e)
+            cancelled.set()
+            await self._write_chunk(writer, {"error": str(e)})
+            writer.write(b"0\r\n\r\n")
+
+    @staticmethod
+    async def _write_chunk(writer: asyncio.StreamWriter, payload: Any) -> None:
+        data = _encode(payload) + b"\n"
+        writer.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        await writer.drain()
+
+    @staticmethod
+    async def _respond(
+        writer: asyncio.StreamWriter,
+        status: HTTPStatus,
+        payload: Any,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        data = _encode(payload)
+        head = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(data)}",
+            "Connection: close",
+            *(f"{name}: {value}" for name, value in (headers or {}).items()),
+        ]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+        await writer.drain()
+
+
+def serve(
+    orchestrator: Any,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    *,
+    workers: int = 4,
+    max_pending: int = 32,
+) -> None:
+    """Run a :class:`BrewServer` until interrupted."""
+    server = BrewServer(orchestrator, workers=workers, max_pending=max_pending)
+    try:
+        asyncio.run(server.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -1,21 +1,58 @@
 import logging
 import os
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
 from typing import Any
 
 from agno.document import Document
-from agno.embedder.sentence_transformer import SentenceTransformerEmbedder
 from agno.vectordb.qdrant import Qdrant
 from agno.vectordb.search import SearchType
 from pybeerxml.parser import Parser
+from qdrant_client.http import models
 from tqdm import tqdm
 
+from brew_oracle.knowledge.ingest import (
+    bulk_load,
+    load_state,
+    save_state,
+    upload_documents,
+    upsert_documents,
+)
+from brew_oracle.knowledge.recipe_table import RecipeTable, RecipeTableBuilder, recipe_table_path
+from brew_oracle.knowledge.retrieval import get_vector_db, search_by_vector
+from brew_oracle.utils.cache import invalidate_collection
 from brew_oracle.utils.config import Settings
+from brew_oracle.utils.embedding_store import open_embedding_store
+from brew_oracle.utils.models import get_embedder
+from brew_oracle.utils.qdrant import (
+    get_qdrant_client,
+    get_upload_client,
+    resolve_alias,
+    use_shared_clients,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Recipe payload fields indexed for filtering (stored under ``meta_data`` by agno).
+RECIPE_KEYWORD_FIELDS = ("style", "hops", "yeasts")
+RECIPE_FLOAT_FIELDS = ("abv", "ibu", "og", "srm")
 
-def build_recipe_kb(hybrid: bool = False) -> Qdrant:
+
+def keyword_key(value: str) -> str:
+    """Case-folded form of a style/hop/yeast name, as stored in its ``*_key`` field."""
+    return str(value).casefold()
+
+
+def keyword_field(name: str) -> str:
+    """Payload key of the case-folded copy of keyword field ``name`` (``style_key``)."""
+    return f"meta_data.{name}_key"
+
+
+def build_recipe_kb(hybrid: bool = False, s: Settings | None = None) -> Qdrant:
     """Create and configure the Qdrant knowledge base for recipes.
 
     Parameters
@@ -23,21 +60,17 @@ def build_recipe_kb(hybrid: bool = False) -> Qdrant:
     hybrid : bool, optional
         When ``True`` also generates sparse BM25 vectors and enables
         fusion scoring between dense and sparse results, by default ``False``.
+    s : Settings | None, optional
+        Settings to use instead of a fresh :class:`Settings` (e.g. another
+        ``QDRANT_RECIPE_COLLECTION``).
 
     Returns
     -------
     Qdrant
         The configured Qdrant client for recipes.
     """
-    s = Settings()
-    embedder_id = s.EMBEDDER_ID
-    if os.path.isdir(embedder_id):
-        embedder_id = os.path.abspath(embedder_id)
-
-    embedder = SentenceTransformerEmbedder(
-        id=embedder_id,
-        dimensions=s.EMBEDDER_DIM,
-    )
+    s = s or Settings()
+    embedder = get_embedder(s.EMBEDDER_ID, s.EMBEDDER_DIM, s.EMBEDDER_BACKEND)
     kb = Qdrant(
         collection=s.QDRANT_RECIPE_COLLECTION,
         url=s.QDRANT_URL,
@@ -47,86 +80,376 @@ def build_recipe_kb(hybrid: bool = False) -> Qdrant:
         sparse_vector_name=s.SPARSE_VECTOR_NAME,
         fastembed_kwargs={"model_name": getattr(s, "SPARSE_MODEL_ID", "Qdrant/bm25")},
     )
-    return kb
+    return use_shared_clients(kb, s)
+
+
+def ensure_recipe_indexes(client: Any, collection: str) -> list[str]:
+    """Create the missing payload indexes of the recipe collection.
+
+    Keyword indexes on the case-folded copies of :data:`RECIPE_KEYWORD_FIELDS`
+    (see :func:`keyword_field`) and float (range) indexes on
+    :data:`RECIPE_FLOAT_FIELDS` let Qdrant apply :class:`RecipeFilter`
+    conditions while it walks the HNSW graph instead of scanning payloads.
+
+    Returns
+    -------
+    list[str]
+        The payload keys indexed by this call.
+    """
+    existing = client.get_collection(collection).payload_schema or {}
+    schemas = {keyword_field(f): models.PayloadSchemaType.KEYWORD for f in RECIPE_KEYWORD_FIELDS}
+    schemas.update({f"meta_data.{f}": models.PayloadSchemaType.FLOAT for f in RECIPE_FLOAT_FIELDS})
+    created = []
+    for key, schema in schemas.items():
+        if key in existing:
+            continue
+        client.create_payload_index(
+            collection_name=collection, field_name=key, field_schema=schema, wait=True
+        )
+        created.append(key)
+    if created:
+        logger.info("Created payload indexes on '%s': %s.", collection, ", ".join(created))
+    return created
+
+
+@dataclass
+class RecipeFilter:
+    """Structured constraints on recipes, evaluated by Qdrant during the search.
+
+    Keyword values are compared case-insensitively with the BeerXML names,
+    through the case-folded copies stored at ingestion (recipes ingested
+    before those copies existed need re-ingesting). Every hop and yeast
+    listed must be in the recipe; ``styles`` accepts any of the given styles.
+    Ranges are inclusive and open-ended when a bound is ``None``.
+    """
+
+    styles: list[str] = field(default_factory=list)
+    hops: list[str] = field(default_factory=list)
+    yeasts: list[str] = field(default_factory=list)
+    abv_min: float | None = None
+    abv_max: float | None = None
+    ibu_min: float | None = None
+    ibu_max: float | None = None
+    og_min: float | None = None
+    og_max: float | None = None
+    srm_min: float | None = None
+    srm_max: float | None = None
+
+    def to_qdrant(self) -> models.Filter | None:
+        """Build the Qdrant filter; ``None`` when there is no constraint."""
+        must: list[models.Condition] = []
+        if self.styles:
+            must.append(
+                models.FieldCondition(
+                    key=keyword_field("style"),
+                    match=models.MatchAny(any=[keyword_key(v) for v in self.styles]),
+                )
+            )
+        for name, values in (("hops", self.hops), ("yeasts", self.yeasts)):
+            must.extend(
+                models.FieldCondition(
+                    key=keyword_field(name), match=models.MatchValue(value=keyword_key(v))
+                )
+                for v in values
+            )
+        for name in RECIPE_FLOAT_FIELDS:
+            low = getattr(self, f"{name}_min")
+            high = getattr(self, f"{name}_max")
+            if low is not None or high is not None:
+                must.append(
+                    models.FieldCondition(
+                        key=f"meta_data.{name}", range=models.Range(gte=low, lte=high)
+                    )
+                )
+        return models.Filter(must=must) if must else None
+
+
+def search_recipes(
+    kb: Any,
+    query: str,
+    limit: int = 5,
+    recipe_filter: RecipeFilter | None = None,
+    search_params: models.SearchParams | None = None,
+) -> list[Document]:
+    """Search recipes similar to ``query`` that satisfy ``recipe_filter``.
+
+    The filter is pushed into the Qdrant query, so the ``limit`` results are
+    the nearest recipes among those matching, not a post-filtered top-k.
+    """
+    query_filter = recipe_filter.to_qdrant() if recipe_filter else None
+    embedding = get_vector_db(kb).embedder.get_embedding(query)
+    return search_by_vector(kb, query, embedding, limit, query_filter, search_params)
+
+
+def recipe_to_document(recipe: Any) -> Document:
+    """Build the ``Document`` (text + payload) stored for a parsed BeerXML recipe."""
+    style = getattr(recipe.style, "name", None)
+    hops = [hop.name for hop in recipe.hops]
+    fermentables = [f.name for f in recipe.fermentables]
+    yeasts = [y.name for y in recipe.yeasts]
+    recipe_data: dict[str, Any] = {
+        "name": recipe.name,
+        "brewer": recipe.brewer,
+        "style": style,
+        "og": getattr(recipe, "og", None),
+        "fg": getattr(recipe, "fg", None),
+        "abv": getattr(recipe, "abv", None),
+        "ibu": getattr(recipe, "ibu", None),
+        "srm": getattr(recipe, "srm", None),
+        "color": getattr(recipe, "color", None),
+        "batch_size": getattr(recipe, "batch_size", None),
+        "boil_size": getattr(recipe, "boil_size", None),
+        "boil_time": getattr(recipe, "boil_time", None),
+        "efficiency": getattr(recipe, "efficiency", None),
+        "hops": hops,
+        "fermentables": fermentables,
+        "yeasts": yeasts,
+        "miscs": [m.name for m in recipe.miscs],
+        "notes": getattr(recipe, "notes", None),
+        # Case-folded copies matched (and indexed) by RecipeFilter.
+        "style_key": keyword_key(style) if style is not None else None,
+        "hops_key": [keyword_key(h) for h in hops],
+        "yeasts_key": [keyword_key(y) for y in yeasts],
+    }
+    recipe_data["full_text"] = (
+        f"{recipe.name} by {recipe.brewer}. Style: "
+        f"{style if style is not None else 'N/A'}. OG: "
+        f"{getattr(recipe, 'og', 0.0):.3f}, FG: "
+        f"{getattr(recipe, 'fg', 0.0):.3f}, ABV: "
+        f"{getattr(recipe, 'abv', 0.0):.2f}%, IBU: "
+        f"{getattr(recipe, 'ibu', 0.0):.2f}. Hops: "
+        f"{', '.join(hops)}. "
+        f"Fermentables: {', '.join(fermentables)}. "
+        f"Yeasts: {', '.join(yeasts)}. "
+        f"Notes: {getattr(recipe, 'notes', '')}"
+    )
+    return Document(content=recipe_data["full_text"], meta_data=recipe_data)
+
+
+def parse_recipe_file(filepath: str) -> list[Document]:
+    """Parse one BeerXML file into documents; errors are logged and yield ``[]``.
+
+    Module-level so it can run in worker processes.
+    """
+    try:
+        return [recipe_to_document(recipe) for recipe in Parser().parse(filepath)]
+    except Exception as e:
+        logger.error(f"Error parsing {filepath}: {e}")
+        return []
+
 
+def iter_recipe_documents(
+    filenames: Iterable[str], directory: str, workers: int = 1
+) -> Iterator[tuple[str, list[Document]]]:
+    """Parse BeerXML files lazily, yielding ``(filename, documents)`` in input order.
 
-def ingest_recipes(upsert: bool = True, hybrid: bool = False) -> None:
+    With ``workers > 1`` files are parsed in a process pool. At most
+    ``4 * workers`` files are in flight, so parsing never runs far ahead of
+    the (slower) embedding stage and memory stays bounded.
+    """
+    if workers <= 1:
+        for filename in filenames:
+            yield filename, parse_recipe_file(os.path.join(directory, filename))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight: deque[tuple[str, Future]] = deque()
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            in_flight.append((filename, pool.submit(parse_recipe_file, path)))
+            if len(in_flight) >= 4 * workers:
+                name, future = in_flight.popleft()
+                yield name, future.result()
+        while in_flight:
+            name, future = in_flight.popleft()
+            yield name, future.result()
+
+
+def checkpoint_path(s: Settings) -> str:
+    """Return the checkpoint file of an in-progress recipe ingestion."""
+    return os.path.join(s.INGEST_STATE_DIR, f"recipes_checkpoint_{s.QDRANT_RECIPE_COLLECTION}.json")
+
+
+def ingest_recipes(
+    hybrid: bool = False,
+    resume: bool = True,
+    workers: int | None = None,
+    bulk: bool | None = None,
+    s: Settings | None = None,
+) -> int:
     """Load BeerXML files into the Qdrant collection for recipes.
 
+    Files are parsed lazily, in name order, and their recipes are embedded and
+    upserted in batches of ``INGEST_BATCH_SIZE``, so memory stays bounded by
+    one batch. After each batch the last fully upserted file is written to a
+    checkpoint (see :func:`checkpoint_path`); an interrupted run resumes after
+    that file and the checkpoint is removed once the run completes.
+
+    The recipe parameters are also written to the columnar
+    :class:`~brew_oracle.knowledge.recipe_table.RecipeTable` used for numeric
+    and aggregate questions. Files already in the collection but missing from
+    the table are parsed again (without embedding) to fill it, and the rows of
+    files no longer in ``BEERXML_PATH`` are dropped from it.
+
     Parameters
     ----------
-    upsert : bool, optional
-        If ``True`` (default), existing documents are updated during
-        ingestion; otherwise, only new documents are added.
     hybrid : bool, optional
         Also create sparse BM25 vectors for hybrid search, by default ``False``.
+    resume : bool, optional
+        Skip files already listed in the checkpoint of an interrupted run,
+        by default ``True``.
+    workers : int | None, optional
+        Number of processes parsing BeerXML files, by default
+        ``Settings.INGEST_WORKERS`` (``1`` parses in the current process).
+        Embedding and upserts stay in this process.
+    bulk : bool | None, optional
+        Write every recipe in one ``upload_points`` stream
+        (``INGEST_UPLOAD_BATCH_SIZE`` points per request from
+        ``INGEST_UPLOAD_PARALLEL`` processes) with HNSW indexing off until the
+        end, see :func:`~brew_oracle.knowledge.ingest.bulk_load`. A bulk load
+        writes no checkpoint: an interrupted one starts over. By default
+        ``Settings.INGEST_BULK``.
+    s : Settings | None, optional
+        Settings to use instead of a fresh :class:`Settings`.
+
+    Returns
+    -------
+    int
+        Number of points in the collection after the ingestion.
     """
-    s = Settings()
-    kb = build_recipe_kb(hybrid=hybrid)
+    s = s or Settings()
+    bulk = s.INGEST_BULK if bulk is None else bulk
+    workers = s.INGEST_WORKERS if workers is None else workers
+    kb = build_recipe_kb(hybrid=hybrid, s=s)
     os.makedirs(s.BEERXML_PATH, exist_ok=True)
+    client = get_qdrant_client(s)
+    # Writes go through the alias after a reindex; checks need the collection behind it.
+    collection = resolve_alias(client, s.QDRANT_RECIPE_COLLECTION)
+    if not client.collection_exists(collection):
+        # Embedded backends start empty; on a server prefer create_collections (profiles).
+        kb.create()
+    if s.VECTOR_BACKEND == "server":
+        # Embedded Qdrant ignores payload indexes (it always scans).
+        ensure_recipe_indexes(client, collection)
 
-    parser = Parser()
-    recipes_to_upsert = []
-
-    for filename in tqdm(os.listdir(s.BEERXML_PATH), desc="Ingesting BeerXML files"):
-        if filename.endswith(".xml"):
-            filepath = os.path.join(s.BEERXML_PATH, filename)
-            try:
-                recipes = parser.parse(filepath)
-                for recipe in recipes:
-                    recipe_data: dict[str, Any] = {
-                        "name": recipe.name,
-                        "brewer": recipe.brewer,
-                        "style": getattr(recipe.style, "name", None),
-                        "og": getattr(recipe, "og", None),
-                        "fg": getattr(recipe, "fg", None),
-                        "abv": getattr(recipe, "abv", None),
-                        "ibu": getattr(recipe, "ibu", None),
-                        "srm": getattr(recipe, "srm", None),
-                        "color": getattr(recipe, "color", None),
-                        "batch_size": getattr(recipe, "batch_size", None),
-                        "boil_size": getattr(recipe, "boil_size", None),
-                        "boil_time": getattr(recipe, "boil_time", None),
-                        "efficiency": getattr(recipe, "efficiency", None),
-                        "hops": [hop.name for hop in recipe.hops],
-                        "fermentables": [f.name for f in recipe.fermentables],
-                        "yeasts": [y.name for y in recipe.yeasts],
-                        "miscs": [m.name for m in recipe.miscs],
-                        "notes": getattr(recipe, "notes", None),
-                        "full_text": (
-                            f"{recipe.name} by {recipe.brewer}. Style: "
-                            f"{getattr(recipe.style, 'name', 'N/A')}. OG: "
-                            f"{getattr(recipe, 'og', 0.0):.3f}, FG: "
-                            f"{getattr(recipe, 'fg', 0.0):.3f}, ABV: "
-                            f"{getattr(recipe, 'abv', 0.0):.2f}%, IBU: "
-                            f"{getattr(recipe, 'ibu', 0.0):.2f}. Hops: "
-                            f"{', '.join([hop.name for hop in recipe.hops])}. "
-                            f"Fermentables: {', '.join([f.name for f in recipe.fermentables])}. "
-                            f"Yeasts: {', '.join([y.name for y in recipe.yeasts])}. "
-                            f"Notes: {getattr(recipe, 'notes', '')}"
-                        ),
-                    }
-                    recipes_to_upsert.append(
-                        Document(content=recipe_data["full_text"], meta_data=recipe_data)
-                    )
-            except Exception as e:
-                logger.error(f"Error parsing {filepath}: {e}")
+    state_path = checkpoint_path(s)
+    checkpoint = load_state(state_path) if resume else {}
+    last_file = checkpoint.get("last_file") if checkpoint.get("hybrid") == hybrid else None
+    if last_file:
+        logger.info("Resuming recipe ingestion after '%s'.", last_file)
+
+    filenames = sorted(f for f in os.listdir(s.BEERXML_PATH) if f.endswith(".xml"))
+    pending = [f for f in filenames if last_file is None or f > last_file]
 
-    if recipes_to_upsert:
-        kb.upsert(recipes_to_upsert)
+    table = RecipeTableBuilder()
+    table_path = recipe_table_path(s)
+    known_files: set[str] = set()
+    removed: list[str] = []
+    if os.path.exists(table_path):
+        previous = RecipeTable.load(table_path)
+        known_files = set(previous.files.tolist())
+        removed = sorted(known_files.difference(filenames))
+        table.extend(previous, exclude_files=[*pending, *removed])
+        if removed:
+            logger.info("Dropping %d removed files from the recipe table.", len(removed))
+    missing = [f for f in filenames if f not in pending and f not in known_files]
+    for filename, documents in iter_recipe_documents(missing, s.BEERXML_PATH, workers):
+        for doc in documents:
+            table.add(doc.meta_data, filename)
+
+    store = open_embedding_store(s, get_vector_db(kb).embedder)
+    batch: list[Document] = []
+    batch_files: list[str] = []
+    batch_last_file: str | None = None
+    ingested = 0
+    parsed_recipes = 0
+    start = time.perf_counter()
+
+    def flush() -> None:
+        nonlocal ingested, batch, batch_files
+        if batch:
+            ingested += upsert_documents(kb, batch, s.INGEST_BATCH_SIZE, store=store)
+            # Only upserted recipes enter the table, so it matches the checkpoint.
+            for filename, doc in zip(batch_files, batch, strict=True):
+                table.add(doc.meta_data, filename)
+        save_state(state_path, {"hybrid": hybrid, "last_file": batch_last_file})
+        logger.debug("Checkpoint after '%s' (%d recipes).", batch_last_file, ingested)
+        batch, batch_files = [], []
+
+    parsed = tqdm(
+        iter_recipe_documents(pending, s.BEERXML_PATH, workers),
+        total=len(pending),
+        desc="Ingesting BeerXML files",
+    )
+    try:
+        if bulk:
+            # One upload stream without per-batch checkpoints. Each file enters the
+            # table as it is streamed, so no recipe metadata is held until the end;
+            # a failed bulk load starts over and replaces these rows.
+            def recipes() -> Iterator[Document]:
+                nonlocal parsed_recipes
+                for filename, documents in parsed:
+                    parsed_recipes += len(documents)
+                    for doc in documents:
+                        table.add(doc.meta_data, filename)
+                    yield from documents
+
+            with bulk_load(
+                client, s.QDRANT_RECIPE_COLLECTION, pause_indexing=s.VECTOR_BACKEND == "server"
+            ) as report:
+                ingested = report.points = upload_documents(
+                    kb,
+                    recipes(),
+                    s.INGEST_BATCH_SIZE,
+                    upload_batch_size=s.INGEST_UPLOAD_BATCH_SIZE,
+                    parallel=s.INGEST_UPLOAD_PARALLEL,
+                    store=store,
+                    client=get_upload_client(s),
+                )
+        else:
+            for filename, documents in parsed:
+                parsed_recipes += len(documents)
+                batch.extend(documents)
+                batch_files.extend([filename] * len(documents))
+                batch_last_file = filename
+                if len(batch) >= s.INGEST_BATCH_SIZE:
+                    flush()
+            if batch:
+                flush()
+    finally:
+        if pending or missing or removed:
+            table.build().save(table_path)
+            logger.info("Recipe table with %d recipes written to '%s'.", len(table), table_path)
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    logger.info(
+        "Processed %d files (%.1f files/s) and %d recipes (%.1f recipes/s) with %d worker(s).",
+        len(pending),
+        len(pending) / elapsed,
+        parsed_recipes,
+        parsed_recipes / elapsed,
+        workers,
+    )
+
+    if store is not None:
+        logger.info("Embedding store: %d recipes reused, %d embedded.", store.hits, store.misses)
+
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+    if ingested:
+        invalidate_collection(s.QDRANT_RECIPE_COLLECTION, s.INGEST_STATE_DIR)
         logger.info(
             "Ingested %d recipes into collection '%s'.",
-            len(recipes_to_upsert),
+            ingested,
             s.QDRANT_RECIPE_COLLECTION,
         )
     else:
         logger.info("No BeerXML files found or parsed successfully in '%s'.", s.BEERXML_PATH)
 
-    from qdrant_client import QdrantClient
-
-    c = QdrantClient(url=s.QDRANT_URL)
-    count = c.count(s.QDRANT_RECIPE_COLLECTION, exact=True).count
+    count = client.count(s.QDRANT_RECIPE_COLLECTION, exact=True).count
     logger.info("OK: %d points in collection '%s'.", count, s.QDRANT_RECIPE_COLLECTION)
+    return count
 
 
 if __name__ == "__main__":
@@ -138,5 +461,23 @@ if __name__ == "__main__":
         action="store_true",
         help="Also create sparse BM25 vectors for hybrid search",
     )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore the checkpoint of an interrupted run and start over",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of processes parsing BeerXML files (default: INGEST_WORKERS)",
+    )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        default=None,
+        help="Bulk load with upload_points and HNSW indexing paused (default: INGEST_BULK)",
+    )
     args = parser.parse_args()
-    ingest_recipes(hybrid=args.hybrid)
+    ingest_recipes(
+        hybrid=args.hybrid, resume=not args.no_resume, workers=args.workers, bulk=args.bulk
+    )
@@ -0,0 +1,305 @@
+import json
+import logging
+import os
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from hashlib import md5
+from itertools import islice
+from typing import Any
+
+from agno.document import Document
+from agno.vectordb.search import SearchType
+from qdrant_client.http import models
+
+from brew_oracle.utils.embedding_store import EmbeddingStore
+from brew_oracle.utils.qdrant import wait_until_indexed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 64
+# Qdrant's default ``indexing_threshold`` (KB of vectors before a segment gets HNSW).
+DEFAULT_INDEXING_THRESHOLD = 20000
+
+
+def load_state(path: str) -> dict[str, Any]:
+    """Read a JSON ingestion state file (manifest/checkpoint); ``{}`` if missing."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning("Ignoring unreadable state file '%s': %s", path, e)
+        return {}
+
+
+def save_state(path: str, state: dict[str, Any]) -> None:
+    """Atomically write a JSON ingestion state file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def clean_content(content: str) -> str:
+    """Replace NUL characters the same way agno does before storing content."""
+    return content.replace("\x00", "\ufffd")
+
+
+def point_id(content: str) -> str:
+    """Return the Qdrant point id of a chunk (md5 of its content, as in agno)."""
+    return md5(clean_content(content).encode()).hexdigest()
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    """Yield lists of at most ``size`` items from ``items``."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def embed_texts(
+    embedder: Any,
+    texts: list[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    store: EmbeddingStore | None = None,
+) -> list:
+    """Embed ``texts`` with one batched encoder call when the embedder allows it.
+
+    ``SentenceTransformerEmbedder.get_embedding`` encodes a single text per
+    call; when the shared ``SentenceTransformer`` is available the whole list
+    goes through ``encode`` at once. With a ``store``, texts embedded before
+    are read from it and only the others reach the encoder (and are added).
+    """
+    if not texts:
+        return []
+    if store is not None:
+        embeddings = store.get_many(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            computed = embed_texts(embedder, [texts[i] for i in missing], batch_size)
+            store.put_many([texts[i] for i in missing], computed)
+            for i, embedding in zip(missing, computed, strict=True):
+                embeddings[i] = embedding
+        return embeddings
+    model = getattr(embedder, "sentence_transformer_client", None)
+    if model is not None:
+        vectors = model.encode(
+            texts,
+            batch_size=batch_size,
+            prompt=getattr(embedder, "prompt", None),
+            normalize_embeddings=getattr(embedder, "normalize_embeddings", False),
+            show_progress_bar=False,
+        )
+        return [list(map(float, v)) for v in vectors]
+    return [embedder.get_embedding(text) for text in texts]
+
+
+def build_points(
+    db: Any, documents: list[Document], embeddings: list[list[float]]
+) -> list[models.PointStruct]:
+    """Build Qdrant points for ``documents`` in the payload layout agno searches.
+
+    Parameters
+    ----------
+    db : Any
+        The agno ``Qdrant`` the points are meant for (decides vector naming and
+        whether sparse BM25 vectors are added).
+    documents : list[Document]
+        Chunks to store.
+    embeddings : list[list[float]]
+        Dense embeddings of ``documents``, in the same order.
+
+    Returns
+    -------
+    list[models.PointStruct]
+        One point per document, with the md5 of the content as id.
+    """
+    contents = [clean_content(doc.content) for doc in documents]
+    sparse: list[Any] = [None] * len(documents)
+    if db.search_type in (SearchType.keyword, SearchType.hybrid):
+        sparse = [e.as_object() for e in db.sparse_encoder.embed(contents)]
+
+    points = []
+    for doc, content, dense, sparse_vector in zip(
+        documents, contents, embeddings, sparse, strict=True
+    ):
+        vector: Any
+        if db.search_type == SearchType.vector:
+            vector = dense
+        else:
+            vector = {db.sparse_vector_name: sparse_vector}
+            if db.search_type == SearchType.hybrid:
+                vector[db.dense_vector_name] = dense
+        points.append(
+            models.PointStruct(
+                id=point_id(content),
+                vector=vector,
+                payload={
+                    "name": doc.name,
+                    "meta_data": doc.meta_data,
+                    "content": content,
+                    "usage": doc.usage,
+                },
+            )
+        )
+    return points
+
+
+def upsert_documents(
+    db: Any,
+    documents: Iterable[Document],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    store: EmbeddingStore | None = None,
+) -> int:
+    """Embed and upsert ``documents`` in batches of ``batch_size``.
+
+    Embeddings already in ``store`` are reused (see :func:`embed_texts`).
+
+    Returns
+    -------
+    int
+        Number of points written.
+    """
+    written = 0
+    for batch in batched(documents, batch_size):
+        embeddings = embed_texts(db.embedder, [doc.content for doc in batch], batch_size, store)
+        points = build_points(db, batch, embeddings)
+        db.client.upsert(collection_name=db.collection, points=points, wait=True)
+        written += len(points)
+    return written
+
+
+def upload_documents(
+    db: Any,
+    documents: Iterable[Document],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    *,
+    upload_batch_size: int = 256,
+    parallel: int = 1,
+    store: EmbeddingStore | None = None,
+    client: Any | None = None,
+) -> int:
+    """Embed ``documents`` and stream them into the collection with ``upload_points``.
+
+    Embeddings are computed ``batch_size`` documents at a time in this
+    process, while qdrant-client sends the points in requests of
+    ``upload_batch_size`` from ``parallel`` worker processes, retrying failed
+    requests. Unlike :func:`upsert_documents`, the embedding of the next
+    batch does not wait for the previous request.
+
+    The points are sent through ``client``, by default ``db.client``. With
+    ``parallel > 1`` it must be a client whose arguments can be pickled into
+    the worker processes, see :func:`~brew_oracle.utils.qdrant.get_upload_client`.
+
+    Returns
+    -------
+    int
+        Number of points written.
+    """
+    written = 0
+
+    def points() -> Iterator[models.PointStruct]:
+        nonlocal written
+        for batch in batched(documents, batch_size):
+            embeddings = embed_texts(db.embedder, [doc.content for doc in batch], batch_size, store)
+            batch_points = build_points(db, batch, embeddings)
+            written += len(batch_points)
+            yield from batch_points
+
+    (client or db.client).upload_points(
+        collection_name=db.collection,
+        points=points(),
+        batch_size=upload_batch_size,
+        parallel=max(parallel, 1),
+        wait=True,
+    )
+    return written
+
+
+@dataclass
+class BulkLoadReport:
+    """Points and timings of a :func:`bulk_load`."""
+
+    points: int = 0
+    upload_seconds: float = 0.0
+    index_seconds: float = 0.0
+
+    @property
+    def points_per_second(self) -> float:
+        return self.points / self.upload_seconds if self.upload_seconds else 0.0
+
+
+@contextmanager
+def bulk_load(
+    client: Any, collection: str, *, pause_indexing: bool = True, timeout: float = 3600.0
+) -> Iterator[BulkLoadReport]:
+    """Run a bulk load of ``collection`` with HNSW indexing turned off.
+
+    On entry the collection's ``indexing_threshold`` is set to ``0``, so new
+    segments are not indexed while points arrive; on exit the previous value
+    is restored and, after a successful load, the context waits until Qdrant
+    has rebuilt the index. The caller sets ``report.points``; throughput and
+    index time are logged at the end.
+
+    Parameters
+    ----------
+    client : Any
+        The ``QdrantClient`` of the collection.
+    collection : str
+        Collection being loaded.
+    pause_indexing : bool, optional
+        Turn indexing off during the load, by default ``True``. Embedded
+        backends have no HNSW index and should pass ``False``.
+    timeout : float, optional
+        Maximum seconds to wait for the index rebuild, by default ``3600``.
+    """
+    report = BulkLoadReport()
+    threshold = None
+    if pause_indexing:
+        info = client.get_collection(collection)
+        threshold = info.config.optimizer_config.indexing_threshold
+        client.update_collection(
+            collection_name=collection,
+            optimizers_config=models.OptimizersConfigDiff(indexing_threshold=0),
+        )
+    start = time.perf_counter()
+    try:
+        yield report
+    finally:
+        report.upload_seconds = time.perf_counter() - start
+        if pause_indexing:
+            client.update_collection(
+                collection_name=collection,
+                optimizers_config=models.OptimizersConfigDiff(
+                    indexing_threshold=(
+                        DEFAULT_INDEXING_THRESHOLD if threshold is None else threshold
+                    )
+                ),
+            )
+    if pause_indexing:
+        report.index_seconds = wait_until_indexed(client, collection, timeout)
+    logger.info(
+        "Carga em lote de '%s': %d pontos em %.1fs (%.1f pontos/s); índice reconstruído em %.1fs.",
+        collection,
+        report.points,
+        report.upload_seconds,
+        report.points_per_second,
+        report.index_seconds,
+    )
+
+
+def delete_points(db: Any, ids: Iterable[str], batch_size: int = 1000) -> int:
+    """Delete the points with the given ids from the collection of ``db``."""
+    deleted = 0
+    for batch in batched(ids, batch_size):
+        db.client.delete(
+            collection_name=db.collection,
+            points_selector=models.PointIdsList(points=batch),
+            wait=True,
+        )
+        deleted += len(batch)
+    return deleted
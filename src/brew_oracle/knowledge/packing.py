@@ -0,0 +1,238 @@
+"""Context packing: fit the retrieved chunks into a prompt token budget.
+
+PDF chunks are cut with ``CHUNK_OVERLAP`` characters shared between
+consecutive chunks of a page, and the same chunk can come back from more
+than one search. Before the documents reach the agent they are
+
+1. deduplicated (same chunk id or same text, keeping the best score),
+2. merged with their neighbours: consecutive chunks of the same file and
+   page become one document with the shared overlap written once, and
+3. added best score first while they fit in ``token_budget`` tokens.
+
+Token counts are the estimate of :func:`brew_oracle.utils.tracing.count_tokens`.
+"""
+
+import copy
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+from brew_oracle.knowledge.rerank import chunk_id, document_text
+from brew_oracle.utils.tracing import count_tokens, span, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PackReport:
+    """What packing did to the documents of one query."""
+
+    docs_in: int = 0
+    docs_out: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    duplicates: int = 0
+    merged: int = 0
+    dropped: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+
+@dataclass
+class PackMetrics:
+    """Cumulative counters of a :class:`ContextPacker`."""
+
+    calls: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    duplicates: int = 0
+    merged: int = 0
+    dropped: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+
+def rank_by_position(*results: list[Any]) -> list[tuple[Any, float]]:
+    """Score the documents of each best-first list by reciprocal rank ``1 / (rank + 1)``.
+
+    agno drops the Qdrant scores, so without a reranker the position inside
+    each collection's results is the only comparable signal. The first
+    document of every list ties; ties keep the order of ``results``.
+    """
+    ranked = [(doc, 1.0 / (rank + 1)) for docs in results for rank, doc in enumerate(docs)]
+    return sorted(ranked, key=lambda x: x[1], reverse=True)
+
+
+def stitch(first: str, second: str, min_overlap: int = 8) -> str:
+    """Join two consecutive chunks writing their shared overlap only once.
+
+    The overlap is the longest suffix of ``first`` (at least ``min_overlap``
+    characters) that starts ``second``; chunks without one are joined by a
+    newline.
+    """
+    if second:
+        start = first.find(second[0])
+        while start != -1 and len(first) - start >= min_overlap:
+            if second.startswith(first[start:]):
+                return first[:start] + second
+            start = first.find(second[0], start + 1)
+    return f"{first}\n{second}"
+
+
+def _position(doc: Any) -> tuple[str, Any, int] | None:
+    """``(file, page, chunk number)`` of a PDF chunk, or ``None`` for other documents."""
+    meta = getattr(doc, "meta_data", None)
+    if not isinstance(meta, dict) or not isinstance(meta.get("chunk"), int):
+        return None
+    return (str(getattr(doc, "name", "") or ""), meta.get("page"), meta["chunk"])
+
+
+class ContextPacker:
+    """Deduplicate, merge and budget the documents given to the agent.
+
+    Parameters
+    ----------
+    token_budget : int | None, optional
+        Maximum number of (estimated) tokens of document text; ``None`` or
+        ``0`` keeps every document after deduplication and merging.
+    merge_neighbours : bool, optional
+        Merge consecutive chunks of the same page, by default ``True``.
+    """
+
+    def __init__(self, token_budget: int | None = None, *, merge_neighbours: bool = True) -> None:
+        self.token_budget = token_budget or None
+        self.merge_neighbours = merge_neighbours
+        self.metrics = PackMetrics()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Any, **kwargs):
+        """Build a packer configured by the ``CONTEXT_*`` fields of :class:`Settings`."""
+        params = {"token_budget": settings.CONTEXT_TOKEN_BUDGET}
+        params.update(kwargs)
+        return cls(**params)
+
+    @staticmethod
+    def _deduplicate(ranked: list[tuple[Any, float]]) -> list[tuple[Any, float]]:
+        """Keep the best-scored copy of each chunk id and of each text."""
+        seen: set[str] = set()
+        unique: list[tuple[Any, float]] = []
+        for doc, score in sorted(ranked, key=lambda x: x[1], reverse=True):
+            keys = {chunk_id(doc), document_text(doc)}
+            if keys & seen:
+                continue
+            seen |= keys
+            unique.append((doc, score))
+        return unique
+
+    @staticmethod
+    def _merge(ranked: list[tuple[Any, float]]) -> tuple[list[tuple[Any, float]], int]:
+        """Merge runs of consecutive chunks of a page; returns the documents and merges done."""
+        groups: dict[tuple[str, Any], list[tuple[int, Any, float]]] = {}
+        others: list[tuple[Any, float]] = []
+        for doc, score in ranked:
+            position = _position(doc)
+            if position is None:
+                others.append((doc, score))
+            else:
+                groups.setdefault(position[:2], []).append((position[2], doc, score))
+
+        merged = 0
+        result = list(others)
+        for chunks in groups.values():
+            chunks.sort(key=lambda x: x[0])
+            run = [chunks[0]]
+            for item in chunks[1:]:
+                if item[0] == run[-1][0] + 1:
+                    run.append(item)
+                    continue
+                result.append(ContextPacker._join(run))
+                merged += len(run) - 1
+                run = [item]
+            result.append(ContextPacker._join(run))
+            merged += len(run) - 1
+        result.sort(key=lambda x: x[1], reverse=True)
+        return result, merged
+
+    @staticmethod
+    def _join(run: list[tuple[int, Any, float]]) -> tuple[Any, float]:
+        """One document with the text of a run of chunks and the best score among them."""
+        first = run[0][1]
+        score = max(s for _, _, s in run)
+        if len(run) == 1:
+            return first, score
+        text = document_text(first)
+        for _, doc, _ in run[1:]:
+            text = stitch(text, document_text(doc))
+        doc = copy.copy(first)
+        doc.content = text
+        doc.id = None
+        doc.meta_data = {**first.meta_data, "chunks": [n for n, _, _ in run]}
+        doc.meta_data.pop("chunk_size", None)
+        return doc, score
+
+    def pack(self, ranked: list[tuple[Any, float]]) -> tuple[list[Any], PackReport]:
+        """Pack ``(document, score)`` pairs into the documents given to the agent.
+
+        Returns
+        -------
+        tuple[list[Any], PackReport]
+            The documents to use, best score first, and what was removed.
+        """
+        with span("pack", docs=len(ranked)) as trace_span:
+            report = PackReport(
+                docs_in=len(ranked),
+                tokens_in=sum(count_tokens(document_text(doc)) for doc, _ in ranked),
+            )
+            unique = self._deduplicate(ranked)
+            report.duplicates = len(ranked) - len(unique)
+            if self.merge_neighbours:
+                unique, report.merged = self._merge(unique)
+
+            packed: list[Any] = []
+            used = 0
+            for doc, _ in unique:
+                tokens = count_tokens(document_text(doc))
+                if self.token_budget is not None and used + tokens > self.token_budget:
+                    if packed:
+                        report.dropped += 1
+                        continue
+                    # Never send an empty context: cut the best document to the budget.
+                    doc = copy.copy(doc)
+                    doc.content = truncate_tokens(document_text(doc), self.token_budget)
+                    tokens = count_tokens(doc.content)
+                packed.append(doc)
+                used += tokens
+            report.docs_out = len(packed)
+            report.tokens_out = used
+            trace_span.set(
+                kept=report.docs_out,
+                tokens_in=report.tokens_in,
+                tokens_out=report.tokens_out,
+                tokens_saved=report.tokens_saved,
+            )
+
+        with self._lock:
+            self.metrics.calls += 1
+            self.metrics.tokens_in += report.tokens_in
+            self.metrics.tokens_out += report.tokens_out
+            self.metrics.duplicates += report.duplicates
+            self.metrics.merged += report.merged
+            self.metrics.dropped += report.dropped
+        logger.info(
+            "Packed %d/%d docs: %d -> %d tokens (%d saved; %d duplicates, %d merged, %d dropped).",
+            report.docs_out,
+            report.docs_in,
+            report.tokens_in,
+            report.tokens_out,
+            report.tokens_saved,
+            report.duplicates,
+            report.merged,
+            report.dropped,
+        )
+        return packed, report
@@ -1,20 +1,52 @@
 # src/brew_oracle/knowledge/pdf_kb.py
+import hashlib
 import logging
 import os
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
 
+from agno.document import Document
 from agno.document.chunking.recursive import RecursiveChunking
-from agno.embedder.sentence_transformer import SentenceTransformerEmbedder
+from agno.document.reader.pdf_reader import _clean_page_numbers
 from agno.knowledge.pdf import PDFKnowledgeBase, PDFReader
 from agno.vectordb.qdrant import Qdrant
 from agno.vectordb.search import SearchType
+from pypdf import PdfReader
 
+from brew_oracle.knowledge.ingest import (
+    bulk_load,
+    delete_points,
+    load_state,
+    point_id,
+    save_state,
+    upload_documents,
+    upsert_documents,
+)
+from brew_oracle.utils.cache import invalidate_collection
 from brew_oracle.utils.config import Settings
+from brew_oracle.utils.embedding_store import EmbeddingStore, open_embedding_store
+from brew_oracle.utils.models import get_embedder
+from brew_oracle.utils.qdrant import (
+    backend_location,
+    get_qdrant_client,
+    get_upload_client,
+    is_embedded,
+    resolve_alias,
+    use_shared_clients,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def build_pdf_kb(hybrid: bool = False) -> PDFKnowledgeBase:
+def build_pdf_kb(hybrid: bool = False, s: Settings | None = None) -> PDFKnowledgeBase:
     """Create and configure the PDF knowledge base.
 
     Parameters
@@ -22,6 +54,9 @@ def build_pdf_kb(hybrid: bool = False) -> PDFKnowledgeBase:
     hybrid : bool, optional
         When ``True`` also generates sparse BM25 vectors and enables
         fusion scoring between dense and sparse results, by default ``False``.
+    s : Settings | None, optional
+        Settings to use instead of a fresh :class:`Settings` (e.g. another
+        ``QDRANT_COLLECTION``).
 
     The knowledge base uses settings defined in :class:`Settings` to configure
     the embedder, vector database and PDF reader.
@@ -32,28 +67,22 @@ def build_pdf_kb(hybrid: bool = False) -> PDFKnowledgeBase:
         The configured knowledge base ready to ingest documents.
     """
 
-    s = Settings()
+    s = s or Settings()
     os.makedirs(s.PDF_PATH, exist_ok=True)
 
-    embedder_id = s.EMBEDDER_ID
-    if os.path.isdir(embedder_id):
-        embedder_id = os.path.abspath(embedder_id)
-
-    embedder = SentenceTransformerEmbedder(
-        id=embedder_id,
-        dimensions=s.EMBEDDER_DIM,
+    embedder = get_embedder(s.EMBEDDER_ID, s.EMBEDDER_DIM, s.EMBEDDER_BACKEND)
+    vector_db = Qdrant(
+        collection=s.QDRANT_COLLECTION,
+        url=s.QDRANT_URL,
+        embedder=embedder,
+        search_type=SearchType.hybrid if hybrid else SearchType.vector,
+        dense_vector_name=s.DENSE_VECTOR_NAME,
+        sparse_vector_name=s.SPARSE_VECTOR_NAME,
+        fastembed_kwargs={"model_name": getattr(s, "SPARSE_MODEL_ID", "Qdrant/bm25")},
     )
     kb = PDFKnowledgeBase(
         path=s.PDF_PATH,
-        vector_db=Qdrant(
-            collection=s.QDRANT_COLLECTION,
-            url=s.QDRANT_URL,
-            embedder=embedder,
-            search_type=SearchType.hybrid if hybrid else SearchType.vector,
-            dense_vector_name=s.DENSE_VECTOR_NAME,
-            sparse_vector_name=s.SPARSE_VECTOR_NAME,
-            fastembed_kwargs={"model_name": getattr(s, "SPARSE_MODEL_ID", "Qdrant/bm25")},
-        ),
+        vector_db=use_shared_clients(vector_db, s),
         reader=PDFReader(
             chunk=True,
             chunk_size=s.CHUNK_SIZE,
@@ -68,30 +97,549 @@ def build_pdf_kb(hybrid: bool = False) -> PDFKnowledgeBase:
     return kb
 
 
-def ingest_pdfs(upsert: bool = True, hybrid: bool = False) -> None:
+@dataclass
+class PipelineMetrics:
+    """Volume and time spent per stage of a :class:`PDFIngestionPipeline` run."""
+
+    files: int = 0
+    pages: int = 0
+    chunks: int = 0
+    vectors: int = 0
+    failed: list[Path] = field(default_factory=list)
+    extract_seconds: float = 0.0
+    embed_seconds: float = 0.0
+    seconds: float = 0.0
+
+    @staticmethod
+    def _rate(count: int, seconds: float) -> float:
+        return count / seconds if seconds > 0 else 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self._rate(self.pages, self.extract_seconds)
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self._rate(self.chunks, self.extract_seconds)
+
+    @property
+    def vectors_per_second(self) -> float:
+        return self._rate(self.vectors, self.embed_seconds)
+
+
+def extract_pages(path: str, start: int, stop: int) -> list[str]:
+    """Extract the text of pages ``[start, stop)`` of a PDF (runs in worker processes)."""
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() for i in range(start, stop)]
+
+
+_DONE = object()
+
+
+class PDFIngestionPipeline:
+    """Extract, chunk and embed PDFs as overlapping stages.
+
+    Pages are extracted by a process pool in ranges of ``pages_per_task``
+    pages, then each file gets the same page-number cleanup and chunking as
+    ``PDFReader.read``. Chunks flow through a queue bounded to ``queue_size``
+    documents into a single embedding thread, which embeds and upserts them in
+    batches of ``batch_size`` while extraction of the next pages continues.
+    When the embedder falls behind, the bounded queue blocks extraction
+    instead of piling chunks up in memory.
+
+    Parameters
+    ----------
+    reader : PDFReader
+        Reader whose chunking strategy and page numbering are applied.
+    db : Any
+        The agno ``Qdrant`` receiving the chunks.
+    workers : int, optional
+        Number of extraction processes, by default ``1`` (``reader.read`` in
+        this process, still overlapping with embedding).
+    pages_per_task : int, optional
+        Pages extracted per pool task, by default ``8``.
+    queue_size : int, optional
+        Maximum number of chunks waiting to be embedded, by default ``256``.
+    batch_size : int, optional
+        Number of chunks embedded and upserted together, by default ``64``.
+    store : EmbeddingStore | None, optional
+        On-disk embeddings reused instead of calling the encoder, by default ``None``.
+    upload_parallel : int | None, optional
+        Write with ``upload_points`` from this many processes instead of one
+        upsert per batch, by default ``None`` (upserts).
+    upload_batch_size : int, optional
+        Points per ``upload_points`` request, by default ``256``.
+    upload_client : Any | None, optional
+        Client of the ``upload_points`` stream, by default ``db.client``; see
+        :func:`~brew_oracle.utils.qdrant.get_upload_client`.
+    """
+
+    def __init__(
+        self,
+        reader: PDFReader,
+        db: Any,
+        *,
+        workers: int = 1,
+        pages_per_task: int = 8,
+        queue_size: int = 256,
+        batch_size: int = 64,
+        store: EmbeddingStore | None = None,
+        upload_parallel: int | None = None,
+        upload_batch_size: int = 256,
+        upload_client: Any | None = None,
+    ) -> None:
+        self.reader = reader
+        self.db = db
+        self.store = store
+        self.upload_parallel = upload_parallel
+        self.upload_batch_size = upload_batch_size
+        self.upload_client = upload_client
+        self.workers = workers
+        self.pages_per_task = max(pages_per_task, 1)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+
+    def _to_documents(self, pdf: Path, pages: list[str]) -> list[Document]:
+        """Apply the page-number cleanup and chunking of ``PDFReader.read``."""
+        contents, shift = _clean_page_numbers(
+            page_content_list=pages,
+            page_start_numbering_format=self.reader.page_start_numbering_format,
+            page_end_numbering_format=self.reader.page_end_numbering_format,
+        )
+        return self.reader._create_documents(
+            contents, pdf.name.split(".")[0], use_uuid_for_id=True, page_number_shift=shift
+        )
+
+    def iter_documents(
+        self, pdfs: Iterable[Path]
+    ) -> Iterator[tuple[Path, int, list[Document] | None]]:
+        """Yield ``(pdf, page count, chunks)`` for each file, in input order.
+
+        The chunks are ``None`` when the file could not be read, so that
+        callers can tell a failed extraction from a PDF without text.
+        """
+        if self.workers <= 1:
+            for pdf in pdfs:
+                try:
+                    documents = self.reader.read(pdf=pdf)
+                    if not documents:
+                        # agno returns [] for unreadable files too: check it opens.
+                        PdfReader(pdf)
+                except Exception as e:
+                    logger.error("Erro ao ler '%s': %s", pdf, e)
+                    yield pdf, 0, None
+                    continue
+                yield pdf, len({doc.meta_data.get("page") for doc in documents}), documents
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending: deque[tuple[Path, list[Future] | None]] = deque()
+            in_flight = 0
+            for pdf in pdfs:
+                try:
+                    num_pages = len(PdfReader(pdf).pages)
+                except Exception as e:
+                    logger.error("Erro ao abrir '%s': %s", pdf, e)
+                    pending.append((pdf, None))
+                    continue
+                futures = [
+                    pool.submit(
+                        extract_pages,
+                        str(pdf),
+                        start,
+                        min(start + self.pages_per_task, num_pages),
+                    )
+                    for start in range(0, num_pages, self.pages_per_task)
+                ]
+                pending.append((pdf, futures))
+                in_flight += len(futures)
+                # Keep the pool busy across file boundaries, but never more than
+                # a few tasks per worker ahead of the consumer.
+                while len(pending) > 1 and in_flight >= 4 * self.workers:
+                    done_pdf, done_futures = pending.popleft()
+                    in_flight -= len(done_futures or [])
+                    yield self._collect(done_pdf, done_futures)
+            while pending:
+                done_pdf, done_futures = pending.popleft()
+                yield self._collect(done_pdf, done_futures)
+
+    def _collect(
+        self, pdf: Path, futures: list[Future] | None
+    ) -> tuple[Path, int, list[Document] | None]:
+        """Gather the pages of ``pdf``; ``futures`` is ``None`` when it could not be opened."""
+        if futures is None:
+            return pdf, 0, None
+        try:
+            pages = [text for future in futures for text in future.result()]
+        except Exception as e:
+            logger.error("Erro ao extrair páginas de '%s': %s", pdf, e)
+            return pdf, 0, None
+        return pdf, len(pages), self._to_documents(pdf, pages) if pages else []
+
+    def read(self, pdf: Path) -> list[Document]:
+        """Return the chunks of a single PDF (none if it cannot be read)."""
+        return next(self.iter_documents([pdf]))[2] or []
+
+    def run(
+        self,
+        pdfs: Iterable[Path],
+        select: Callable[[Path, list[Document]], list[Document]] | None = None,
+    ) -> PipelineMetrics:
+        """Extract, chunk, embed and upsert ``pdfs``.
+
+        Parameters
+        ----------
+        pdfs : Iterable[Path]
+            Files to ingest.
+        select : Callable[[Path, list[Document]], list[Document]] | None, optional
+            Called in this thread with the chunks of each file, in input order;
+            returns the chunks to embed. By default every chunk is embedded.
+            Files that could not be read are not passed to it; they are
+            listed in ``PipelineMetrics.failed``.
+
+        Returns
+        -------
+        PipelineMetrics
+            Pages, chunks and vectors processed, the failed files and the time
+            of each stage.
+        """
+        metrics = PipelineMetrics()
+        chunks: queue.Queue = queue.Queue(maxsize=max(self.queue_size, 1))
+        errors: list[BaseException] = []
+        embedder = threading.Thread(
+            target=self._embed_stage, args=(chunks, metrics, errors), name="pdf-embed"
+        )
+        start = time.perf_counter()
+        embedder.start()
+        try:
+            extract_start = time.perf_counter()
+            for pdf, num_pages, documents in self.iter_documents(pdfs):
+                metrics.files += 1
+                if documents is None:
+                    metrics.failed.append(pdf)
+                    continue
+                metrics.pages += num_pages
+                metrics.chunks += len(documents)
+                for doc in select(pdf, documents) if select is not None else documents:
+                    chunks.put(doc)
+                if errors:
+                    break
+            metrics.extract_seconds = time.perf_counter() - extract_start
+        finally:
+            chunks.put(_DONE)
+            embedder.join()
+        metrics.seconds = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+
+        logger.info(
+            "%d arquivos em %.1fs: %d páginas (%.1f páginas/s), %d trechos (%.1f trechos/s), "
+            "%d vetores (%.1f vetores/s) com %d processo(s).",
+            metrics.files,
+            metrics.seconds,
+            metrics.pages,
+            metrics.pages_per_second,
+            metrics.chunks,
+            metrics.chunks_per_second,
+            metrics.vectors,
+            metrics.vectors_per_second,
+            self.workers,
+        )
+        return metrics
+
+    def _batches(self, chunks: queue.Queue) -> Iterator[list[Document]]:
+        """Yield queued chunks in batches of ``batch_size`` until the end marker arrives."""
+        batch: list[Document] = []
+        while True:
+            item = chunks.get()
+            if item is not _DONE:
+                batch.append(item)
+            if batch and (item is _DONE or len(batch) >= self.batch_size):
+                yield batch
+                batch = []
+            if item is _DONE:
+                return
+
+    def _embed_stage(
+        self, chunks: queue.Queue, metrics: PipelineMetrics, errors: list[BaseException]
+    ) -> None:
+        """Embed and write queued chunks until the end marker arrives.
+
+        Batches are upserted one by one, or streamed through
+        :func:`upload_documents` when ``upload_parallel`` is set. After a
+        failure the queue is still drained so the producer never blocks.
+        """
+        batches = self._batches(chunks)
+        try:
+            if self.upload_parallel is None:
+                for batch in batches:
+                    embed_start = time.perf_counter()
+                    metrics.vectors += upsert_documents(
+                        self.db, batch, self.batch_size, store=self.store
+                    )
+                    metrics.embed_seconds += time.perf_counter() - embed_start
+            else:
+                # The upload pulls batches from the queue: time the whole stage.
+                embed_start = time.perf_counter()
+                metrics.vectors += upload_documents(
+                    self.db,
+                    (doc for batch in batches for doc in batch),
+                    self.batch_size,
+                    upload_batch_size=self.upload_batch_size,
+                    parallel=self.upload_parallel,
+                    store=self.store,
+                    client=self.upload_client,
+                )
+                metrics.embed_seconds += time.perf_counter() - embed_start
+        except BaseException as e:
+            errors.append(e)
+            for _ in batches:
+                pass
+
+
+@dataclass
+class IngestSummary:
+    """What an incremental ingestion skipped, added and deleted."""
+
+    files_skipped: int = 0
+    files_updated: int = 0
+    files_removed: int = 0
+    files_failed: int = 0
+    chunks_added: int = 0
+    chunks_kept: int = 0
+    chunks_deleted: int = 0
+
+
+def manifest_path(s: Settings) -> str:
+    """Return the sidecar manifest file of the PDF collection."""
+    return os.path.join(s.INGEST_STATE_DIR, f"pdf_manifest_{s.QDRANT_COLLECTION}.json")
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def ingest_pdfs_incremental(
+    kb: PDFKnowledgeBase, s: Settings, hybrid: bool, workers: int = 1, bulk: bool = False
+) -> IngestSummary:
+    """Ingest only the PDFs and chunks that changed since the last run.
+
+    A sidecar manifest (see :func:`manifest_path`) stores, per file, its size,
+    mtime, SHA-256 and the ids (content md5) of its chunks. Unchanged files are
+    skipped without being parsed, changed files are re-chunked but only chunks
+    whose content is new are embedded, and points no longer referenced by any
+    file (removed files or edited chunks) are deleted. Changed files go
+    through a :class:`PDFIngestionPipeline`. A file that fails to be read
+    keeps its previous manifest entry and points (or stays out of the
+    manifest if it is new), so the next run tries it again.
+
+    Parameters
+    ----------
+    kb : PDFKnowledgeBase
+        Knowledge base built by :func:`build_pdf_kb`.
+    s : Settings
+        Settings with ``PDF_PATH``, ``QDRANT_COLLECTION``, ``INGEST_STATE_DIR``
+        and the ``INGEST_*`` pipeline sizes.
+    hybrid : bool
+        Whether the collection holds sparse vectors; switching mode discards
+        the manifest.
+    workers : int, optional
+        Number of page extraction processes, by default ``1``.
+    bulk : bool, optional
+        Write with ``upload_points`` (``INGEST_UPLOAD_BATCH_SIZE`` points per
+        request from ``INGEST_UPLOAD_PARALLEL`` processes) with HNSW indexing
+        off until the end, see :func:`~brew_oracle.knowledge.ingest.bulk_load`.
+        By default ``False`` (one upsert per batch).
+
+    Returns
+    -------
+    IngestSummary
+        Counters of skipped, added and deleted files and chunks.
+    """
+    db: Any = kb.vector_db
+    if db is None:
+        raise ValueError("A base de PDFs não tem vector_db configurado.")
+    reader = kb.reader
+    if not isinstance(reader, PDFReader):
+        # The extraction workers read the page text; OCR readers are not supported.
+        raise TypeError("A ingestão incremental precisa de um PDFReader.")
+    # Writes go through the alias after a reindex; the check needs the collection behind it.
+    if not db.client.collection_exists(resolve_alias(db.client, db.collection)):
+        db.create()
+
+    path = manifest_path(s)
+    manifest = load_state(path)
+    old_files: dict[str, dict[str, Any]] = {}
+    if manifest.get("hybrid") == hybrid:
+        old_files = manifest.get("files", {})
+    if old_files and db.get_count() == 0:
+        logger.warning("Coleção '%s' vazia; ignorando o manifesto.", s.QDRANT_COLLECTION)
+        old_files = {}
+
+    known_ids = {chunk for entry in old_files.values() for chunk in entry["chunks"]}
+    new_files: dict[str, dict[str, Any]] = {}
+    changed: dict[Path, tuple[str, os.stat_result, str]] = {}
+    summary = IngestSummary()
+    pdf_dir = Path(s.PDF_PATH)
+
+    for pdf in sorted(pdf_dir.glob("**/*.pdf")):
+        rel = pdf.relative_to(pdf_dir).as_posix()
+        stat = pdf.stat()
+        entry = old_files.get(rel)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            new_files[rel] = entry
+            summary.files_skipped += 1
+            continue
+
+        sha256 = _file_sha256(pdf)
+        if entry and entry["sha256"] == sha256:
+            new_files[rel] = {**entry, "mtime": stat.st_mtime}
+            summary.files_skipped += 1
+            continue
+        changed[pdf] = (rel, stat, sha256)
+
+    def select_new_chunks(pdf: Path, documents: list[Document]) -> list[Document]:
+        rel, stat, sha256 = changed[pdf]
+        chunk_ids: list[str] = []
+        to_add = []
+        for doc in documents:
+            doc_id = point_id(doc.content)
+            chunk_ids.append(doc_id)
+            if doc_id not in known_ids:
+                doc.meta_data["source"] = rel
+                to_add.append(doc)
+                known_ids.add(doc_id)
+        summary.files_updated += 1
+        summary.chunks_added += len(to_add)
+        summary.chunks_kept += len(chunk_ids) - len(to_add)
+        new_files[rel] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": sha256,
+            "chunks": chunk_ids,
+        }
+        logger.info("'%s': %d trechos novos de %d.", rel, len(to_add), len(chunk_ids))
+        return to_add
+
+    store = open_embedding_store(s, db.embedder)
+    hits, misses = (store.hits, store.misses) if store is not None else (0, 0)
+    if changed:
+        pipeline = PDFIngestionPipeline(
+            reader,
+            db,
+            workers=workers,
+            pages_per_task=s.INGEST_PAGES_PER_TASK,
+            queue_size=s.INGEST_QUEUE_SIZE,
+            batch_size=s.INGEST_BATCH_SIZE,
+            store=store,
+            upload_parallel=s.INGEST_UPLOAD_PARALLEL if bulk else None,
+            upload_batch_size=s.INGEST_UPLOAD_BATCH_SIZE,
+            upload_client=get_upload_client(s) if bulk else None,
+        )
+        if bulk:
+            with bulk_load(
+                db.client, s.QDRANT_COLLECTION, pause_indexing=not is_embedded(s)
+            ) as report:
+                metrics = pipeline.run(changed, select_new_chunks)
+                report.points = metrics.vectors
+        else:
+            metrics = pipeline.run(changed, select_new_chunks)
+        for pdf in metrics.failed:
+            rel = changed[pdf][0]
+            summary.files_failed += 1
+            if rel in old_files:
+                # Its old entry differs from the file on disk, so the next run retries it.
+                new_files[rel] = old_files[rel]
+            logger.warning("'%s' não pôde ser lido; os trechos anteriores foram mantidos.", rel)
+        if store is not None:
+            logger.info(
+                "Cache de embeddings: %d trechos reaproveitados, %d calculados.",
+                store.hits - hits,
+                store.misses - misses,
+            )
+
+    summary.files_removed = len(old_files.keys() - new_files.keys())
+    referenced = {chunk for entry in new_files.values() for chunk in entry["chunks"]}
+    stale = {chunk for entry in old_files.values() for chunk in entry["chunks"]} - referenced
+    summary.chunks_deleted = delete_points(db, sorted(stale))
+
+    save_state(path, {"collection": s.QDRANT_COLLECTION, "hybrid": hybrid, "files": new_files})
+    logger.info(
+        "Arquivos: %d inalterados, %d novos/alterados, %d removidos, %d com erro. "
+        "Trechos: %d adicionados, %d mantidos, %d removidos.",
+        summary.files_skipped,
+        summary.files_updated,
+        summary.files_removed,
+        summary.files_failed,
+        summary.chunks_added,
+        summary.chunks_kept,
+        summary.chunks_deleted,
+    )
+    return summary
+
+
+def ingest_pdfs(
+    upsert: bool = True,
+    hybrid: bool = False,
+    incremental: bool = True,
+    workers: int | None = None,
+    bulk: bool | None = None,
+    s: Settings | None = None,
+) -> int:
     """Load PDF files into the Qdrant collection.
 
     Parameters
     ----------
     upsert : bool, optional
         If ``True`` (default), existing documents are updated during
-        ingestion; otherwise, only new documents are added.
+        ingestion; otherwise, only new documents are added. Only used by the
+        full (non incremental) load.
     hybrid : bool, optional
         Also create sparse BM25 vectors for hybrid search, by default ``False``.
+    incremental : bool, optional
+        If ``True`` (default), only new or changed files and chunks are
+        embedded (see :func:`ingest_pdfs_incremental`); otherwise every PDF is
+        re-read and re-embedded.
+    workers : int | None, optional
+        Number of page extraction processes of the incremental load, by
+        default ``Settings.INGEST_WORKERS``.
+    bulk : bool | None, optional
+        Bulk-load the incremental load with ``upload_points`` and indexing
+        paused, by default ``Settings.INGEST_BULK``.
+    s : Settings | None, optional
+        Settings to use instead of a fresh :class:`Settings`.
+
+    Returns
+    -------
+    int
+        Number of points in the collection after the ingestion.
     """
 
-    s = Settings()
-    kb = build_pdf_kb(hybrid=hybrid)
+    s = s or Settings()
+    kb = build_pdf_kb(hybrid=hybrid, s=s)
     logger.info("Iniciando ingestão dos arquivos - Pasta: '%s'.", s.PDF_PATH)
-    load_kwargs = {"upsert": upsert}
-    kb.load(**load_kwargs)
-    from qdrant_client import QdrantClient
-
-    c = QdrantClient(url=s.QDRANT_URL)
+    if incremental:
+        ingest_pdfs_incremental(
+            kb,
+            s,
+            hybrid,
+            workers=s.INGEST_WORKERS if workers is None else workers,
+            bulk=s.INGEST_BULK if bulk is None else bulk,
+        )
+    else:
+        load_kwargs = {"upsert": upsert}
+        kb.load(**load_kwargs)
+    invalidate_collection(s.QDRANT_COLLECTION, s.INGEST_STATE_DIR)
+    c = get_qdrant_client(s)
     logger.info(
         "Conectei em '%s' irei incluir na collection '%s'.",
-        s.QDRANT_URL,
+        backend_location(s),
         s.QDRANT_COLLECTION,
     )
     count = c.count(s.QDRANT_COLLECTION, exact=True).count
     logger.info("OK: %d pontos na coleção '%s'.", count, s.QDRANT_COLLECTION)
+    return count
@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from brew_oracle.knowledge.ingest import point_id
+from brew_oracle.utils.cache import TTLCache, normalize_query
+from brew_oracle.utils.models import get_cross_encoder
+from brew_oracle.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANK_MODEL_ID = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+@dataclass
+class RerankMetrics:
+    """Cumulative counters of a :class:`Reranker`."""
+
+    calls: int = 0
+    candidates: int = 0
+    scored: int = 0
+    cache_hits: int = 0
+    seconds: float = 0.0
+    last_seconds: float = 0.0
+
+
+def document_text(doc: Any) -> str:
+    """Return the text of an agno ``Document`` (or any object with ``text``)."""
+    return getattr(doc, "content", None) or getattr(doc, "text", "") or ""
+
+
+def chunk_id(doc: Any) -> str:
+    """Return a stable id for ``doc``: its own id or the md5 of its content.
+
+    The md5 of the content is also the point id agno uses in Qdrant.
+    """
+    doc_id = getattr(doc, "id", None)
+    if isinstance(doc_id, str) and doc_id:
+        return doc_id
+    return point_id(document_text(doc))
+
+
+class Reranker:
+    """Cross-encoder reranking stage shared by the orchestrator and scripts.
+
+    Only the first ``max_candidates`` documents are scored, texts are cut to
+    ``max_chars`` characters before tokenization, the cross-encoder runs in
+    batches of ``batch_size`` pairs truncated to ``max_length`` tokens, and
+    the scores are kept in an LRU cache keyed by ``(query, chunk id)``.
+
+    Parameters
+    ----------
+    model_id : str, optional
+        Cross-encoder to load through the model registry.
+    max_candidates : int, optional
+        Number of retrieved documents to score; the rest are dropped.
+    batch_size : int, optional
+        Number of pairs per ``CrossEncoder.predict`` batch.
+    max_length : int, optional
+        Maximum sequence length (tokens) of each query/document pair.
+    max_chars : int, optional
+        Documents are truncated to this many characters before scoring.
+    cache_size : int, optional
+        Maximum number of cached scores; ``0`` disables the cache.
+    model_kwargs : dict | None, optional
+        Extra keyword arguments for ``CrossEncoder``.
+    """
+
+    def __init__(
+        self,
+        model_id: str = DEFAULT_RERANK_MODEL_ID,
+        *,
+        max_candidates: int = 20,
+        batch_size: int = 16,
+        max_length: int = 256,
+        max_chars: int = 1000,
+        cache_size: int = 2048,
+        model_kwargs: dict | None = None,
+    ) -> None:
+        self.model_id = model_id
+        self.max_candidates = max_candidates
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.max_chars = max_chars
+        self.model = get_cross_encoder(model_id, max_length=max_length, **(model_kwargs or {}))
+        self.cache = TTLCache(cache_size)
+        self.metrics = RerankMetrics()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Any, model_id: str = DEFAULT_RERANK_MODEL_ID, **kwargs):
+        """Build a reranker configured by the ``RERANK_*`` fields of :class:`Settings`."""
+        params = {
+            "max_candidates": settings.RERANK_MAX_CANDIDATES,
+            "batch_size": settings.RERANK_BATCH_SIZE,
+            "max_length": settings.RERANK_MAX_LENGTH,
+            "max_chars": settings.RERANK_MAX_CHARS,
+            "cache_size": settings.RERANK_CACHE_SIZE,
+        }
+        params.update(kwargs)
+        return cls(model_id, **params)
+
+    def score(self, query: str, docs: list[Any]) -> list[tuple[Any, float]]:
+        """Score ``docs`` against ``query`` and return them best first.
+
+        Parameters
+        ----------
+        query : str
+            The user question.
+        docs : list[Any]
+            Retrieved documents, best first; only the first ``max_candidates``
+            are scored.
+
+        Returns
+        -------
+        list[tuple[Any, float]]
+            ``(document, score)`` pairs sorted by descending score.
+        """
+        return self.score_many([query], [docs])[0]
+
+    def score_many(
+        self, queries: list[str], docs_per_query: list[list[Any]]
+    ) -> list[list[tuple[Any, float]]]:
+        """Score several queries at once, with one cross-encoder pass for all pairs.
+
+        Parameters
+        ----------
+        queries : list[str]
+            The questions.
+        docs_per_query : list[list[Any]]
+            Retrieved documents of each question, best first.
+
+        Returns
+        -------
+        list[list[tuple[Any, float]]]
+            ``(document, score)`` pairs of each question, best first.
+        """
+        total_docs = sum(len(docs) for docs in docs_per_query)
+        with span("rerank", queries=len(queries), docs=total_docs) as trace_span:
+            start = time.perf_counter()
+            candidates = [
+                docs[: self.max_candidates] if self.max_candidates > 0 else list(docs)
+                for docs in docs_per_query
+            ]
+            query_keys = [normalize_query(query) for query in queries]
+
+            scores: list[list[float | None]] = []
+            missing: list[tuple[int, int]] = []
+            for q, docs in enumerate(candidates):
+                scores.append([])
+                for i, doc in enumerate(docs):
+                    cached = self.cache.get((query_keys[q], chunk_id(doc)))
+                    scores[q].append(cached)
+                    if cached is None:
+                        missing.append((q, i))
+
+            if missing:
+                pairs = [
+                    (queries[q], document_text(candidates[q][i])[: self.max_chars])
+                    for q, i in missing
+                ]
+                with span("cross_encoder", pairs=len(pairs), batch_size=self.batch_size):
+                    predicted = self.model.predict(
+                        pairs, batch_size=self.batch_size, show_progress_bar=False
+                    )
+                for (q, i), value in zip(missing, predicted, strict=True):
+                    scores[q][i] = float(value)
+                    self.cache.set((query_keys[q], chunk_id(candidates[q][i])), scores[q][i])
+
+            ranked = [
+                sorted(
+                    zip(docs, [float(v) for v in values if v is not None], strict=True),
+                    key=lambda x: x[1],
+                    reverse=True,
+                )
+                for docs, values in zip(candidates, scores, strict=True)
+            ]
+            kept = sum(len(docs) for docs in candidates)
+            trace_span.set(kept=kept, scored=len(missing))
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.metrics.calls += len(queries)
+            self.metrics.candidates += kept
+            self.metrics.scored += len(missing)
+            self.metrics.cache_hits += kept - len(missing)
+            self.metrics.seconds += elapsed
+            self.metrics.last_seconds = elapsed
+        logger.debug(
+            "Reranked %d/%d docs of %d queries (%d scored, %d cached) in %.3fs.",
+            kept,
+            total_docs,
+            len(queries),
+            len(missing),
+            kept - len(missing),
+            elapsed,
+        )
+        return ranked
+
+    def rerank(self, query: str, docs: list[Any]) -> list[Any]:
+        """Return the top ``max_candidates`` of ``docs`` reordered by cross-encoder score."""
+        return [doc for doc, _ in self.score(query, docs)]
@@ -0,0 +1,454 @@
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextvars import copy_context
+from typing import Any
+
+from agno.document import Document
+from agno.vectordb.search import SearchType
+from qdrant_client.http import models
+
+from brew_oracle.utils.cache import TTLCache, normalize_query
+from brew_oracle.utils.config import Settings
+from brew_oracle.utils.tracing import count_tokens, span
+
+logger = logging.getLogger(__name__)
+
+
+def get_vector_db(kb: Any) -> Any:
+    """Return the agno ``Qdrant`` behind ``kb``.
+
+    ``build_pdf_kb`` returns a ``PDFKnowledgeBase`` wrapping the vector db while
+    ``build_recipe_kb`` returns the ``Qdrant`` itself.
+    """
+    return getattr(kb, "vector_db", None) or kb
+
+
+def search_params_from_settings(s: Settings) -> models.SearchParams | None:
+    """Build the Qdrant search-time parameters from ``SEARCH_*`` settings.
+
+    ``SEARCH_HNSW_EF`` widens the HNSW candidate list; ``SEARCH_OVERSAMPLING``
+    fetches more candidates from the quantized vectors, which are rescored with
+    the originals when ``SEARCH_RESCORE`` is set. Returns ``None`` when neither
+    is configured, leaving the collection defaults in place.
+    """
+    if s.SEARCH_HNSW_EF is None and s.SEARCH_OVERSAMPLING is None:
+        return None
+    quantization = None
+    if s.SEARCH_OVERSAMPLING is not None:
+        quantization = models.QuantizationSearchParams(
+            rescore=s.SEARCH_RESCORE, oversampling=s.SEARCH_OVERSAMPLING
+        )
+    return models.SearchParams(hnsw_ef=s.SEARCH_HNSW_EF, quantization=quantization)
+
+
+def search_cache_key(
+    kb: Any, query: str, limit: int | None, filters: dict[str, Any] | None = None
+) -> tuple:
+    """Build the result-cache key ``(collection, query, top-k, hybrid, filters)``."""
+    db = get_vector_db(kb)
+    frozen_filters = tuple(sorted((k, repr(v)) for k, v in (filters or {}).items()))
+    return (
+        db.collection,
+        normalize_query(query),
+        limit,
+        db.search_type == SearchType.hybrid,
+        frozen_filters,
+    )
+
+
+def search_by_vector(
+    kb: Any,
+    query: str,
+    embedding: list[float],
+    limit: int,
+    filters: dict[str, Any] | models.Filter | None = None,
+    search_params: models.SearchParams | None = None,
+    timeout: int | None = None,
+) -> list[Document]:
+    """Search ``kb`` with a precomputed dense embedding of ``query``.
+
+    Mirrors ``Qdrant.search`` for vector and hybrid collections but skips the
+    query embedding, so several collections can share a single encoder call.
+    Keyword-only collections fall back to the regular search.
+
+    Parameters
+    ----------
+    kb : Any
+        Knowledge base or agno ``Qdrant`` to query.
+    query : str
+        Original query text (used for the sparse BM25 vector in hybrid mode).
+    embedding : list[float]
+        Dense embedding of ``query``.
+    limit : int
+        Number of documents to return.
+    filters : dict[str, Any] | models.Filter | None, optional
+        Metadata filters in the agno format or a ready Qdrant ``Filter``, by
+        default ``None``.
+    search_params : models.SearchParams | None, optional
+        HNSW ``ef`` and quantization oversampling for the dense search, by
+        default ``None`` (collection defaults).
+    timeout : int | None, optional
+        Seconds Qdrant may spend on the query before aborting it, by default
+        ``None`` (the server default).
+
+    Returns
+    -------
+    list[Document]
+        The documents found, best first.
+    """
+    db = get_vector_db(kb)
+    with span("search", collection=db.collection, mode=db.search_type.value) as trace_span:
+        if db.search_type == SearchType.keyword:
+            docs = db.search(query, limit, filters)
+            trace_span.set(docs=len(docs))
+            return docs
+
+        if isinstance(filters, models.Filter):
+            query_filter = filters
+        else:
+            query_filter = db._format_filters(filters or {})
+        if db.search_type == SearchType.hybrid:
+            with span("sparse_encode", tokens=count_tokens(query)):
+                sparse_embedding = next(db.sparse_encoder.embed([query])).as_object()
+            with span("qdrant_query", collection=db.collection) as query_span:
+                response = db.client.query_points(
+                    collection_name=db.collection,
+                    prefetch=[
+                        models.Prefetch(
+                            query=models.SparseVector(**sparse_embedding),
+                            limit=limit,
+                            using=db.sparse_vector_name,
+                        ),
+                        models.Prefetch(
+                            query=embedding,
+                            limit=limit,
+                            using=db.dense_vector_name,
+                            params=search_params,
+                        ),
+                    ],
+                    query=models.FusionQuery(fusion=db.hybrid_fusion_strategy),
+                    with_payload=True,
+                    limit=limit,
+                    query_filter=query_filter,
+                    timeout=timeout,
+                )
+                query_span.set(docs=len(response.points))
+        else:
+            with span("qdrant_query", collection=db.collection) as query_span:
+                response = db.client.query_points(
+                    collection_name=db.collection,
+                    query=embedding,
+                    using=db.dense_vector_name if db.use_named_vectors else None,
+                    with_payload=True,
+                    limit=limit,
+                    query_filter=query_filter,
+                    search_params=search_params,
+                    timeout=timeout,
+                )
+                query_span.set(docs=len(response.points))
+        docs = db._build_search_results(response.points, query)
+        trace_span.set(docs=len(docs))
+        return docs
+
+
+def search(
+    kb: Any,
+    query: str,
+    limit: int,
+    filters: dict[str, Any] | None = None,
+    search_params: models.SearchParams | None = None,
+) -> list[Document]:
+    """``kb.search`` honouring ``search_params``, which agno's search cannot take."""
+    if search_params is None:
+        return get_vector_db(kb).search(query, limit, filters)
+    with span("embed", tokens=count_tokens(query)):
+        embedding = get_vector_db(kb).embedder.get_embedding(query)
+    return search_by_vector(kb, query, embedding, limit, filters, search_params)
+
+
+def embed_queries(
+    embedder: Any, queries: list[str], cache: TTLCache | None = None
+) -> list[list[float]]:
+    """Embed ``queries`` with one encoder batch, reusing ``cache`` where possible.
+
+    ``cache`` is keyed like :class:`ParallelRetriever`'s embedding cache,
+    ``(embedder id, normalized query)``. Sentence-transformers embedders get
+    the whole list in a single ``encode`` call; other embedders are called
+    once per query.
+    """
+    keys = [(getattr(embedder, "id", id(embedder)), normalize_query(q)) for q in queries]
+    embeddings: list[list[float] | None] = [
+        cache.get(key) if cache is not None else None for key in keys
+    ]
+    missing = [i for i, e in enumerate(embeddings) if e is None]
+    if missing:
+        texts = [queries[i] for i in missing]
+        with span("embed", queries=len(texts), tokens=sum(count_tokens(q) for q in texts)):
+            if getattr(embedder, "sentence_transformer_client", None) is not None:
+                computed = embedder.get_embedding(texts)
+            else:
+                computed = [embedder.get_embedding(text) for text in texts]
+        for i, embedding in zip(missing, computed, strict=True):
+            embeddings[i] = embedding
+            if cache is not None:
+                cache.set(keys[i], embedding)
+    return embeddings  # type: ignore[return-value]
+
+
+def search_batch_by_vector(
+    kb: Any,
+    queries: list[str],
+    embeddings: list[list[float]],
+    limit: int,
+    filters: dict[str, Any] | models.Filter | None = None,
+    search_params: models.SearchParams | None = None,
+) -> list[list[Document]]:
+    """Run :func:`search_by_vector` for many queries in one ``query_batch_points`` call.
+
+    The sparse vectors of a hybrid collection are also encoded in one batch.
+    Keyword-only collections fall back to one regular search per query.
+
+    Returns
+    -------
+    list[list[Document]]
+        The documents found for each query, in the order of ``queries``.
+    """
+    db = get_vector_db(kb)
+    if not queries:
+        return []
+    if db.search_type == SearchType.keyword:
+        return [db.search(query, limit, filters) for query in queries]
+
+    if isinstance(filters, models.Filter):
+        query_filter = filters
+    else:
+        query_filter = db._format_filters(filters or {})
+    with span("search_batch", collection=db.collection, queries=len(queries)) as trace_span:
+        if db.search_type == SearchType.hybrid:
+            with span("sparse_encode", queries=len(queries)):
+                sparse = [e.as_object() for e in db.sparse_encoder.embed(queries)]
+            requests = [
+                models.QueryRequest(
+                    prefetch=[
+                        models.Prefetch(
+                            query=models.SparseVector(**sparse_embedding),
+                            limit=limit,
+                            using=db.sparse_vector_name,
+                        ),
+                        models.Prefetch(
+                            query=embedding,
+                            limit=limit,
+                            using=db.dense_vector_name,
+                            params=search_params,
+                        ),
+                    ],
+                    query=models.FusionQuery(fusion=db.hybrid_fusion_strategy),
+                    filter=query_filter,
+                    limit=limit,
+                    with_payload=True,
+                )
+                for embedding, sparse_embedding in zip(embeddings, sparse, strict=True)
+            ]
+        else:
+            requests = [
+                models.QueryRequest(
+                    query=embedding,
+                    using=db.dense_vector_name if db.use_named_vectors else None,
+                    filter=query_filter,
+                    params=search_params,
+                    limit=limit,
+                    with_payload=True,
+                )
+                for embedding in embeddings
+            ]
+        with span("qdrant_query", collection=db.collection, queries=len(requests)):
+            responses = db.client.query_batch_points(
+                collection_name=db.collection, requests=requests
+            )
+        results = [
+            db._build_search_results(response.points, query)
+            for response, query in zip(responses, queries, strict=True)
+        ]
+        trace_span.set(docs=sum(len(docs) for docs in results))
+    return results
+
+
+def _mark_started(
+    event: threading.Event, started_at: dict[str, float], name: str, fn: Any, *args, **kwargs
+) -> Any:
+    """Record when a queued search starts running, then run it."""
+    started_at[name] = time.monotonic()
+    event.set()
+    return fn(*args, **kwargs)
+
+
+class ParallelRetriever:
+    """Query several knowledge bases concurrently with one query embedding.
+
+    The query is embedded once per distinct embedder and every collection is
+    searched in its own thread pool, so retrieval latency follows the slowest
+    collection instead of the sum of all of them. A collection whose search
+    does not finish within ``timeout`` seconds of starting (or waits longer
+    than ``timeout`` for a free thread) is skipped and reported as degraded,
+    so it cannot stall the answer. The timeout is also sent to Qdrant, which
+    aborts the query so the thread is freed; with separate pools a slow
+    collection can only delay its own searches, never the other collections.
+    Size ``max_workers`` to the number of callers searching at once (e.g.
+    ``SERVER_WORKERS``), or their searches queue behind each other.
+
+    Optional caches skip the encoder for known questions and the Qdrant round
+    trip for known ``(collection, query, top-k, hybrid)`` searches.
+
+    Parameters
+    ----------
+    kbs : dict[str, Any]
+        Knowledge bases keyed by a label used in logs.
+    timeout : float | None, optional
+        Per-collection timeout in seconds, by default ``None`` (wait forever).
+    max_workers : int | None, optional
+        Threads of the pool of each knowledge base, by default ``1``; see
+        ``RETRIEVAL_WORKERS``.
+    embedding_cache : TTLCache | None, optional
+        Cache of query embeddings keyed by ``(embedder id, normalized query)``.
+    search_cache : TTLCache | None, optional
+        Cache of search results keyed by :func:`search_cache_key`.
+    search_params : models.SearchParams | None, optional
+        Search-time HNSW/quantization parameters, see
+        :func:`search_params_from_settings`.
+    """
+
+    def __init__(
+        self,
+        kbs: dict[str, Any],
+        timeout: float | None = None,
+        max_workers: int | None = None,
+        embedding_cache: TTLCache | None = None,
+        search_cache: TTLCache | None = None,
+        search_params: models.SearchParams | None = None,
+    ) -> None:
+        self.kbs = kbs
+        self.search_params = search_params
+        self.timeout = timeout
+        self.embedding_cache = embedding_cache
+        self.search_cache = search_cache
+        self._executors = {
+            name: ThreadPoolExecutor(
+                max_workers=max_workers or 1, thread_name_prefix=f"retrieval-{name}"
+            )
+            for name in kbs
+        }
+
+    def embed(self, query: str, kbs: list[Any] | None = None) -> dict[int, list[float]]:
+        """Embed ``query`` once per distinct embedder among the knowledge bases."""
+        embeddings: dict[int, list[float]] = {}
+        for kb in kbs if kbs is not None else self.kbs.values():
+            embedder = get_vector_db(kb).embedder
+            if id(embedder) in embeddings:
+                continue
+            key = (getattr(embedder, "id", id(embedder)), normalize_query(query))
+            with span("embed", model=key[0], tokens=count_tokens(query)) as trace_span:
+                embedding = None
+                if self.embedding_cache is not None:
+                    embedding = self.embedding_cache.get(key)
+                trace_span.set(cache_hit=embedding is not None)
+                if embedding is None:
+                    embedding = embedder.get_embedding(query)
+                    if self.embedding_cache is not None:
+                        self.embedding_cache.set(key, embedding)
+            embeddings[id(embedder)] = embedding
+        return embeddings
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        filters: dict[str, Any] | None = None,
+    ) -> dict[str, list[Document]]:
+        """Search every knowledge base concurrently.
+
+        Returns
+        -------
+        dict[str, list[Document]]
+            Documents per knowledge base label, in the order of ``kbs``. Labels
+            whose search failed or timed out map to an empty list.
+        """
+        return self.search_with_status(query, limit, filters)[0]
+
+    def search_with_status(
+        self,
+        query: str,
+        limit: int,
+        filters: dict[str, Any] | None = None,
+    ) -> tuple[dict[str, list[Document]], list[str]]:
+        """Like :meth:`search`, also returning the labels whose search failed or timed out."""
+        results: dict[str, list[Document]] = {}
+        degraded: list[str] = []
+        pending: dict[str, Any] = {}
+        for name, kb in self.kbs.items():
+            cached = None
+            if self.search_cache is not None:
+                cached = self.search_cache.get(search_cache_key(kb, query, limit, filters))
+            if cached is not None:
+                results[name] = list(cached)
+            else:
+                pending[name] = kb
+        if not pending:
+            return results, degraded
+
+        embeddings = self.embed(query, list(pending.values()))
+        # Qdrant takes whole seconds; it aborts the query so the thread is not left busy.
+        qdrant_timeout = None if self.timeout is None else max(math.ceil(self.timeout), 1)
+        # Each search runs in a copy of this context so its spans join the trace.
+        started = {name: threading.Event() for name in pending}
+        started_at: dict[str, float] = {}
+        futures = {
+            name: self._executors[name].submit(
+                _mark_started,
+                started[name],
+                started_at,
+                name,
+                copy_context().run,
+                search_by_vector,
+                kb,
+                query,
+                embeddings[id(get_vector_db(kb).embedder)],
+                limit,
+                filters,
+                self.search_params,
+                timeout=qdrant_timeout,
+            )
+            for name, kb in pending.items()
+        }
+
+        for name, future in futures.items():
+            try:
+                remaining = None
+                if self.timeout is not None:
+                    # Time waiting for a free thread does not count against the search.
+                    if not started[name].wait(self.timeout):
+                        raise FutureTimeoutError
+                    remaining = max(started_at[name] + self.timeout - time.monotonic(), 0.0)
+                results[name] = future.result(timeout=remaining)
+                if self.search_cache is not None:
+                    self.search_cache.set(
+                        search_cache_key(pending[name], query, limit, filters), results[name]
+                    )
+            except FutureTimeoutError:
+                future.cancel()
+                logger.warning("Search in '%s' timed out after %.2fs.", name, self.timeout)
+                results[name] = []
+                degraded.append(name)
+            except Exception as e:
+                logger.error("Search in '%s' failed: %s", name, e)
+                results[name] = []
+                degraded.append(name)
+        return {name: results[name] for name in self.kbs}, degraded
+
+    def close(self) -> None:
+        """Shut down the thread pools without waiting for pending searches."""
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -1,10 +1,53 @@
 # src/brew_oracle/orchestrator/brewing_orchestrator.py
+import copy
+import json
+import queue
+from collections import deque
+from collections.abc import Generator, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from itertools import islice
+from typing import Any
+
 from agno.agent import Agent
 from agno.models.google import Gemini
+from agno.run.response import RunEvent
 
-from brew_oracle.knowledge.beerxml_kb import build_recipe_kb
+from brew_oracle.knowledge.beerxml_kb import RecipeFilter, build_recipe_kb, search_recipes
+from brew_oracle.knowledge.packing import ContextPacker, PackMetrics, rank_by_position
 from brew_oracle.knowledge.pdf_kb import build_pdf_kb
+from brew_oracle.knowledge.recipe_table import RANGE_FIELDS, RecipeTableCache, recipe_table_path
+from brew_oracle.knowledge.rerank import DEFAULT_RERANK_MODEL_ID, Reranker
+from brew_oracle.knowledge.retrieval import (
+    ParallelRetriever,
+    embed_queries,
+    get_vector_db,
+    search,
+    search_batch_by_vector,
+    search_cache_key,
+    search_params_from_settings,
+)
+from brew_oracle.utils.cache import CacheStats, Generations, TTLCache, normalize_query
 from brew_oracle.utils.config import Settings
+from brew_oracle.utils.semantic_cache import CachedAnswer, SemanticAnswerCache
+from brew_oracle.utils.tracing import count_tokens, record_generation, span
+
+# Documents already retrieved by ``ask_many``, keyed by normalized question; the
+# agent runs of the batch read them instead of searching again.
+_prefetched: ContextVar[dict[str, list] | None] = ContextVar("prefetched_docs", default=None)
+# Collections whose search failed or timed out during the current question.
+_degraded: ContextVar[list[str] | None] = ContextVar("degraded_collections", default=None)
+
+# Passed to the model with the documents when a collection could not be searched.
+DEGRADED_NOTICE = (
+    "AVISO: a busca em {labels} falhou ou excedeu o tempo limite; o contexto abaixo está "
+    "incompleto. Diga isso ao usuário se faltar informação."
+)
+
+
+def _recipe_filter(**constraints) -> RecipeFilter:
+    """Build a :class:`RecipeFilter` from tool arguments, ignoring the unset ones."""
+    return RecipeFilter(**{k: v for k, v in constraints.items() if v is not None})
 
 
 class BrewingOrchestrator:
@@ -14,9 +57,11 @@ class BrewingOrchestrator:
         model=None,
         *,
         rerank: bool = False,
-        rerank_model_id: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        rerank_model_id: str = DEFAULT_RERANK_MODEL_ID,
         rerank_model_kwargs: dict | None = None,
         hybrid: bool = False,
+        parallel: bool = False,
+        answer_cache: bool = False,
     ) -> None:
         self.pdf_kb = build_pdf_kb(hybrid=hybrid)
         self.recipe_kb = build_recipe_kb(hybrid=hybrid)
@@ -24,36 +69,252 @@ class BrewingOrchestrator:
         self.model = model or Gemini(id="gemini-2.0-flash", api_key=s.GOOGLE_API_KEY)
 
         self.rerank = rerank
+        self.reranker: Reranker | None = None
         if self.rerank:
-            from sentence_transformers import CrossEncoder
+            self.reranker = Reranker.from_settings(
+                s, rerank_model_id, model_kwargs=rerank_model_kwargs
+            )
 
-            self._cross_encoder = CrossEncoder(rerank_model_id, **(rerank_model_kwargs or {}))
+        self.packer: ContextPacker | None = None
+        if s.CONTEXT_PACKING:
+            self.packer = ContextPacker.from_settings(s)
 
-        def _combined_search(query: str, *args, **kwargs):
-            pdf_docs = self.pdf_kb.search(query, *args, **kwargs)
-            recipe_docs = self.recipe_kb.search(query, *args, **kwargs)
-            combined_docs = pdf_docs + recipe_docs
-
-            if self.rerank:
-                pairs = [
-                    (query, getattr(doc, "content", getattr(doc, "text", "")))
-                    for doc in combined_docs
-                ]
-                scores = self._cross_encoder.predict(pairs)
-                reranked_docs = [
-                    doc
-                    for doc, _ in sorted(
-                        zip(combined_docs, scores, strict=False), key=lambda x: x[1], reverse=True
+        self.embedding_cache = TTLCache(s.CACHE_MAXSIZE, s.CACHE_TTL_SECONDS)
+        self.search_cache = TTLCache(
+            s.CACHE_MAXSIZE,
+            s.CACHE_TTL_SECONDS,
+            collection_scoped=True,
+            generations=Generations(s.INGEST_STATE_DIR, s.CACHE_SYNC_SECONDS),
+        )
+        self.answer_cache: SemanticAnswerCache | None = None
+        if answer_cache:
+            self.answer_cache = SemanticAnswerCache(
+                s.ANSWER_CACHE_SIZE,
+                s.ANSWER_CACHE_THRESHOLD,
+                s.ANSWER_CACHE_TTL_SECONDS,
+                generations=Generations(s.INGEST_STATE_DIR, s.CACHE_SYNC_SECONDS),
+            )
+        self.search_params = search_params_from_settings(s)
+        self.num_documents = s.NUM_DOCUMENTS
+        self.recipe_table = RecipeTableCache(recipe_table_path(s))
+
+        # Collections that could not be searched for the last question (``parallel`` only).
+        self.degraded: list[str] = []
+        self.retriever: ParallelRetriever | None = None
+        if parallel:
+            self.retriever = ParallelRetriever(
+                {"pdf": self.pdf_kb, "recipes": self.recipe_kb},
+                timeout=s.RETRIEVAL_TIMEOUT,
+                # One thread per concurrent caller (server workers, forks) and collection.
+                max_workers=s.RETRIEVAL_WORKERS or s.SERVER_WORKERS,
+                embedding_cache=self.embedding_cache,
+                search_cache=self.search_cache,
+                search_params=self.search_params,
+            )
+
+        def _cached_search(kb, query: str, *args, **kwargs):
+            limit = args[0] if args else kwargs.get("limit")
+            key = search_cache_key(kb, query, limit, kwargs.get("filters"))
+            with span("kb_search", collection=get_vector_db(kb).collection) as trace_span:
+                docs = self.search_cache.get(key)
+                trace_span.set(cache_hit=docs is not None)
+                if docs is None:
+                    # agno's ``kb.search`` embeds the query itself, so this span
+                    # covers embedding and search; ``parallel`` times them apart.
+                    if self.search_params is None:
+                        docs = kb.search(query, *args, **kwargs)
+                    else:
+                        docs = search(
+                            kb,
+                            query,
+                            limit or s.NUM_DOCUMENTS,
+                            kwargs.get("filters"),
+                            self.search_params,
+                        )
+                    self.search_cache.set(key, docs)
+                trace_span.set(docs=len(docs))
+            return list(docs)
+
+        def _search_with_status(query: str, *args, **kwargs) -> tuple[list, list[str]]:
+            prefetched = _prefetched.get()
+            if prefetched is not None and normalize_query(query) in prefetched:
+                return list(prefetched[normalize_query(query)]), []
+            degraded: list[str] = []
+            with span(
+                "retrieval", tokens=count_tokens(query), parallel=self.retriever is not None
+            ) as trace_span:
+                if self.retriever is not None:
+                    limit = args[0] if args else kwargs.get("limit", s.NUM_DOCUMENTS)
+                    results, degraded = self.retriever.search_with_status(
+                        query, limit, kwargs.get("filters")
                     )
-                ]
-                return reranked_docs
-            return combined_docs
+                    pdf_docs, recipe_docs = results["pdf"], results["recipes"]
+                    if degraded:
+                        trace_span.set(degraded=",".join(degraded))
+                else:
+                    pdf_docs = _cached_search(self.pdf_kb, query, *args, **kwargs)
+                    recipe_docs = _cached_search(self.recipe_kb, query, *args, **kwargs)
+
+                if self.reranker is not None:
+                    ranked = self.reranker.score(query, pdf_docs + recipe_docs)
+                else:
+                    ranked = self._rank_by_position(pdf_docs, recipe_docs)
+                combined_docs = self._pack(ranked)
+                trace_span.set(docs=len(combined_docs))
+            holder = _degraded.get()
+            if holder is not None:
+                holder.extend(name for name in degraded if name not in holder)
+            return combined_docs, degraded
+
+        def _combined_search(query: str, *args, **kwargs):
+            return _search_with_status(query, *args, **kwargs)[0]
+
+        def _retriever(
+            query: str, num_documents: int | None = None, **kwargs: Any
+        ) -> list[dict | str] | None:
+            # agno calls ``retriever`` for the references and the knowledge tool and
+            # expects plain dicts; ``num_documents`` is its per-collection limit.
+            docs, degraded = (
+                _search_with_status(query, num_documents)
+                if num_documents
+                else _search_with_status(query)
+            )
+            refs: list[dict | str] = [
+                doc.to_dict() if hasattr(doc, "to_dict") else doc for doc in docs
+            ]
+            if degraded:
+                refs.insert(0, DEGRADED_NOTICE.format(labels=", ".join(degraded)))
+            return refs
+
+        self._combined_search = _combined_search
+
+        def search_recipes_by_constraints(
+            query: str,
+            styles: list[str] | None = None,
+            hops: list[str] | None = None,
+            yeasts: list[str] | None = None,
+            abv_min: float | None = None,
+            abv_max: float | None = None,
+            ibu_min: float | None = None,
+            ibu_max: float | None = None,
+            og_min: float | None = None,
+            og_max: float | None = None,
+            srm_min: float | None = None,
+            srm_max: float | None = None,
+        ) -> str:
+            """Search the BeerXML recipes that satisfy structured constraints.
+
+            Use it when the question restricts style, hops, yeasts, ABV, IBU, OG or
+            SRM (e.g. "IPAs above 60 IBU with Citra"); the constraints are applied
+            by the database, so every recipe returned satisfies them. The ``*_min``
+            and ``*_max`` arguments are inclusive bounds of ABV (%), IBU, original
+            gravity (e.g. 1.050) and color (SRM); leave unused bounds empty.
+
+            Parameters
+            ----------
+            query : str
+                What the recipe should be like, in free text.
+            styles : list[str] | None
+                Accepted style names as in BeerXML, in any case (e.g. "American IPA").
+            hops : list[str] | None
+                Hops that must all be in the recipe (e.g. ["Citra"]).
+            yeasts : list[str] | None
+                Yeasts that must all be in the recipe.
+
+            Returns
+            -------
+            str
+                JSON list of the matching recipes and their main parameters.
+            """
+            recipe_filter = _recipe_filter(
+                styles=styles,
+                hops=hops,
+                yeasts=yeasts,
+                abv_min=abv_min,
+                abv_max=abv_max,
+                ibu_min=ibu_min,
+                ibu_max=ibu_max,
+                og_min=og_min,
+                og_max=og_max,
+                srm_min=srm_min,
+                srm_max=srm_max,
+            )
+            docs = self.search_recipes(query, recipe_filter=recipe_filter)
+            fields = ("name", "style", "abv", "ibu", "og", "fg", "srm", "hops", "yeasts")
+            return json.dumps(
+                [{f: doc.meta_data.get(f) for f in fields} for doc in docs], ensure_ascii=False
+            )
+
+        def recipe_statistics(
+            styles: list[str] | None = None,
+            hops: list[str] | None = None,
+            yeasts: list[str] | None = None,
+            abv_min: float | None = None,
+            abv_max: float | None = None,
+            ibu_min: float | None = None,
+            ibu_max: float | None = None,
+            og_min: float | None = None,
+            og_max: float | None = None,
+            srm_min: float | None = None,
+            srm_max: float | None = None,
+            fields: list[str] | None = None,
+        ) -> str:
+            """Count and aggregate the recipes of the collection, without a text search.
+
+            Use it for numeric or aggregate questions ("average IBU of our American
+            IPAs", "how many recipes have OG between 1.060 and 1.070"). The ``*_min``
+            and ``*_max`` arguments are inclusive bounds of ABV (%), IBU, original
+            gravity and color (SRM); names are compared case-insensitively.
+
+            Parameters
+            ----------
+            styles : list[str] | None
+                Accepted style names (e.g. "American IPA").
+            hops : list[str] | None
+                Hops that must all be in the recipe.
+            yeasts : list[str] | None
+                Yeasts that must all be in the recipe.
+            fields : list[str] | None
+                Fields to aggregate, among abv, ibu, og, srm, fg, color, batch_size,
+                boil_size, boil_time and efficiency (default: abv, ibu, og, srm).
+
+            Returns
+            -------
+            str
+                JSON with the number of matching recipes, mean/min/max/median of
+                each field and up to 20 recipe names.
+            """
+            table = self.recipe_table.get()
+            if table is None:
+                return json.dumps({"error": "nenhuma receita ingerida ainda"})
+            recipe_filter = _recipe_filter(
+                styles=styles,
+                hops=hops,
+                yeasts=yeasts,
+                abv_min=abv_min,
+                abv_max=abv_max,
+                ibu_min=ibu_min,
+                ibu_max=ibu_max,
+                og_min=og_min,
+                og_max=og_max,
+                srm_min=srm_min,
+                srm_max=srm_max,
+            )
+            try:
+                stats = table.summarize(recipe_filter, fields or RANGE_FIELDS)
+            except ValueError as e:
+                return json.dumps({"error": str(e)})
+            return json.dumps(stats.to_dict(), ensure_ascii=False)
 
         self.agent = Agent(
             name="BrewingOrchestrator",
             model=self.model,
-            knowledge=self.pdf_kb,  # Initial knowledge base, will be overridden by search_knowledge
-            search_knowledge=_combined_search,  # type: ignore
+            # ``search_knowledge`` only switches the knowledge tool on; agno fetches the
+            # documents for it and for the references through ``retriever``.
+            knowledge=self.pdf_kb,
+            search_knowledge=True,
+            retriever=_retriever,
+            tools=[search_recipes_by_constraints, recipe_statistics],
             add_references=True,
             markdown=True,
             show_tool_calls=True,
@@ -69,6 +330,14 @@ class BrewingOrchestrator:
                     "- Se precisar, formate em a resposta em tópicos, números, listas.",
                     "- Use unidades métricas (°C, L, g).",
                     "- Não invente; se não houver evidência clara, diga que falta dado.",
+                    (
+                        "- Para receitas com restrições de estilo, lúpulo, levedura, ABV, IBU, "
+                        "OG ou SRM, use search_recipes_by_constraints."
+                    ),
+                    (
+                        "- Para contagens, médias e faixas numéricas das receitas da coleção, "
+                        "use recipe_statistics."
+                    ),
                     "- Adote um tom amigável, bem humorado e didático.",
                     "- Seja explicativo em tudo que fizer.",
                     "- Você pode usar emojis e resposta formatada para facilitar a leitura.",
@@ -76,14 +345,280 @@ class BrewingOrchestrator:
             ),
         )
 
+    def _rank_by_position(self, pdf_docs: list, recipe_docs: list) -> list[tuple]:
+        """``(document, score)`` pairs when there is no reranker to score them."""
+        if self.packer is not None:
+            return rank_by_position(pdf_docs, recipe_docs)
+        return [(doc, 0.0) for doc in pdf_docs + recipe_docs]
+
+    def _pack(self, ranked: list[tuple]) -> list:
+        if self.packer is not None:
+            return self.packer.pack(ranked)[0]
+        return [doc for doc, _ in ranked]
+
+    def retrieve_many(self, questions: list[str]) -> list[list]:
+        """Retrieve, rerank and pack the documents of many questions in batches.
+
+        Same result as calling :meth:`search` for each question, but all
+        questions are embedded in one encoder batch, each collection is
+        searched with one ``query_batch_points`` call and every pair is
+        reranked in one cross-encoder pass. Results already in the search
+        cache are reused and new ones are added to it.
+
+        Returns
+        -------
+        list[list]
+            The documents of each question, in the order of ``questions``.
+        """
+        with span("retrieval_batch", questions=len(questions)) as trace_span:
+            per_kb: list[list[list]] = []
+            # Embeddings by (embedder, question index): collections sharing an
+            # embedder encode each question once.
+            vectors: dict[tuple[int, int], list[float]] = {}
+            for kb in (self.pdf_kb, self.recipe_kb):
+                keys = [search_cache_key(kb, q, self.num_documents) for q in questions]
+                results = [self.search_cache.get(key) for key in keys]
+                missing = [i for i, docs in enumerate(results) if docs is None]
+                if missing:
+                    embedder = get_vector_db(kb).embedder
+                    need = [i for i in missing if (id(embedder), i) not in vectors]
+                    computed = embed_queries(
+                        embedder, [questions[i] for i in need], self.embedding_cache
+                    )
+                    vectors.update(
+                        ((id(embedder), i), v) for i, v in zip(need, computed, strict=True)
+                    )
+                    found = search_batch_by_vector(
+                        kb,
+                        [questions[i] for i in missing],
+                        [vectors[(id(embedder), i)] for i in missing],
+                        self.num_documents,
+                        None,
+                        self.search_params,
+                    )
+                    for i, docs in zip(missing, found, strict=True):
+                        results[i] = docs
+                        self.search_cache.set(keys[i], docs)
+                per_kb.append([list(docs) for docs in results])
+
+            pdf_results, recipe_results = per_kb
+            if self.reranker is not None:
+                ranked = self.reranker.score_many(
+                    questions,
+                    [p + r for p, r in zip(pdf_results, recipe_results, strict=True)],
+                )
+            else:
+                ranked = [
+                    self._rank_by_position(p, r)
+                    for p, r in zip(pdf_results, recipe_results, strict=True)
+                ]
+            packed = [self._pack(pairs) for pairs in ranked]
+            trace_span.set(docs=sum(len(docs) for docs in packed))
+        return packed
+
+    def ask_many(
+        self, questions: Iterable[str], concurrency: int = 4, batch_size: int = 64
+    ) -> Iterator[tuple[str, list]]:
+        """Answer many questions, yielding ``(answer, references)`` in input order.
+
+        Questions are retrieved ``batch_size`` at a time with
+        :meth:`retrieve_many`, then answered by ``concurrency`` forks of the
+        agent, so at most ``concurrency`` LLM calls are in flight. Each answer
+        is yielded as soon as it and every earlier one are ready, while later
+        batches keep being retrieved and answered.
+
+        Parameters
+        ----------
+        questions : Iterable[str]
+            The questions, e.g. a FAQ list.
+        concurrency : int, optional
+            Number of agent runs at once, by default ``4``.
+        batch_size : int, optional
+            Questions retrieved per batch, by default ``64``.
+
+        Yields
+        ------
+        tuple[str, list]
+            The same ``(answer, references)`` as :meth:`ask_with_refs`. An
+            exception of a question is raised when its turn comes.
+        """
+        concurrency = max(concurrency, 1)
+        agents: queue.Queue = queue.Queue()
+        for _ in range(concurrency):
+            agents.put(self.fork())
+        pending: deque = deque()
+        questions = iter(questions)
+        with ThreadPoolExecutor(concurrency, thread_name_prefix="ask-many") as executor:
+            try:
+                while batch := list(islice(questions, max(batch_size, 1))):
+                    docs = self.retrieve_many(batch)
+                    for question, question_docs in zip(batch, docs, strict=True):
+                        pending.append(
+                            executor.submit(self._ask_prefetched, agents, question, question_docs)
+                        )
+                    while pending and pending[0].done():
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    @staticmethod
+    def _ask_prefetched(agents: queue.Queue, question: str, docs: list) -> tuple[str, list]:
+        agent = agents.get()
+        token = _prefetched.set({normalize_query(question): docs})
+        try:
+            return agent.ask_with_refs(question)
+        finally:
+            _prefetched.reset(token)
+            agents.put(agent)
+
+    def search(self, query: str, limit: int | None = None) -> list:
+        """Retrieve, rerank and pack the documents of ``query`` as the agent does.
+
+        ``limit`` is the number of documents requested from each collection,
+        by default ``NUM_DOCUMENTS``.
+        """
+        return self._combined_search(query, limit or self.num_documents)
+
+    def search_recipes(
+        self, query: str, limit: int | None = None, recipe_filter: RecipeFilter | None = None
+    ) -> list:
+        """Search recipes similar to ``query`` among those matching ``recipe_filter``."""
+        return search_recipes(
+            self.recipe_kb, query, limit or self.num_documents, recipe_filter, self.search_params
+        )
+
+    def fork(self) -> "BrewingOrchestrator":
+        """Return a copy with its own ``Agent`` sharing everything else.
+
+        An agno ``Agent`` keeps per-run state (``run_response``, session), so
+        concurrent questions need one agent each. The copy shares the knowledge
+        bases, Qdrant clients, models, reranker, retriever and caches.
+        """
+        clone = copy.copy(self)
+        clone.degraded = []
+        clone.agent = self.agent.deep_copy(update={"knowledge": self.pdf_kb})
+        return clone
+
+    def packing_stats(self) -> PackMetrics | None:
+        """Return the cumulative tokens saved by context packing (``None`` when disabled)."""
+        return self.packer.metrics if self.packer is not None else None
+
+    def cache_stats(self) -> dict[str, CacheStats]:
+        """Return hit/miss counters of the query-embedding, search and answer caches."""
+        stats = {
+            "embeddings": self.embedding_cache.stats(),
+            "search": self.search_cache.stats(),
+        }
+        if self.answer_cache is not None:
+            stats["answers"] = self.answer_cache.stats()
+        return stats
+
+    def _question_embedding(self, question: str) -> list[float]:
+        """Embed ``question`` through the query-embedding cache shared with retrieval."""
+        embedder = get_vector_db(self.pdf_kb).embedder
+        key = (getattr(embedder, "id", id(embedder)), normalize_query(question))
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = embedder.get_embedding(question)
+            self.embedding_cache.set(key, embedding)
+        return embedding
+
+    def _cached_answer(self, question: str) -> tuple[CachedAnswer | None, list[float] | None]:
+        """Look ``question`` up in the answer cache; returns the hit and the embedding used."""
+        if self.answer_cache is None:
+            return None, None
+        with span("answer_cache") as trace_span:
+            embedding = self._question_embedding(question)
+            cached = self.answer_cache.get(embedding, question)
+            trace_span.set(hit=cached is not None)
+            if cached is not None:
+                trace_span.set(similarity=round(cached.similarity, 4))
+        return cached, embedding
+
+    def _store_answer(self, question: str, embedding, text: str, refs: list) -> None:
+        if self.answer_cache is None or embedding is None or not text or self.degraded:
+            # An answer built from incomplete context is not reused.
+            return
+        sources = (get_vector_db(self.pdf_kb).collection, get_vector_db(self.recipe_kb).collection)
+        self.answer_cache.set(embedding, question, text, refs, sources)
+
+    @staticmethod
+    def _references(resp) -> list:
+        refs = getattr(resp, "references", None)
+        if refs is None:
+            extra_data = getattr(resp, "extra_data", None)
+            refs = getattr(extra_data, "references", None)
+        return refs or []
+
     def ask(self, question: str) -> str:
-        resp = self.agent.run(question)
         print()
-        self.agent.print_response(question, stream=True)
-        return getattr(resp, "content", str(resp))
+        stream = self.ask_stream(question)
+        while True:
+            try:
+                print(next(stream), end="", flush=True)
+            except StopIteration as stop:
+                text, _ = stop.value
+                break
+        print()
+        return text
+
+    def ask_stream(self, question: str) -> Generator[str, None, tuple[str, list]]:
+        """Answer ``question`` streaming the tokens from a single agent run.
+
+        Yields
+        ------
+        str
+            Each content delta as soon as the model produces it.
+
+        Returns
+        -------
+        tuple[str, list]
+            The full answer text and the references of the same run, available
+            as the ``StopIteration`` value once the generator is exhausted.
+        """
+        parts: list[str] = []
+        self.degraded = []
+        with span("ask", stream=True, question_tokens=count_tokens(question)) as trace_span:
+            cached, embedding = self._cached_answer(question)
+            if cached is not None:
+                yield cached.answer
+                return cached.answer, cached.references
+            token = _degraded.set(self.degraded)
+            try:
+                for event in self.agent.run(question, stream=True):
+                    if getattr(event, "event", None) != RunEvent.run_response_content.value:
+                        continue
+                    content = getattr(event, "content", None)
+                    if isinstance(content, str) and content:
+                        parts.append(content)
+                        yield content
+            finally:
+                _degraded.reset(token)
+            text = "".join(parts)
+            refs = self._references(self.agent.run_response)
+            record_generation(getattr(self.agent.run_response, "metrics", None))
+            trace_span.set(answer_tokens=count_tokens(text), references=len(refs))
+        self._store_answer(question, embedding, text, refs)
+        return text, refs
 
     def ask_with_refs(self, question: str):
-        resp = self.agent.run(question)
-        text = getattr(resp, "content", str(resp))
-        refs = getattr(resp, "references", [])
+        with span("ask", stream=False, question_tokens=count_tokens(question)) as trace_span:
+            cached, embedding = self._cached_answer(question)
+            self.degraded = []
+            if cached is not None:
+                return cached.answer, cached.references
+            token = _degraded.set(self.degraded)
+            try:
+                resp = self.agent.run(question)
+            finally:
+                _degraded.reset(token)
+            text = getattr(resp, "content", str(resp))
+            refs = self._references(resp)
+            record_generation(getattr(resp, "metrics", None))
+            trace_span.set(answer_tokens=count_tokens(str(text)), references=len(refs))
+        if isinstance(text, str):
+            self._store_answer(question, embedding, text, refs)
         return text, refs
@@ -1,39 +1,165 @@
 import argparse
+from dataclasses import dataclass
+from typing import Any, Literal
 
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, SparseVectorParams, VectorParams
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    HnswConfigDiff,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SparseIndexParams,
+    SparseVectorParams,
+    VectorParams,
+)
 
+from brew_oracle.knowledge.beerxml_kb import ensure_recipe_indexes
 from brew_oracle.utils.config import Settings
+from brew_oracle.utils.qdrant import (
+    alias_target,
+    backend_location,
+    get_qdrant_client,
+    resolve_alias,
+)
 
 
-def main(force_recreate: bool = False, hybrid: bool = False, collection_name: str | None = None):
+@dataclass(frozen=True)
+class CollectionProfile:
+    """Storage and index tuning applied when a collection is created.
+
+    Attributes
+    ----------
+    hnsw_m : int
+        Edges per node of the HNSW graph (recall and RAM grow with it).
+    ef_construct : int
+        Candidate list size while building the graph (build time vs. recall).
+    quantization : {"scalar", "binary"} | None
+        Quantized copy of the vectors searched first; results are rescored
+        with the original vectors (see ``SEARCH_RESCORE``/``SEARCH_OVERSAMPLING``).
+    vectors_on_disk : bool
+        Keep the original float vectors memory-mapped on disk.
+    hnsw_on_disk : bool
+        Keep the HNSW graph on disk.
+    payload_on_disk : bool
+        Keep payloads (chunk text and metadata) on disk.
+    sparse_on_disk : bool
+        Keep the sparse (BM25) index on disk in hybrid collections.
+    """
+
+    hnsw_m: int
+    ef_construct: int
+    quantization: Literal["scalar", "binary"] | None = None
+    vectors_on_disk: bool = False
+    hnsw_on_disk: bool = False
+    payload_on_disk: bool = False
+    sparse_on_disk: bool = False
+
+    def vector_params(self, size: int) -> VectorParams:
+        return VectorParams(
+            size=size,
+            distance=Distance.COSINE,
+            hnsw_config=HnswConfigDiff(
+                m=self.hnsw_m, ef_construct=self.ef_construct, on_disk=self.hnsw_on_disk
+            ),
+            quantization_config=self.quantization_config(),
+            on_disk=self.vectors_on_disk,
+        )
+
+    def quantization_config(self) -> ScalarQuantization | BinaryQuantization | None:
+        # The quantized vectors always stay in RAM: they are what HNSW walks.
+        if self.quantization == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        if self.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def sparse_vector_params(self) -> SparseVectorParams:
+        return SparseVectorParams(index=SparseIndexParams(on_disk=self.sparse_on_disk))
+
+
+PROFILES: dict[str, CollectionProfile] = {
+    # Everything in RAM, denser graph and int8 vectors for the fastest searches.
+    "low-latency": CollectionProfile(hnsw_m=32, ef_construct=256, quantization="scalar"),
+    # int8 vectors in RAM, originals and payload on disk (read only to rescore).
+    "balanced": CollectionProfile(
+        hnsw_m=16,
+        ef_construct=128,
+        quantization="scalar",
+        vectors_on_disk=True,
+        payload_on_disk=True,
+    ),
+    # 1-bit vectors in RAM, everything else on disk; needs oversampling to keep recall.
+    "low-memory": CollectionProfile(
+        hnsw_m=8,
+        ef_construct=100,
+        quantization="binary",
+        vectors_on_disk=True,
+        hnsw_on_disk=True,
+        payload_on_disk=True,
+        sparse_on_disk=True,
+    ),
+}
+
+
+def collection_config(
+    s: Settings, hybrid: bool = False, profile: str | None = None
+) -> dict[str, Any]:
+    """Build the ``create_collection`` arguments for ``profile``.
+
+    Without a profile the collection uses Qdrant's defaults, as agno creates it.
+    """
+    tuning = PROFILES[profile] if profile else None
+    dense = (
+        tuning.vector_params(s.EMBEDDER_DIM)
+        if tuning
+        else VectorParams(size=s.EMBEDDER_DIM, distance=Distance.COSINE)
+    )
+    config: dict[str, Any] = {"vectors_config": dense, "sparse_vectors_config": None}
+    if hybrid:
+        config["vectors_config"] = {s.DENSE_VECTOR_NAME: dense}
+        sparse = tuning.sparse_vector_params() if tuning else SparseVectorParams()
+        config["sparse_vectors_config"] = {s.SPARSE_VECTOR_NAME: sparse}
+    if tuning:
+        config["on_disk_payload"] = tuning.payload_on_disk
+    return config
+
+
+def main(
+    force_recreate: bool = False,
+    hybrid: bool = False,
+    collection_name: str | None = None,
+    profile: str | None = None,
+):
     s = Settings()
-    client = QdrantClient(url=s.QDRANT_URL)
+    client = get_qdrant_client(s)
 
     target_collection = collection_name if collection_name else s.QDRANT_COLLECTION
+    profile = profile or s.COLLECTION_PROFILE
+    if profile and profile not in PROFILES:
+        raise ValueError(f"Perfil desconhecido '{profile}'. Use um de: {', '.join(PROFILES)}.")
 
+    if force_recreate and alias_target(client, target_collection) is not None:
+        raise ValueError(
+            f"'{target_collection}' é um alias; use o reindex para reconstruí-lo sem downtime."
+        )
     if force_recreate and client.collection_exists(target_collection):
         client.delete_collection(target_collection)
 
-    if not client.collection_exists(target_collection):
-        vectors_config: VectorParams | dict[str, VectorParams] = VectorParams(
-            size=s.EMBEDDER_DIM, distance=Distance.COSINE
-        )
-        if hybrid:
-            vectors_config = {
-                s.DENSE_VECTOR_NAME: VectorParams(size=s.EMBEDDER_DIM, distance=Distance.COSINE)
-            }
-
-        sparse_vectors_config = None
-        if hybrid:
-            sparse_vectors_config = {s.SPARSE_VECTOR_NAME: SparseVectorParams()}
-
+    if not client.collection_exists(resolve_alias(client, target_collection)):
         client.create_collection(
             collection_name=target_collection,
-            vectors_config=vectors_config,
-            sparse_vectors_config=sparse_vectors_config,
+            **collection_config(s, hybrid=hybrid, profile=profile),
         )
-        return f"Coleção '{target_collection}' criada em {s.QDRANT_URL}"
+        if target_collection == s.QDRANT_RECIPE_COLLECTION and s.VECTOR_BACKEND == "server":
+            ensure_recipe_indexes(client, target_collection)
+        suffix = f" com o perfil '{profile}'" if profile else ""
+        return f"Coleção '{target_collection}' criada em {backend_location(s)}{suffix}"
     else:
         return f"Coleção '{target_collection}' já existe."
 
@@ -51,5 +177,17 @@ if __name__ == "__main__":
         type=str,
         help="Nome da coleção a ser criada (padrão: QDRANT_COLLECTION do .env)",
     )
+    parser.add_argument(
+        "--profile",
+        choices=list(PROFILES),
+        help="Perfil de HNSW/quantização/disco (padrão: COLLECTION_PROFILE do .env)",
+    )
     args = parser.parse_args()
-    main(force_recreate=args.force, hybrid=args.hybrid, collection_name=args.collection)
+    print(
+        main(
+            force_recreate=args.force,
+            hybrid=args.hybrid,
+            collection_name=args.collection,
+            profile=args.profile,
+        )
+    )
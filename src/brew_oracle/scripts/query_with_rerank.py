@@ -2,9 +2,8 @@ from __future__ import annotations
 
 import argparse
 
-from sentence_transformers import CrossEncoder
-
 from brew_oracle.knowledge.pdf_kb import build_pdf_kb
+from brew_oracle.knowledge.rerank import Reranker
 from brew_oracle.utils.config import Settings
 
 
@@ -26,11 +25,8 @@ def main() -> None:
     # Use positional arg to satisfy different backends/signatures
     docs = kb.search(query, s.TOP_K)
 
-    cross_encoder = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
-    pairs = [(query, getattr(doc, "content", getattr(doc, "text", ""))) for doc in docs]
-    scores = cross_encoder.predict(pairs)
-
-    reranked = sorted(zip(docs, scores, strict=False), key=lambda x: x[1], reverse=True)
+    reranker = Reranker.from_settings(s)
+    reranked = reranker.score(query, docs)
 
     for idx, (doc, score) in enumerate(reranked[:5], 1):
         meta = getattr(doc, "meta", {}) or getattr(doc, "metadata", {})
@@ -39,6 +35,9 @@ def main() -> None:
         snippet = (getattr(doc, "content", getattr(doc, "text", ""))).strip().replace("\n", " ")
         print(f"{idx}. score={score:.4f} | {source} p.{page}: {snippet}")
 
+    m = reranker.metrics
+    print(f"\nRerank: {m.candidates} candidatos, {m.scored} pontuados em {m.last_seconds:.3f}s")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,293 @@
+"""Blue/green reindex of a collection served through a Qdrant alias.
+
+``create_collections --force`` deletes the live collection before it is
+rebuilt, so searches fail or come back empty for the whole ingestion. A
+reindex instead
+
+1. creates the next versioned collection (``brew_books_v3``),
+2. ingests every PDF (or recipe) into it, bulk-loaded by default,
+3. checks its point count and waits for its index to be ready,
+4. points the alias (``QDRANT_COLLECTION`` or ``QDRANT_RECIPE_COLLECTION``)
+   at it in one atomic request, and
+5. deletes the old versions, keeping the ``REINDEX_KEEP_VERSIONS`` newest
+   ones for rollback.
+
+Searches go to the previous version until the swap. When a check fails the
+alias is not touched and the new collection is left for inspection; the next
+successful reindex deletes it.
+"""
+
+import argparse
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+from brew_oracle.knowledge.beerxml_kb import checkpoint_path, ensure_recipe_indexes, ingest_recipes
+from brew_oracle.knowledge.ingest import load_state
+from brew_oracle.knowledge.pdf_kb import ingest_pdfs, manifest_path
+from brew_oracle.knowledge.recipe_table import recipe_table_path
+from brew_oracle.scripts.create_collections import PROFILES, collection_config
+from brew_oracle.utils.cache import invalidate_collection
+from brew_oracle.utils.config import Settings
+from brew_oracle.utils.qdrant import (
+    alias_target,
+    get_qdrant_client,
+    swap_alias,
+    wait_until_indexed,
+)
+
+logger = logging.getLogger(__name__)
+
+# Settings field holding the alias of each kind of collection.
+KINDS = {"pdfs": "QDRANT_COLLECTION", "recipes": "QDRANT_RECIPE_COLLECTION"}
+
+
+@dataclass
+class ReindexReport:
+    """Outcome of one reindex."""
+
+    alias: str
+    collection: str
+    points: int
+    previous: str | None = None
+    deleted: list[str] = field(default_factory=list)
+
+
+def version_name(alias: str, version: int) -> str:
+    """Name of version ``version`` of the collection behind ``alias``."""
+    return f"{alias}_v{version}"
+
+
+def list_versions(client: Any, alias: str) -> list[tuple[int, str]]:
+    """``(version, name)`` of every versioned collection of ``alias``, oldest first."""
+    pattern = re.compile(rf"{re.escape(alias)}_v(\d+)")
+    versions = []
+    for description in client.get_collections().collections:
+        match = pattern.fullmatch(description.name)
+        if match:
+            versions.append((int(match.group(1)), description.name))
+    return sorted(versions)
+
+
+def next_version(client: Any, alias: str) -> int:
+    versions = list_versions(client, alias)
+    return versions[-1][0] + 1 if versions else 1
+
+
+def verify_counts(
+    client: Any,
+    collection: str,
+    *,
+    expected: int | None = None,
+    previous: str | None = None,
+    min_ratio: float = 0.9,
+) -> int:
+    """Check the point count of a new version before it goes live; return the count.
+
+    Raises
+    ------
+    RuntimeError
+        If the collection is empty, differs from ``expected`` or holds fewer
+        than ``min_ratio`` times the points of the ``previous`` collection.
+    """
+    count = client.count(collection, exact=True).count
+    if count == 0:
+        raise RuntimeError(f"A coleção '{collection}' ficou vazia.")
+    if expected is not None and count != expected:
+        raise RuntimeError(
+            f"A coleção '{collection}' tem {count} pontos, mas a ingestão gerou {expected}."
+        )
+    if previous is not None:
+        live = client.count(previous, exact=True).count
+        if count < min_ratio * live:
+            raise RuntimeError(
+                f"A coleção '{collection}' tem {count} pontos contra {live} de '{previous}' "
+                f"(mínimo {min_ratio:.0%})."
+            )
+    return count
+
+
+def garbage_collect(
+    client: Any, alias: str, keep: int = 1, previous: str | None = None
+) -> list[str]:
+    """Delete the versions of ``alias`` that are not live; return their names.
+
+    The ``keep`` newest versions up to ``previous`` (the version live before
+    the last swap; by default the one right before the live version) are
+    kept for rollback. Others, such as versions of failed reindexes, are
+    deleted. Nothing is deleted while ``alias`` does not exist.
+    """
+    live = alias_target(client, alias)
+    versions = list_versions(client, alias)
+    numbers = {name: v for v, name in versions}
+    if live not in numbers:
+        return []
+    last = numbers[previous] if previous in numbers else numbers[live] - 1
+    older = [name for v, name in versions if v <= last and name != live]
+    kept = set(older[-keep:]) if keep > 0 else set()
+    deleted = [name for _, name in versions if name != live and name not in kept]
+    for name in deleted:
+        client.delete_collection(name)
+        logger.info("Versão antiga '%s' removida.", name)
+    return deleted
+
+
+def _state_files(s: Settings, kind: str) -> list[str]:
+    """Ingestion state files (manifest, recipe table) of the collection named in ``s``."""
+    if kind == "pdfs":
+        return [manifest_path(s)]
+    return [recipe_table_path(s), checkpoint_path(s)]
+
+
+def reindex(
+    kind: str = "pdfs",
+    *,
+    hybrid: bool = False,
+    profile: str | None = None,
+    workers: int | None = None,
+    bulk: bool = True,
+    keep: int | None = None,
+    min_ratio: float | None = None,
+    replace_collection: bool = False,
+) -> ReindexReport:
+    """Rebuild the PDF or recipe collection into a new version and swap its alias.
+
+    Parameters
+    ----------
+    kind : {"pdfs", "recipes"}, optional
+        Which collection to rebuild, by default ``"pdfs"``.
+    hybrid : bool, optional
+        Create and fill the new version with sparse BM25 vectors too.
+    profile : str | None, optional
+        Collection profile of the new version, by default ``COLLECTION_PROFILE``.
+    workers : int | None, optional
+        Parsing processes of the ingestion, by default ``INGEST_WORKERS``.
+    bulk : bool, optional
+        Bulk-load the new version (nothing searches it yet), by default ``True``.
+    keep : int | None, optional
+        Old versions kept after the swap, by default ``REINDEX_KEEP_VERSIONS``.
+    min_ratio : float | None, optional
+        Minimum size of the new version relative to the live one, by default
+        ``REINDEX_MIN_COUNT_RATIO``.
+    replace_collection : bool, optional
+        Allow replacing a plain collection named like the alias (a setup from
+        before aliases). It is deleted right before the alias is created, so
+        searches fail for that instant only.
+
+    Returns
+    -------
+    ReindexReport
+        The alias, the new and previous collections and the deleted versions.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Tipo inválido '{kind}'. Use um de: {', '.join(KINDS)}.")
+    s = Settings()
+    profile = profile or s.COLLECTION_PROFILE
+    if profile and profile not in PROFILES:
+        raise ValueError(f"Perfil desconhecido '{profile}'. Use um de: {', '.join(PROFILES)}.")
+    keep = s.REINDEX_KEEP_VERSIONS if keep is None else keep
+    min_ratio = s.REINDEX_MIN_COUNT_RATIO if min_ratio is None else min_ratio
+    client = get_qdrant_client(s)
+
+    alias = getattr(s, KINDS[kind])
+    previous = alias_target(client, alias)
+    legacy = previous is None and client.collection_exists(alias)
+    if legacy and not replace_collection:
+        raise ValueError(
+            f"'{alias}' é uma coleção, não um alias. Use --replace-collection para "
+            "substituí-la pela nova versão."
+        )
+
+    name = version_name(alias, next_version(client, alias))
+    target = s.model_copy(update={KINDS[kind]: name})
+    client.create_collection(
+        collection_name=name, **collection_config(s, hybrid=hybrid, profile=profile)
+    )
+    logger.info("Reindexando '%s' em '%s'.", alias, name)
+
+    expected = None
+    if kind == "pdfs":
+        ingest_pdfs(hybrid=hybrid, workers=workers, bulk=bulk, s=target)
+        files = load_state(manifest_path(target)).get("files", {})
+        expected = len({chunk for entry in files.values() for chunk in entry["chunks"]})
+    else:
+        if s.VECTOR_BACKEND == "server":
+            ensure_recipe_indexes(client, name)
+        ingest_recipes(hybrid=hybrid, resume=False, workers=workers, bulk=bulk, s=target)
+
+    wait_until_indexed(client, name, timeout=3600.0)
+    points = verify_counts(
+        client,
+        name,
+        expected=expected,
+        previous=previous or (alias if legacy else None),
+        min_ratio=min_ratio,
+    )
+
+    if legacy:
+        logger.warning("Removendo a coleção '%s' para criar o alias.", alias)
+        client.delete_collection(alias)
+    swap_alias(client, alias, name)
+    invalidate_collection(alias, s.INGEST_STATE_DIR)
+    # The incremental manifest and the recipe table now describe the live version.
+    for src, dst in zip(_state_files(target, kind), _state_files(s, kind), strict=True):
+        if os.path.exists(src):
+            os.replace(src, dst)
+
+    deleted = garbage_collect(client, alias, keep, previous)
+    for old in deleted:
+        for path in _state_files(s.model_copy(update={KINDS[kind]: old}), kind):
+            if os.path.exists(path):
+                os.remove(path)
+    logger.info("Alias '%s' aponta para '%s' (%d pontos).", alias, name, points)
+    return ReindexReport(alias, name, points, previous=previous, deleted=deleted)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Reconstrói uma coleção numa nova versão e troca o alias sem downtime"
+    )
+    parser.add_argument("kind", choices=list(KINDS), help="Coleção a reconstruir")
+    parser.add_argument(
+        "--hybrid", action="store_true", help="Inclui vetores esparsos (BM25) na nova versão"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=list(PROFILES),
+        help="Perfil de HNSW/quantização/disco (padrão: COLLECTION_PROFILE do .env)",
+    )
+    parser.add_argument("--workers", type=int, help="Processos de leitura dos arquivos")
+    parser.add_argument(
+        "--no-bulk", action="store_true", help="Grava com upserts em vez de upload_points"
+    )
+    parser.add_argument(
+        "--keep", type=int, help="Versões antigas mantidas (padrão: REINDEX_KEEP_VERSIONS)"
+    )
+    parser.add_argument(
+        "--min-ratio",
+        type=float,
+        help="Tamanho mínimo da nova versão frente à atual (padrão: REINDEX_MIN_COUNT_RATIO)",
+    )
+    parser.add_argument(
+        "--replace-collection",
+        action="store_true",
+        help="Substitui uma coleção comum com o nome do alias (primeira migração)",
+    )
+    args = parser.parse_args()
+    report = reindex(
+        args.kind,
+        hybrid=args.hybrid,
+        profile=args.profile,
+        workers=args.workers,
+        bulk=not args.no_bulk,
+        keep=args.keep,
+        min_ratio=args.min_ratio,
+        replace_collection=args.replace_collection,
+    )
+    print(
+        f"Alias '{report.alias}' -> '{report.collection}' ({report.points} pontos); "
+        f"removidas: {', '.join(report.deleted) or 'nenhuma'}"
+    )
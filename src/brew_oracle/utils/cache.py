@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+# Caches whose entries depend on Qdrant collections; each has ``invalidate_collection``.
+_collection_caches: weakref.WeakSet = weakref.WeakSet()
+
+
+def generation_path(state_dir: str, collection: str) -> str:
+    """File whose content changes every time ``collection`` is re-ingested."""
+    return os.path.join(state_dir, "generations", collection)
+
+
+def bump_generation(state_dir: str, collection: str) -> None:
+    """Mark ``collection`` as changed for the caches of every process (see :class:`Generations`)."""
+    path = generation_path(state_dir, collection)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(uuid.uuid4().hex)
+    os.replace(tmp, path)
+
+
+class Generations:
+    """Watch the collection generation files written by ingestions in other processes.
+
+    Parameters
+    ----------
+    state_dir : str
+        ``INGEST_STATE_DIR`` of the ingestions.
+    interval : float, optional
+        Minimum seconds between two reads of the generation files, by default ``2.0``.
+    """
+
+    def __init__(
+        self,
+        state_dir: str,
+        interval: float = 2.0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.path = os.path.dirname(generation_path(state_dir, "_"))
+        self.interval = interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._seen = self._read()
+        self._next_check = clock() + interval
+
+    def _read(self) -> dict[str, str]:
+        generations = {}
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return {}
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            try:
+                with open(os.path.join(self.path, name), encoding="utf-8") as f:
+                    generations[name] = f.read()
+            except FileNotFoundError:
+                continue
+        return generations
+
+    def changed(self) -> list[str]:
+        """Collections bumped since the previous call (checked at most every ``interval``)."""
+        with self._lock:
+            now = self._clock()
+            if now < self._next_check:
+                return []
+            self._next_check = now + self.interval
+            current = self._read()
+            changed = [name for name, gen in current.items() if self._seen.get(name) != gen]
+            self._seen = current
+        return changed
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """Snapshot of the counters of a :class:`TTLCache`."""
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of entries; ``0`` disables the cache.
+    ttl : float | None, optional
+        Time to live of each entry in seconds, by default ``None`` (no expiry).
+    collection_scoped : bool, optional
+        When ``True`` the keys are tuples whose first item is a Qdrant collection
+        name, and :func:`invalidate_collection` drops the matching entries. By
+        default ``False``.
+    generations : Generations | None, optional
+        Generation files checked on lookups, so that ingestions run by other
+        processes also drop the entries of their collection. Only used with
+        ``collection_scoped``; by default ``None``.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float | None = None,
+        *,
+        collection_scoped: bool = False,
+        generations: Generations | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generations = generations if collection_scoped else None
+        if collection_scoped:
+            register_collection_cache(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value stored under ``key``, or ``default`` on a miss."""
+        if self.generations is not None:
+            for collection in self.generations.changed():
+                self.invalidate_collection(collection)
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at >= self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entry."""
+        if self.maxsize <= 0:
+            return
+        expires_at = self._clock() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches ``predicate``; return how many."""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def invalidate_collection(self, collection: str) -> int:
+        """Drop the entries whose key starts with ``collection``; return how many."""
+        return self.invalidate(
+            lambda key: isinstance(key, tuple) and bool(key) and key[0] == collection
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                size=len(self._data),
+                maxsize=self.maxsize,
+            )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a question for use as a cache key (case and whitespace)."""
+    return " ".join(text.casefold().split())
+
+
+def register_collection_cache(cache: Any) -> None:
+    """Have :func:`invalidate_collection` also reach ``cache`` (kept by weak reference).
+
+    ``cache`` must provide ``invalidate_collection(collection) -> int``.
+    """
+    _collection_caches.add(cache)
+
+
+def invalidate_collection(collection: str, state_dir: str | None = None) -> int:
+    """Drop cached entries of ``collection`` from every collection-scoped cache.
+
+    Called by the ingestion functions after they change a collection. With
+    ``state_dir`` the collection's generation file is bumped too, so caches
+    of other processes watching it (see :class:`Generations`) drop their
+    entries on their next lookup.
+
+    Returns
+    -------
+    int
+        Number of entries removed.
+    """
+    if state_dir is not None:
+        bump_generation(state_dir, collection)
+    return sum(cache.invalidate_collection(collection) for cache in list(_collection_caches))
@@ -3,25 +3,78 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
+    VECTOR_BACKEND: str = Field(default="server")
+    QDRANT_LOCAL_PATH: str = Field(default=".brew_oracle/qdrant")
     QDRANT_URL: str = Field(default="http://localhost:6333")
+    QDRANT_API_KEY: str | None = Field(default=None)
+    QDRANT_PREFER_GRPC: bool = Field(default=False)
+    QDRANT_GRPC_PORT: int = Field(default=6334)
+    QDRANT_TIMEOUT: int = Field(default=10)
+    QDRANT_RETRIES: int = Field(default=3)
+    QDRANT_POOL_SIZE: int = Field(default=16)
+    QDRANT_KEEPALIVE_SECONDS: float = Field(default=30.0)
     QDRANT_COLLECTION: str = Field(default="brew_books")
     DENSE_VECTOR_NAME: str = Field(default="dense")
     SPARSE_VECTOR_NAME: str = Field(default="sparse")
     SPARSE_MODEL_ID: str = Field(default="Qdrant/bm25")
+    COLLECTION_PROFILE: str | None = Field(default=None)
+    REINDEX_KEEP_VERSIONS: int = Field(default=1)
+    REINDEX_MIN_COUNT_RATIO: float = Field(default=0.9)
 
     PDF_PATH: str = Field(default="knowledge/pdfs")
     BEERXML_PATH: str = Field(default="knowledge/recipes")
+    INGEST_STATE_DIR: str = Field(default=".brew_oracle")
+    INGEST_BATCH_SIZE: int = Field(default=64)
+    INGEST_WORKERS: int = Field(default=1)
+    INGEST_PAGES_PER_TASK: int = Field(default=8)
+    INGEST_QUEUE_SIZE: int = Field(default=256)
+    INGEST_BULK: bool = Field(default=False)
+    INGEST_UPLOAD_BATCH_SIZE: int = Field(default=256)
+    INGEST_UPLOAD_PARALLEL: int = Field(default=2)
+    EMBEDDING_STORE_DIR: str | None = Field(default=".brew_oracle/embeddings")
+    EMBEDDING_STORE_DTYPE: str = Field(default="float32")
 
     QDRANT_RECIPE_COLLECTION: str = Field(default="brew_recipes")
 
     EMBEDDER_ID: str = Field(default="./models/all-MiniLM-L6-v2")
     EMBEDDER_DIM: int = Field(default=384)
+    EMBEDDER_BACKEND: str = Field(default="torch")
+    EMBEDDER_MIN_COSINE: float = Field(default=0.98)
 
     TOP_K: int = Field(default=20)
 
     CHUNK_SIZE: int = Field(default=2000)
     CHUNK_OVERLAP: int = Field(default=300)
     NUM_DOCUMENTS: int = Field(default=5)
+    RETRIEVAL_TIMEOUT: float = Field(default=5.0)
+    RETRIEVAL_WORKERS: int | None = Field(default=None)
+    SEARCH_HNSW_EF: int | None = Field(default=None)
+    SEARCH_OVERSAMPLING: float | None = Field(default=None)
+    SEARCH_RESCORE: bool = Field(default=True)
+
+    RERANK_MAX_CANDIDATES: int = Field(default=20)
+    RERANK_BATCH_SIZE: int = Field(default=16)
+    RERANK_MAX_LENGTH: int = Field(default=256)
+    RERANK_MAX_CHARS: int = Field(default=1000)
+    RERANK_CACHE_SIZE: int = Field(default=2048)
+
+    CONTEXT_PACKING: bool = Field(default=False)
+    CONTEXT_TOKEN_BUDGET: int | None = Field(default=3000)
+
+    CACHE_MAXSIZE: int = Field(default=256)
+    CACHE_TTL_SECONDS: float | None = Field(default=3600.0)
+    CACHE_SYNC_SECONDS: float = Field(default=2.0)
+    ANSWER_CACHE_SIZE: int = Field(default=1024)
+    ANSWER_CACHE_THRESHOLD: float = Field(default=0.95)
+    ANSWER_CACHE_TTL_SECONDS: float | None = Field(default=86400.0)
+
+    SERVER_HOST: str = Field(default="127.0.0.1")
+    SERVER_PORT: int = Field(default=8000)
+    SERVER_WORKERS: int = Field(default=4)
+    SERVER_MAX_PENDING: int = Field(default=32)
+
+    TRACE_ENABLED: bool = Field(default=False)
+    TRACE_PATH: str = Field(default=".brew_oracle/traces.jsonl")
 
     GOOGLE_API_KEY: str | None = Field(default=None)
 
@@ -0,0 +1,237 @@
+"""Persistent store of chunk embeddings keyed by (model id, text hash).
+
+Changing the chunking, recreating a collection or switching between dense
+and hybrid search re-embeds every chunk, although most texts did not change.
+:class:`EmbeddingStore` keeps each embedding on disk next to the md5 of the
+text it came from, so ingestion only sends unseen texts to the encoder.
+
+Every model has its own folder under the store root (see :func:`store_path`):
+
+- ``vectors.bin``: one row of ``dimensions`` values of ``dtype`` per text,
+  read through a NumPy memmap;
+- ``keys.bin``: the 16-byte md5 of the text of each row, in the same order;
+- ``meta.json``: model id, dimensions and dtype;
+- ``lock``: taken with ``fcntl.flock`` by the process appending rows.
+
+Both files are append-only and a row only counts once its key is written,
+so an interrupted write leaves at most a partial tail that the next writer
+discards. Several processes (e.g. two ingestions) may share a store: each
+append holds the ``lock`` file and first reads the rows the others added.
+Where ``fcntl`` is missing (Windows) there is no such lock, so run only one
+ingestion at a time there.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+DTYPES = ("float32", "float16")
+_KEY_BYTES = 16
+
+_stores: dict[str, "EmbeddingStore"] = {}
+_stores_lock = threading.Lock()
+
+
+def text_key(text: str) -> bytes:
+    """Return the md5 digest identifying ``text`` in the store."""
+    return hashlib.md5(text.encode()).digest()
+
+
+def store_path(root: str, model_id: str, dtype: str = "float32") -> str:
+    """Folder of the embeddings of ``model_id`` (readable name plus a hash of the full id)."""
+    name = re.sub(r"[^\w.-]+", "_", os.path.basename(model_id.rstrip("/\\"))) or "model"
+    digest = hashlib.sha1(model_id.encode()).hexdigest()[:8]
+    return os.path.join(root, f"{name}-{digest}-{dtype}")
+
+
+class EmbeddingStore:
+    """Append-only on-disk map from text to embedding for one model.
+
+    Parameters
+    ----------
+    root : str
+        Folder holding the stores of every model.
+    model_id : str
+        Id of the embedding model (the embedder ``id``, which names the backend).
+    dimensions : int
+        Dimension of the vectors.
+    dtype : str, optional
+        ``"float32"`` (default, exact) or ``"float16"`` (half the disk, vectors
+        rounded to about 3 significant digits).
+    """
+
+    def __init__(self, root: str, model_id: str, dimensions: int, dtype: str = "float32") -> None:
+        if dtype not in DTYPES:
+            raise ValueError(
+                f"EMBEDDING_STORE_DTYPE inválido '{dtype}'. Use um de: {', '.join(DTYPES)}."
+            )
+        self.model_id = model_id
+        self.dimensions = dimensions
+        self.dtype = np.dtype(dtype)
+        self.path = store_path(root, model_id, dtype)
+        self._vectors_path = os.path.join(self.path, "vectors.bin")
+        self._keys_path = os.path.join(self.path, "keys.bin")
+        self._lock_path = os.path.join(self.path, "lock")
+        self._row_bytes = dimensions * self.dtype.itemsize
+        self._lock = threading.Lock()
+        self._map: np.memmap | None = None
+        self._index: dict[bytes, int] = {}
+        self._rows = 0
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.path, exist_ok=True)
+        self._check_meta()
+        with self._file_lock():
+            self._sync()
+
+    def _check_meta(self) -> None:
+        meta_path = os.path.join(self.path, "meta.json")
+        meta = {"model_id": self.model_id, "dimensions": self.dimensions, "dtype": self.dtype.name}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("dimensions") != self.dimensions:
+                raise ValueError(
+                    f"O cache de embeddings em '{self.path}' tem vetores de "
+                    f"{stored.get('dimensions')} dimensões, não {self.dimensions}."
+                )
+            return
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold the store's ``lock`` file, excluding the other processes' writes."""
+        with open(self._lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _sync(self) -> None:
+        """Index the rows appended since the last sync and drop partial tails.
+
+        Call with the file lock held: the tails are then left by interrupted
+        writes, not by a write in progress.
+        """
+        with open(self._keys_path, "ab+") as f:
+            f.seek(self._rows * _KEY_BYTES)
+            keys = f.read()
+        vectors_size = (
+            os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        )
+        rows = min(self._rows + len(keys) // _KEY_BYTES, vectors_size // self._row_bytes)
+        for path, size in (
+            (self._keys_path, rows * _KEY_BYTES),
+            (self._vectors_path, rows * self._row_bytes),
+        ):
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                logger.warning("Descartando escrita incompleta em '%s'.", path)
+                os.truncate(path, size)
+        for i, row in enumerate(range(self._rows, rows)):
+            self._index.setdefault(keys[i * _KEY_BYTES : (i + 1) * _KEY_BYTES], row)
+        self._rows = rows
+
+    def _vectors(self) -> np.ndarray:
+        """Memmap over every committed row, re-opened when the file has grown."""
+        if self._map is None or len(self._map) < self._rows:
+            self._map = np.memmap(
+                self._vectors_path, dtype=self.dtype, mode="r", shape=(self._rows, self.dimensions)
+            )
+        return self._map
+
+    def get_many(self, texts: Sequence[str]) -> list[list[float] | None]:
+        """Return the stored embedding of each text, or ``None`` where it is unknown."""
+        with self._lock:
+            rows = [self._index.get(text_key(text)) for text in texts]
+            found = [row for row in rows if row is not None]
+            self.hits += len(found)
+            self.misses += len(rows) - len(found)
+            if not found:
+                return [None] * len(texts)
+            vectors = self._vectors()[found].astype(np.float32)
+        values = iter(vectors.tolist())
+        return [next(values) if row is not None else None for row in rows]
+
+    def put_many(self, texts: Sequence[str], embeddings: Sequence[Any]) -> int:
+        """Store the embeddings of the texts not stored yet; return how many were added."""
+        with self._lock, self._file_lock():
+            self._sync()
+            new: dict[bytes, Any] = {}
+            for text, embedding in zip(texts, embeddings, strict=True):
+                key = text_key(text)
+                if key not in self._index:
+                    new.setdefault(key, embedding)
+            if not new:
+                return 0
+            vectors = np.asarray(list(new.values()), dtype=np.float32)
+            if vectors.shape[1] != self.dimensions:
+                raise ValueError(
+                    f"Embeddings de {vectors.shape[1]} dimensões num cache de {self.dimensions}."
+                )
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.astype(self.dtype).tobytes())
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(new))
+            for key in new:
+                self._index[key] = self._rows
+                self._rows += 1
+            return len(new)
+
+    def __contains__(self, text: str) -> bool:
+        with self._lock:
+            return text_key(text) in self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+
+def get_embedding_store(
+    root: str, model_id: str, dimensions: int, dtype: str = "float32"
+) -> EmbeddingStore:
+    """Return the process-wide :class:`EmbeddingStore` of ``model_id`` under ``root``."""
+    path = store_path(os.path.abspath(root), model_id, dtype)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = EmbeddingStore(root, model_id, dimensions, dtype)
+        return store
+
+
+def open_embedding_store(s: Any, embedder: Any) -> EmbeddingStore | None:
+    """The store of ``embedder`` configured by :class:`Settings`, or ``None`` if disabled.
+
+    ``EMBEDDING_STORE_DIR`` set to ``None`` or an empty string disables it.
+    """
+    if not s.EMBEDDING_STORE_DIR:
+        return None
+    model_id = str(getattr(embedder, "id", type(embedder).__name__))
+    return get_embedding_store(
+        s.EMBEDDING_STORE_DIR, model_id, embedder.dimensions, s.EMBEDDING_STORE_DTYPE
+    )
+
+
+def clear_embedding_stores() -> None:
+    """Forget the open stores (mainly for tests); the files stay on disk."""
+    with _stores_lock:
+        _stores.clear()
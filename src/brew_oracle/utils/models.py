@@ -0,0 +1,206 @@
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_models: dict[tuple[str, str], Any] = {}
+_stats: dict[tuple[str, str], "ModelStats"] = {}
+
+
+@dataclass(frozen=True)
+class ModelStats:
+    """Load metrics of a model kept by the registry."""
+
+    kind: str
+    model_id: str
+    load_seconds: float
+    memory_bytes: int
+
+
+def resolve_model_id(model_id: str) -> str:
+    """Return an absolute path for local model folders, or ``model_id`` unchanged."""
+    if os.path.isdir(model_id):
+        return os.path.abspath(model_id)
+    return model_id
+
+
+def _memory_bytes(model: Any) -> int:
+    """Estimate the memory held by the weights (parameters + buffers) of ``model``."""
+    module = model if hasattr(model, "parameters") else getattr(model, "model", None)
+    if module is None or not hasattr(module, "parameters"):
+        return 0
+    total = 0
+    try:
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            total += tensor.numel() * tensor.element_size()
+    except (AttributeError, TypeError):
+        return 0
+    return total
+
+
+def _get_or_load(kind: str, key: str, factory: Callable[[], Any], track: bool = True) -> Any:
+    """Return the cached model for ``(kind, key)``, loading it with ``factory`` once.
+
+    ``track=False`` caches the object without recording load metrics, for thin
+    wrappers around a model that is already tracked.
+    """
+    cache_key = (kind, key)
+    model = _models.get(cache_key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(cache_key)
+        if model is not None:
+            return model
+        start = time.perf_counter()
+        model = factory()
+        elapsed = time.perf_counter() - start
+        stats = ModelStats(
+            kind=kind, model_id=key, load_seconds=elapsed, memory_bytes=_memory_bytes(model)
+        )
+        _models[cache_key] = model
+        if not track:
+            return model
+        _stats[cache_key] = stats
+    logger.info(
+        "Loaded %s '%s' in %.2fs (%.1f MB).",
+        kind,
+        key,
+        stats.load_seconds,
+        stats.memory_bytes / 1024**2,
+    )
+    return model
+
+
+EMBEDDER_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# ONNX files written next to the model by ``download_model.py --onnx``.
+ONNX_FILE_NAMES = {"onnx": "onnx/model.onnx", "onnx-int8": "onnx/model_qint8.onnx"}
+
+
+def _check_backend(backend: str) -> None:
+    if backend not in EMBEDDER_BACKENDS:
+        choices = ", ".join(EMBEDDER_BACKENDS)
+        raise ValueError(f"EMBEDDER_BACKEND inválido '{backend}'. Use um de: {choices}.")
+
+
+def _backend_key(model_id: str, backend: str) -> str:
+    return model_id if backend == "torch" else f"{model_id}#{backend}"
+
+
+def get_sentence_transformer(model_id: str, backend: str = "torch") -> Any:
+    """Return the process-wide ``SentenceTransformer`` for ``model_id``.
+
+    ``backend`` is ``"torch"`` (PyTorch weights), ``"onnx"`` or
+    ``"onnx-int8"`` (ONNX Runtime with the files of :data:`ONNX_FILE_NAMES`,
+    exported by ``download_model.py --onnx``; needs ``optimum[onnxruntime]``).
+    """
+    _check_backend(backend)
+    model_id = resolve_model_id(model_id)
+
+    def _factory() -> Any:
+        from sentence_transformers import SentenceTransformer
+
+        if backend == "torch":
+            return SentenceTransformer(model_id)
+        return SentenceTransformer(
+            model_id, backend="onnx", model_kwargs={"file_name": ONNX_FILE_NAMES[backend]}
+        )
+
+    return _get_or_load("sentence_transformer", _backend_key(model_id, backend), _factory)
+
+
+def get_embedder(model_id: str, dimensions: int, backend: str = "torch") -> Any:
+    """Return a ``SentenceTransformerEmbedder`` backed by the shared model.
+
+    Parameters
+    ----------
+    model_id : str
+        Hugging Face id or local folder of the embedding model.
+    dimensions : int
+        Dimension of the generated vectors.
+    backend : str, optional
+        Inference backend, one of :data:`EMBEDDER_BACKENDS`, by default ``"torch"``.
+
+    Returns
+    -------
+    SentenceTransformerEmbedder
+        The same embedder instance for every caller in the process. Its
+        ``id`` names the ONNX backends (``<model>#onnx-int8``) so caches keyed
+        by it keep their vectors apart from the PyTorch ones.
+    """
+    _check_backend(backend)
+    model_id = resolve_model_id(model_id)
+    key = _backend_key(model_id, backend)
+
+    def _factory() -> Any:
+        from agno.embedder.sentence_transformer import SentenceTransformerEmbedder
+
+        return SentenceTransformerEmbedder(
+            id=key,
+            dimensions=dimensions,
+            sentence_transformer_client=get_sentence_transformer(model_id, backend),
+        )
+
+    return _get_or_load("embedder", f"{key}@{dimensions}", _factory, track=False)
+
+
+def export_onnx(model_id: str, quantization: str = "avx2") -> dict[str, str]:
+    """Export ``model_id`` (a local folder) to the ONNX files of :data:`ONNX_FILE_NAMES`.
+
+    The float32 graph is exported from the PyTorch weights and then
+    dynamically quantized to int8 for the ``quantization`` instruction set
+    (``"avx2"``, ``"avx512"``, ``"avx512_vnni"`` or ``"arm64"``).
+
+    Returns
+    -------
+    dict[str, str]
+        Path of the file written for each ONNX backend.
+    """
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+    from sentence_transformers.models import Transformer
+
+    model_id = resolve_model_id(model_id)
+    model = SentenceTransformer(model_id, backend="onnx")
+    transformer = model[0]
+    if not isinstance(transformer, Transformer):
+        raise TypeError(f"'{model_id}' não começa com um módulo Transformer.")
+    transformer.auto_model.save_pretrained(os.path.join(model_id, "onnx"))
+    export_dynamic_quantized_onnx_model(model, quantization, model_id, file_suffix="qint8")
+    return {name: os.path.join(model_id, file) for name, file in ONNX_FILE_NAMES.items()}
+
+
+def get_cross_encoder(model_id: str, **kwargs: Any) -> Any:
+    """Return the process-wide ``CrossEncoder`` for ``model_id`` and ``kwargs``."""
+    model_id = resolve_model_id(model_id)
+    key = model_id
+    if kwargs:
+        key += "?" + "&".join(f"{k}={kwargs[k]!r}" for k in sorted(kwargs))
+
+    def _factory() -> Any:
+        from sentence_transformers import CrossEncoder
+
+        return CrossEncoder(model_id, **kwargs)
+
+    return _get_or_load("cross_encoder", key, _factory)
+
+
+def model_stats() -> list[ModelStats]:
+    """Return load time and memory of every model loaded so far."""
+    with _lock:
+        return list(_stats.values())
+
+
+def clear_models() -> None:
+    """Drop every cached model (mainly for tests)."""
+    with _lock:
+        _models.clear()
+        _stats.clear()
@@ -0,0 +1,252 @@
+import json
+import logging
+import threading
+import time
+from typing import Any
+
+from brew_oracle.utils.config import Settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_clients: dict[tuple, Any] = {}
+
+VECTOR_BACKENDS = ("server", "memory", "local")
+
+
+def is_embedded(s: Settings) -> bool:
+    """Whether ``VECTOR_BACKEND`` runs Qdrant inside this process (no server)."""
+    if s.VECTOR_BACKEND not in VECTOR_BACKENDS:
+        choices = ", ".join(VECTOR_BACKENDS)
+        raise ValueError(f"VECTOR_BACKEND inválido '{s.VECTOR_BACKEND}'. Use um de: {choices}.")
+    return s.VECTOR_BACKEND != "server"
+
+
+def backend_location(s: Settings) -> str:
+    """Human-readable location of the vector store, for logs and messages."""
+    if s.VECTOR_BACKEND == "memory":
+        return ":memory:"
+    if s.VECTOR_BACKEND == "local":
+        return s.QDRANT_LOCAL_PATH
+    return s.QDRANT_URL
+
+
+def _settings_key(s: Settings) -> tuple:
+    return (
+        s.VECTOR_BACKEND,
+        s.QDRANT_LOCAL_PATH,
+        s.QDRANT_URL,
+        s.QDRANT_API_KEY,
+        s.QDRANT_PREFER_GRPC,
+        s.QDRANT_GRPC_PORT,
+        s.QDRANT_TIMEOUT,
+        s.QDRANT_RETRIES,
+        s.QDRANT_POOL_SIZE,
+        s.QDRANT_KEEPALIVE_SECONDS,
+    )
+
+
+def _grpc_options(s: Settings) -> dict[str, Any]:
+    """Keep-alive pings and retries of UNAVAILABLE calls for the gRPC channel."""
+    retry_policy = {
+        "maxAttempts": min(max(s.QDRANT_RETRIES + 1, 2), 5),
+        "initialBackoff": "0.1s",
+        "maxBackoff": "2s",
+        "backoffMultiplier": 2,
+        "retryableStatusCodes": ["UNAVAILABLE"],
+    }
+    return {
+        "grpc.keepalive_time_ms": int(s.QDRANT_KEEPALIVE_SECONDS * 1000),
+        "grpc.keepalive_permit_without_calls": 1,
+        "grpc.enable_retries": 1,
+        "grpc.service_config": json.dumps(
+            {"methodConfig": [{"name": [{}], "retryPolicy": retry_policy}]}
+        ),
+    }
+
+
+def client_kwargs(
+    s: Settings, asynchronous: bool = False, *, picklable: bool = False
+) -> dict[str, Any]:
+    """Build the ``QdrantClient``/``AsyncQdrantClient`` arguments from :class:`Settings`.
+
+    REST connections are kept alive in a pool of ``QDRANT_POOL_SIZE`` (qdrant-client
+    disables keep-alive for ``localhost`` unless limits are given) and
+    connection failures are retried ``QDRANT_RETRIES`` times by the httpx
+    transport. With ``QDRANT_PREFER_GRPC`` the gRPC channel on
+    ``QDRANT_GRPC_PORT`` is used instead.
+
+    With ``VECTOR_BACKEND=memory`` or ``local`` qdrant-client's embedded mode
+    is used instead of a server: everything in RAM, or persisted under
+    ``QDRANT_LOCAL_PATH``.
+
+    With ``picklable`` the httpx transport (which holds an ``SSLContext``) is
+    left out and only the pool limits are passed: ``upload_points`` with
+    ``parallel > 1`` pickles the REST arguments into its worker processes.
+    Requests are then retried by ``upload_points`` instead of the transport.
+    """
+    if is_embedded(s):
+        if s.VECTOR_BACKEND == "memory":
+            return {"location": ":memory:"}
+        return {"path": s.QDRANT_LOCAL_PATH}
+
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=s.QDRANT_POOL_SIZE,
+        max_keepalive_connections=s.QDRANT_POOL_SIZE,
+        keepalive_expiry=s.QDRANT_KEEPALIVE_SECONDS,
+    )
+    kwargs: dict[str, Any] = {
+        "url": s.QDRANT_URL,
+        "api_key": s.QDRANT_API_KEY,
+        "prefer_grpc": s.QDRANT_PREFER_GRPC,
+        "grpc_port": s.QDRANT_GRPC_PORT,
+        "timeout": s.QDRANT_TIMEOUT,
+        "grpc_options": _grpc_options(s),
+    }
+    if picklable:
+        kwargs["limits"] = limits
+        return kwargs
+    transport_cls = httpx.AsyncHTTPTransport if asynchronous else httpx.HTTPTransport
+    kwargs["transport"] = transport_cls(retries=s.QDRANT_RETRIES, limits=limits)
+    return kwargs
+
+
+def _get_or_create(
+    kind: str, s: Settings | None, asynchronous: bool, picklable: bool = False
+) -> Any:
+    s = s or Settings()
+    key = (kind, *_settings_key(s))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            import qdrant_client
+
+            cls = qdrant_client.AsyncQdrantClient if asynchronous else qdrant_client.QdrantClient
+            client = cls(**client_kwargs(s, asynchronous, picklable=picklable))
+            _clients[key] = client
+            transport = "gRPC" if s.QDRANT_PREFER_GRPC else "REST"
+            logger.debug(
+                "Created %s Qdrant client for '%s' (%s).",
+                kind,
+                backend_location(s),
+                s.VECTOR_BACKEND if is_embedded(s) else transport,
+            )
+    return client
+
+
+def get_qdrant_client(s: Settings | None = None) -> Any:
+    """Return the process-wide ``QdrantClient`` for the connection settings in ``s``."""
+    return _get_or_create("sync", s, asynchronous=False)
+
+
+def get_upload_client(s: Settings | None = None) -> Any:
+    """Return the shared ``QdrantClient`` for ``upload_points`` with ``parallel > 1``.
+
+    Its REST arguments can be pickled into the upload processes (see
+    :func:`client_kwargs`). Embedded backends upload in this process and get
+    the client of :func:`get_qdrant_client`.
+    """
+    s = s or Settings()
+    if is_embedded(s):
+        return get_qdrant_client(s)
+    return _get_or_create("upload", s, asynchronous=False, picklable=True)
+
+
+def get_async_qdrant_client(s: Settings | None = None) -> Any:
+    """Return the process-wide ``AsyncQdrantClient`` for the connection settings in ``s``.
+
+    The async client keeps its connection pool on the event loop that first
+    uses it; use it from a single loop. Embedded backends have no async
+    client: an async client would open a second, separate store.
+    """
+    s = s or Settings()
+    if is_embedded(s):
+        raise ValueError(f"VECTOR_BACKEND={s.VECTOR_BACKEND} não tem cliente assíncrono.")
+    return _get_or_create("async", s, asynchronous=True)
+
+
+def use_shared_clients(db: Any, s: Settings | None = None) -> Any:
+    """Make an agno ``Qdrant`` use the shared sync and async clients; returns ``db``."""
+    s = s or Settings()
+    db._client = get_qdrant_client(s)
+    if not is_embedded(s):
+        db._async_client = get_async_qdrant_client(s)
+    return db
+
+
+def wait_until_indexed(client: Any, name: str, timeout: float = 600.0) -> float:
+    """Block until collection ``name`` reports ``green``; return the seconds waited.
+
+    Raises
+    ------
+    TimeoutError
+        If the optimizers are still running after ``timeout`` seconds.
+    """
+    from qdrant_client.http import models
+
+    start = time.perf_counter()
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError(f"'{name}' não terminou de indexar em {timeout:.0f}s")
+        time.sleep(0.5)
+    return time.perf_counter() - start
+
+
+def alias_target(client: Any, alias: str) -> str | None:
+    """Return the collection behind ``alias``, or ``None`` if there is no such alias."""
+    for description in client.get_aliases().aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    return None
+
+
+def resolve_alias(client: Any, name: str) -> str:
+    """Return the collection behind alias ``name``, or ``name`` when it is no alias.
+
+    A Qdrant server answers ``collection_exists`` with ``False`` for an alias,
+    so existence checks and ``create_collection`` go through the resolved name.
+    """
+    return alias_target(client, name) or name
+
+
+def swap_alias(client: Any, alias: str, collection: str) -> str | None:
+    """Point ``alias`` at ``collection`` in one atomic request; return the previous target.
+
+    Searches through the alias see either the old or the new collection,
+    never a missing one.
+    """
+    from qdrant_client.http import models
+
+    previous = alias_target(client, alias)
+    operations: list[Any] = []
+    if previous is not None:
+        operations.append(
+            models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias))
+        )
+    operations.append(
+        models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=collection, alias_name=alias)
+        )
+    )
+    client.update_collection_aliases(change_aliases_operations=operations)
+    logger.info("Alias '%s': '%s' -> '%s'.", alias, previous, collection)
+    return previous
+
+
+def close_clients() -> None:
+    """Close and drop every shared client (mainly for tests)."""
+    with _lock:
+        clients = list(_clients.items())
+        _clients.clear()
+    for (kind, *_), client in clients:
+        if kind == "sync":
+            # Also releases the lock of an embedded ``local`` store.
+            try:
+                client.close()
+            except Exception as e:
+                logger.debug("Error closing Qdrant client: %s", e)
@@ -0,0 +1,215 @@
+"""Answer cache keyed by question embedding, for paraphrased questions.
+
+The exact-match caches of :mod:`brew_oracle.utils.cache` only help when the
+normalized question repeats. :class:`SemanticAnswerCache` keeps the
+normalized embedding of each answered question in a NumPy matrix and serves
+the stored answer when a new question has cosine similarity of at least
+``threshold`` with one of them, skipping retrieval and the Gemini round
+trip. A lookup is one matrix-vector product over at most ``maxsize`` rows.
+
+Entries remember the collections their answer was built from and are
+dropped by :func:`brew_oracle.utils.cache.invalidate_collection` when one of
+them is re-ingested; with ``generations`` that includes ingestions run by
+another process.
+
+Embeddings of MiniLM-class models barely move when only a number changes
+("IPA com 60 IBU" vs "70 IBU"), so when the question is given to
+:meth:`SemanticAnswerCache.get` a hit also requires the same numbers in both
+questions.
+"""
+
+import re
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from brew_oracle.utils.cache import CacheStats, Generations, register_collection_cache
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def numeric_tokens(text: str) -> tuple[str, ...]:
+    """The numbers written in ``text``, sorted, with ``,`` as decimal point read as ``.``."""
+    return tuple(sorted(n.replace(",", ".") for n in _NUMBER.findall(text)))
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    """An answer served by the cache and the question it was produced for."""
+
+    question: str
+    answer: str
+    references: list
+    sources: tuple[str, ...]
+    similarity: float = 1.0
+
+
+class SemanticAnswerCache:
+    """Thread-safe nearest-neighbour cache of answers.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of answers; ``0`` disables the cache. When full, the
+        least recently used answer is replaced.
+    threshold : float, optional
+        Minimum cosine similarity between questions for a hit, by default ``0.95``.
+    ttl : float | None, optional
+        Time to live of each answer in seconds, by default ``None`` (no expiry).
+    generations : Generations | None, optional
+        Generation files checked on lookups, so that re-ingestions run by
+        other processes drop the answers of their collection, by default ``None``.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        threshold: float = 0.95,
+        ttl: float | None = None,
+        *,
+        generations: Generations | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.generations = generations
+        self.threshold = threshold
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._vectors: np.ndarray | None = None
+        self._entries: list[CachedAnswer | None] = []
+        self._numbers: list[tuple[str, ...]] = []
+        self._expires = np.zeros(0)
+        self._used = np.zeros(0)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        register_collection_cache(self)
+
+    @staticmethod
+    def _normalize(embedding: Any) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+    def _live(self) -> np.ndarray:
+        """Mask of the occupied slots that have not expired (expired ones are freed)."""
+        n = len(self._entries)
+        occupied = np.fromiter((e is not None for e in self._entries), bool, n)
+        expired = occupied & (self._expires[:n] < self._clock())
+        for slot in np.flatnonzero(expired):
+            self._entries[slot] = None
+        return occupied & ~expired
+
+    def get(self, embedding: Any, question: str | None = None) -> CachedAnswer | None:
+        """Return the answer of the most similar cached question, or ``None`` on a miss.
+
+        With ``question``, only cached questions with the same numbers (see
+        :func:`numeric_tokens`) can be a hit.
+        """
+        if self.generations is not None:
+            for collection in self.generations.changed():
+                self.invalidate_collection(collection)
+        with self._lock:
+            if self._vectors is None or not self._entries:
+                self.misses += 1
+                return None
+            live = self._live()
+            if not live.any():
+                self.misses += 1
+                return None
+            scores = self._vectors[: len(self._entries)] @ self._normalize(embedding)
+            scores[~live] = -np.inf
+            candidates = np.flatnonzero(scores >= self.threshold)
+            if question is not None:
+                numbers = numeric_tokens(question)
+                candidates = np.array(
+                    [slot for slot in candidates if self._numbers[slot] == numbers], dtype=int
+                )
+            if not len(candidates):
+                self.misses += 1
+                return None
+            slot = int(candidates[np.argmax(scores[candidates])])
+            similarity = float(scores[slot])
+            entry = self._entries[slot]
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._used[slot] = self._clock()
+        return CachedAnswer(
+            question=entry.question,
+            answer=entry.answer,
+            references=list(entry.references),
+            sources=entry.sources,
+            similarity=similarity,
+        )
+
+    def set(
+        self,
+        embedding: Any,
+        question: str,
+        answer: str,
+        references: list | None = None,
+        sources: tuple[str, ...] = (),
+    ) -> None:
+        """Store ``answer`` for ``question``; ``sources`` are the collections it came from."""
+        if self.maxsize <= 0:
+            return
+        vector = self._normalize(embedding)
+        entry = CachedAnswer(question, answer, list(references or []), tuple(sources))
+        now = self._clock()
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, len(vector)), dtype=np.float32)
+                self._expires = np.zeros(self.maxsize)
+                self._used = np.zeros(self.maxsize)
+            live = self._live()
+            if len(self._entries) < self.maxsize:
+                slot = len(self._entries)
+                self._entries.append(None)
+                self._numbers.append(())
+            elif not live.all():
+                slot = int(np.flatnonzero(~live)[0])
+            else:
+                slot = int(np.argmin(self._used))
+                self.evictions += 1
+            self._vectors[slot] = vector
+            self._entries[slot] = entry
+            self._numbers[slot] = numeric_tokens(question)
+            self._expires[slot] = now + self.ttl if self.ttl is not None else np.inf
+            self._used[slot] = now
+
+    def invalidate_collection(self, collection: str) -> int:
+        """Drop the answers built from ``collection``; return how many."""
+        with self._lock:
+            stale = [
+                slot
+                for slot, entry in enumerate(self._entries)
+                if entry is not None and collection in entry.sources
+            ]
+            for slot in stale:
+                self._entries[slot] = None
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = [None] * len(self._entries)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            size = sum(e is not None for e in self._entries)
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                size=size,
+                maxsize=self.maxsize,
+            )
+
+    def __len__(self) -> int:
+        return self.stats().size
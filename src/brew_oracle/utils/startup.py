@@ -0,0 +1,96 @@
+import importlib
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Any
+
+from brew_oracle.utils.models import model_stats
+
+
+@dataclass(frozen=True)
+class StartupStep:
+    """Wall time of one startup step (an import or a build)."""
+
+    name: str
+    seconds: float
+
+
+class StartupProfile:
+    """Collect the duration of startup steps for ``--profile-startup``.
+
+    Imports are timed one after the other, so each step only counts the
+    modules it was the first to load.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.steps: list[StartupStep] = []
+        self.prompt_seconds: float | None = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.steps.append(StartupStep(name, time.perf_counter() - start))
+
+    def import_module(self, name: str) -> ModuleType:
+        """Import ``name`` and record how long it took."""
+        with self.step(f"import {name}"):
+            return importlib.import_module(name)
+
+    def mark_prompt(self) -> None:
+        """Record the time from startup until the first prompt."""
+        self.prompt_seconds = time.perf_counter() - self.started
+
+    def report(self) -> str:
+        """Render the import steps and the model loads of the registry."""
+        lines = ["Inicialização:"]
+        if self.prompt_seconds is not None:
+            lines.append(f"  {'prompt exibido':<52}{self.prompt_seconds:>8.2f}s")
+        with self._lock:
+            steps = list(self.steps)
+        for step in steps:
+            lines.append(f"  {step.name:<52}{step.seconds:>8.2f}s")
+        stats = model_stats()
+        if stats:
+            lines.append("Modelos:")
+            for m in stats:
+                name = f"{m.kind} {m.model_id}"
+                lines.append(
+                    f"  {name:<52}{m.load_seconds:>8.2f}s {m.memory_bytes / 1024**2:>8.1f} MB"
+                )
+        return "\n".join(lines)
+
+
+class BackgroundLoader:
+    """Run ``factory`` in a daemon thread so the caller can go on meanwhile.
+
+    The thread is a daemon, so leaving the program never waits for a warm-up
+    that is still loading models.
+    """
+
+    def __init__(self, factory: Callable[[], Any], name: str = "warmup") -> None:
+        self._future: Future = Future()
+        self._thread = threading.Thread(target=self._run, args=(factory,), name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self, factory: Callable[[], Any]) -> None:
+        try:
+            self._future.set_result(factory())
+        except BaseException as e:
+            self._future.set_exception(e)
+
+    def ready(self) -> bool:
+        return self._future.done()
+
+    def result(self, timeout: float | None = None) -> Any:
+        """Wait for the factory and return its result (or raise its exception)."""
+        return self._future.result(timeout=timeout)
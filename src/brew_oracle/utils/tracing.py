@@ -0,0 +1,319 @@
+"""Per-question timing of the retrieval and answer stages.
+
+A small tracer in the spirit of OpenTelemetry spans, without the dependency:
+``span("retrieval", docs=8)`` times a block and nests under the span open in
+the current context, so the query embedding, dense/sparse searches, rerank
+and Gemini generation of one question end up in the same trace. When the
+outermost span closes, the finished trace is handed to the sinks; a
+:class:`JsonlSink` appends one JSON object per span for offline aggregation
+(``python -m brew_oracle.utils.tracing traces.jsonl``).
+
+Tracing is off by default and a disabled tracer costs one attribute check
+per stage. Spans follow :mod:`contextvars`, so work submitted to a thread
+pool joins the trace when it runs in a copy of the caller's context
+(``contextvars.copy_context().run``).
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count of ``text`` (words and punctuation marks).
+
+    Only an estimate for the trace attributes; the generation span uses the
+    token counts reported by the model instead.
+    """
+    return len(_TOKEN_RE.findall(text or ""))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` after its first ``max_tokens`` tokens (as counted by :func:`count_tokens`)."""
+    if max_tokens <= 0:
+        return ""
+    for i, match in enumerate(_TOKEN_RE.finditer(text)):
+        if i == max_tokens - 1:
+            return text[: match.end()]
+    return text
+
+
+@dataclass
+class Span:
+    """One timed stage of a trace.
+
+    ``start`` is a Unix timestamp; ``attributes`` holds counts such as the
+    number of documents or tokens handled by the stage.
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start: float
+    seconds: float = 0.0
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class _NoopSpan:
+    """Stand-in yielded by a disabled tracer; ignores every attribute."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    """Spans finished so far under one root span (filled from several threads)."""
+
+    def __init__(self) -> None:
+        self.id = uuid.uuid4().hex
+        self.spans: list[Span] = []
+        self.lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self.lock:
+            self.spans.append(span)
+
+
+_current: ContextVar[tuple[_Trace, Span] | None] = ContextVar("brew_oracle_span", default=None)
+
+Sink = Callable[[list[Span]], None]
+
+
+class JsonlSink:
+    """Append every span of a finished trace as one JSON line to ``path``."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, spans: list[Span]) -> None:
+        lines = "".join(
+            json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n" for s in spans
+        )
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+
+class Tracer:
+    """Create spans and deliver finished traces to ``sinks``.
+
+    Parameters
+    ----------
+    sinks : list[Sink] | None, optional
+        Callables receiving the spans of each finished trace, in start order.
+    enabled : bool, optional
+        When ``False``, :meth:`span` yields a no-op span and records nothing.
+    """
+
+    def __init__(self, sinks: list[Sink] | None = None, enabled: bool = True) -> None:
+        self.sinks = list(sinks or [])
+        self.enabled = enabled
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+        """Time the enclosed block as a child of the current span (or a new trace)."""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        parent = _current.get()
+        trace = parent[0] if parent is not None else _Trace()
+        span = Span(
+            name=name,
+            trace_id=trace.id,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent[1].span_id if parent is not None else None,
+            start=time.time(),
+            attributes=dict(attributes),
+        )
+        token = _current.set((trace, span))
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.seconds = time.perf_counter() - started
+            try:
+                _current.reset(token)
+            except ValueError:
+                # A generator finished from another context (e.g. another thread).
+                _current.set(parent)
+            trace.add(span)
+            if parent is None:
+                self._emit(trace)
+
+    def record(self, name: str, seconds: float, **attributes: Any) -> None:
+        """Add an already measured stage (e.g. model time reported by agno) as a child span."""
+        parent = _current.get()
+        if not self.enabled or parent is None:
+            return
+        trace, parent_span = parent
+        trace.add(
+            Span(
+                name=name,
+                trace_id=trace.id,
+                span_id=uuid.uuid4().hex[:16],
+                parent_id=parent_span.span_id,
+                start=time.time() - seconds,
+                seconds=seconds,
+                attributes=dict(attributes),
+            )
+        )
+
+    def _emit(self, trace: _Trace) -> None:
+        with trace.lock:
+            spans = sorted(trace.spans, key=lambda s: s.start)
+        for sink in self.sinks:
+            try:
+                sink(spans)
+            except Exception as e:
+                logger.warning("Trace sink failed: %s", e)
+
+
+_tracer = Tracer(enabled=False)
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer (disabled until :func:`configure_tracing`)."""
+    return _tracer
+
+
+def configure_tracing(path: str | None = None, sinks: list[Sink] | None = None) -> Tracer:
+    """Enable the process-wide tracer, writing to ``path`` (JSONL) and ``sinks``."""
+    global _tracer
+    all_sinks = list(sinks or [])
+    if path:
+        all_sinks.insert(0, JsonlSink(path))
+    _tracer = Tracer(all_sinks)
+    return _tracer
+
+
+def disable_tracing() -> None:
+    """Turn the process-wide tracer back off (mainly for tests)."""
+    global _tracer
+    _tracer = Tracer(enabled=False)
+
+
+def span(name: str, **attributes: Any):
+    """Shortcut for ``get_tracer().span(name, **attributes)``."""
+    return _tracer.span(name, **attributes)
+
+
+def record_generation(metrics: dict[str, Any] | None) -> None:
+    """Record the model calls of an agno run from its ``RunResponse.metrics``.
+
+    agno keeps one value per model call in lists (``time``, ``input_tokens``,
+    ``output_tokens``, ``time_to_first_token``); they become a single
+    ``generation`` span with the summed time and token counts.
+    """
+    if not isinstance(metrics, dict) or not metrics or not _tracer.enabled:
+        return
+    times = metrics.get("time") or []
+    first_token = metrics.get("time_to_first_token") or []
+    attributes: dict[str, Any] = {
+        "calls": len(times),
+        "input_tokens": sum(metrics.get("input_tokens") or []),
+        "output_tokens": sum(metrics.get("output_tokens") or []),
+    }
+    if first_token:
+        attributes["time_to_first_token"] = first_token[0]
+    _tracer.record("generation", float(sum(times)), **attributes)
+
+
+def format_trace(spans: list[Span]) -> str:
+    """Render one trace as an indented tree of stages with times and attributes."""
+    children: dict[str | None, list[Span]] = {}
+    for s in spans:
+        children.setdefault(s.parent_id, []).append(s)
+    lines: list[str] = []
+
+    def _walk(parent_id: str | None, depth: int) -> None:
+        for s in children.get(parent_id, []):
+            attrs = " ".join(f"{k}={v}" for k, v in s.attributes.items())
+            label = "  " * depth + s.name
+            lines.append(f"  {label:<30}{s.seconds * 1000:>10.1f} ms  {attrs}".rstrip())
+            _walk(s.span_id, depth + 1)
+
+    _walk(None, 0)
+    return "\n".join(lines)
+
+
+def load_spans(path: str) -> list[Span]:
+    """Read the spans written by a :class:`JsonlSink`."""
+    with open(path, encoding="utf-8") as f:
+        return [Span(**json.loads(line)) for line in f if line.strip()]
+
+
+def stage_summary(spans: list[Span]) -> dict[str, dict[str, float]]:
+    """Aggregate spans by stage name: count, mean/p50/p95 in ms and mean attributes."""
+    by_name: dict[str, list[Span]] = {}
+    for s in spans:
+        by_name.setdefault(s.name, []).append(s)
+    summary: dict[str, dict[str, float]] = {}
+    for name, group in by_name.items():
+        ms = sorted(s.seconds * 1000 for s in group)
+        row = {
+            "count": len(group),
+            "mean_ms": sum(ms) / len(ms),
+            "p50_ms": ms[(len(ms) - 1) // 2],
+            "p95_ms": ms[min(int(round(0.95 * (len(ms) - 1))), len(ms) - 1)],
+        }
+        numeric: dict[str, list[float]] = {}
+        for s in group:
+            for key, value in s.attributes.items():
+                if isinstance(value, int | float) and not isinstance(value, bool):
+                    numeric.setdefault(key, []).append(value)
+        for key, values in numeric.items():
+            row[f"mean_{key}"] = sum(values) / len(values)
+        summary[name] = row
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Resumo por etapa dos traces gravados em JSONL")
+    parser.add_argument("path", help="Arquivo JSONL gravado com --trace")
+    args = parser.parse_args()
+
+    summary = stage_summary(load_spans(args.path))
+    header = f"{'etapa':<20}{'n':>7}{'média ms':>11}{'p50 ms':>10}{'p95 ms':>10}  atributos"
+    print(header)
+    print("-" * len(header))
+    for name, row in sorted(summary.items(), key=lambda item: -item[1]["mean_ms"]):
+        attrs = " ".join(
+            f"{k[5:]}={v:.1f}" for k, v in row.items() if k.startswith("mean_") and k != "mean_ms"
+        )
+        print(
+            f"{name:<20}{row['count']:>7}{row['mean_ms']:>11.1f}{row['p50_ms']:>10.1f}"
+            f"{row['p95_ms']:>10.1f}  {attrs}"
+        )
+
+
+if __name__ == "__main__":
+    main()
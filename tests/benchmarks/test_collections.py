@@ -0,0 +1,58 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from brew_oracle.benchmarks.collections import (
+    build_collection,
+    estimate_ram_bytes,
+    exact_neighbours,
+    format_report,
+    load_points,
+    run_profile,
+)
+from brew_oracle.scripts.create_collections import PROFILES, collection_config
+
+
+class TestCollectionBenchmark(unittest.TestCase):
+    def test_estimate_ram_follows_profile(self):
+        """Test that on-disk and quantized profiles are estimated smaller."""
+        ram = {name: estimate_ram_bytes(p, 100_000, 384) for name, p in PROFILES.items()}
+
+        self.assertGreater(ram["low-latency"], ram["balanced"])
+        self.assertGreater(ram["balanced"], ram["low-memory"])
+        self.assertEqual(ram["low-memory"], 100_000 * 48)
+
+    def test_exact_neighbours_uses_cosine(self):
+        vectors = np.array([[1.0, 0.0], [10.0, 1.0], [0.0, 1.0]], dtype=np.float32)
+
+        neighbours = exact_neighbours(vectors, np.array([[0.0, 2.0]], dtype=np.float32), 2)
+
+        self.assertEqual(neighbours.tolist(), [[2, 1]])
+
+    def test_profile_run_end_to_end(self):
+        """Test copy, build and scoring of a profile on an embedded client."""
+        s = SimpleNamespace(EMBEDDER_DIM=8, DENSE_VECTOR_NAME="dense", SPARSE_VECTOR_NAME="sparse")
+        client = QdrantClient(location=":memory:")
+        vectors = np.random.default_rng(0).normal(size=(50, 8)).astype(np.float32)
+        client.create_collection("source", **collection_config(s))
+        client.upload_collection("source", vectors=vectors, ids=list(range(50)))
+
+        ids, loaded, payloads = load_points(client, "source", "dense", max_points=40)
+        queries = loaded[:5]
+        expected = [{ids[i] for i in row} for row in exact_neighbours(loaded, queries, 3)]
+        build_collection(client, "bench", s, "balanced", ids, loaded, payloads)
+        report = run_profile(
+            client, "bench", "balanced", queries, expected, k=3, points=len(ids), dim=8
+        )
+
+        self.assertEqual(loaded.shape, (40, 8))
+        self.assertEqual(client.count("bench").count, 40)
+        self.assertEqual(report.recall_at_k, 1.0)
+        self.assertGreater(report.qps, 0)
+        self.assertIn("balanced", format_report([report]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from brew_oracle.benchmarks.embedder import (
+    compare_backends,
+    cosine_agreement,
+    failing,
+    format_report,
+)
+
+
+class _FakeModel:
+    """Encodes each text to a fixed vector plus a backend-specific perturbation."""
+
+    def __init__(self, noise: float) -> None:
+        self.noise = noise
+
+    def encode(self, texts, batch_size=32):
+        base = np.array([[len(t), 1.0, 0.5] for t in texts], dtype=np.float32)
+        return base + self.noise * np.array([0.0, 1.0, -1.0], dtype=np.float32)
+
+
+class TestEmbedderBenchmark(unittest.TestCase):
+    def test_cosine_agreement_is_row_wise(self):
+        a = np.array([[1.0, 0.0], [0.0, 2.0]])
+        b = np.array([[2.0, 0.0], [1.0, 0.0]])
+
+        self.assertEqual(cosine_agreement(a, b).tolist(), [1.0, 0.0])
+
+    def test_backends_are_compared_with_torch(self):
+        """Test that each backend gets its cosine to the PyTorch vectors and a speedup."""
+        fakes = {"torch": _FakeModel(0.0), "onnx": _FakeModel(0.0), "onnx-int8": _FakeModel(5.0)}
+        loaded = []
+
+        def load(model_id, backend):
+            loaded.append((model_id, backend))
+            return fakes[backend]
+
+        reports = compare_backends(
+            "m", ["onnx", "onnx-int8"], ["ipa", "stout"], repeats=1, load=load
+        )
+
+        self.assertEqual(loaded, [("m", "torch"), ("m", "onnx"), ("m", "onnx-int8")])
+        self.assertEqual([r.backend for r in reports], ["torch", "onnx", "onnx-int8"])
+        self.assertAlmostEqual(reports[1].min_cosine, 1.0, places=5)
+        self.assertLess(reports[2].min_cosine, 0.9)
+        self.assertTrue(all(r.sentences_per_second > 0 for r in reports))
+        with self.assertLogs("brew_oracle.benchmarks.embedder", "ERROR"):
+            self.assertEqual([r.backend for r in failing(reports, 0.98)], ["onnx-int8"])
+        self.assertIn("onnx-int8", format_report(reports))
+
+
+if __name__ == "__main__":
+    unittest.main()
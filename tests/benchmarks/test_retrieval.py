@@ -0,0 +1,95 @@
+import unittest
+from unittest.mock import MagicMock
+
+from agno.document import Document
+
+from brew_oracle.benchmarks.retrieval import (
+    DEFAULT_QUERIES,
+    BenchQuery,
+    StubModel,
+    format_report,
+    load_queries,
+    percentile,
+    ranked_sources,
+    recall_at_k,
+    reciprocal_rank,
+    run_mode,
+)
+
+
+def _page(page, name="book"):
+    return Document(name=name, content=f"{name} p{page}", meta_data={"page": page})
+
+
+def _recipe(name):
+    return Document(content=name, meta_data={"name": name})
+
+
+class TestRetrievalMetrics(unittest.TestCase):
+    def test_ranked_sources_dedupes_chunks_of_the_same_page(self):
+        docs = [_page(3), _page(3), _recipe("IPA"), _page(4)]
+
+        self.assertEqual(
+            ranked_sources(docs),
+            [("page", "book", 3), ("recipe", "IPA"), ("page", "book", 4)],
+        )
+
+    def test_recall_and_reciprocal_rank(self):
+        sources = [("page", "book", 1), ("page", "book", 2), ("recipe", "IPA")]
+        relevant = {("page", "book", 2), ("recipe", "IPA")}
+
+        self.assertEqual(recall_at_k(sources, relevant, 2), 0.5)
+        self.assertEqual(recall_at_k(sources, relevant, 3), 1.0)
+        self.assertEqual(reciprocal_rank(sources, relevant), 0.5)
+        self.assertEqual(reciprocal_rank(sources, {("page", "book", 9)}), 0.0)
+
+    def test_percentile_interpolates(self):
+        values = [4.0, 1.0, 3.0, 2.0]
+
+        self.assertEqual(percentile(values, 0), 1.0)
+        self.assertEqual(percentile(values, 50), 2.5)
+        self.assertEqual(percentile(values, 100), 4.0)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_default_query_set_loads(self):
+        queries = load_queries(DEFAULT_QUERIES)
+
+        self.assertTrue(queries)
+        self.assertTrue(all(q.question and q.relevant for q in queries))
+
+
+class TestRunMode(unittest.TestCase):
+    def test_run_mode_reports_quality_and_clears_caches(self):
+        """Test that every query is timed cold and scored against its sources."""
+        orchestrator = MagicMock()
+        results = {
+            "q1": [_page(1), _page(2)],
+            "q2": [_page(5), _recipe("IPA")],
+        }
+        orchestrator.search.side_effect = lambda q, limit: results[q]
+        queries = [
+            BenchQuery("q1", pages={"book": [1]}),
+            BenchQuery("q2", recipes=["IPA"]),
+        ]
+
+        report = run_mode("dense", orchestrator, queries, k=1, limit=3)
+
+        self.assertEqual(report.queries, 2)
+        self.assertEqual(report.recall_at_k, 0.5)
+        self.assertEqual(report.mrr, 0.75)
+        self.assertGreater(report.qps, 0)
+        # warm-up + one call per query, caches cleared before each timed query
+        self.assertEqual(orchestrator.search.call_count, 3)
+        self.assertEqual(orchestrator.search_cache.clear.call_count, 2)
+        self.assertIn("dense", format_report([report]))
+
+    def test_stub_model_answers_offline(self):
+        model = StubModel(answer="ok")
+
+        response = model.parse_provider_response(model.invoke())
+
+        self.assertEqual(response.content, "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
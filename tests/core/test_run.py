@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+from brew_oracle.core import run
+
+
+class TestRun(unittest.TestCase):
+    def test_import_does_not_load_heavy_dependencies(self):
+        """Test that importing the CLI leaves agno, qdrant-client and torch unloaded."""
+        code = (
+            "import sys, brew_oracle.core.run; "
+            "print(sorted(m for m in ('agno', 'qdrant_client', 'torch', 'fastembed') "
+            "if m in sys.modules))"
+        )
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True
+        )
+        self.assertEqual(out.stdout.strip(), "[]")
+
+    @patch("brew_oracle.core.run.build_orchestrator")
+    def test_prompt_before_models_finish_loading(self, mock_build):
+        """Test that the orchestrator is built in the background and used on the first question."""
+        agent = MagicMock()
+
+        def ask_stream(question):
+            yield "Resposta"
+            return "Resposta", []
+
+        agent.ask_stream.side_effect = ask_stream
+        mock_build.return_value = agent
+
+        with (
+            patch("sys.argv", ["brew-oracle"]),
+            patch("builtins.input", side_effect=["O que é IPA?", "exit"]),
+            patch("builtins.print"),
+        ):
+            run.main()
+
+        mock_build.assert_called_once()
+        agent.ask_stream.assert_called_once_with("O que é IPA?")
+
+
+if __name__ == "__main__":
+    unittest.main()
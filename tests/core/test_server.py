@@ -0,0 +1,127 @@
+import asyncio
+import http.client
+import json
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from agno.document import Document
+
+from brew_oracle.core.server import BrewServer
+
+
+class _FakeAgent:
+    def __init__(self, release: threading.Event | None = None) -> None:
+        self.release = release
+        self.degraded: list[str] = []
+
+    def ask_with_refs(self, question):
+        if self.release is not None:
+            self.release.wait(5)
+        return f"resposta: {question}", ["ref1"]
+
+    def ask_stream(self, question):
+        yield "Olá"
+        yield ", cervejeiro"
+        return "Olá, cervejeiro", ["ref1"]
+
+
+class TestBrewServer(unittest.TestCase):
+    def _start(self, workers=2, max_pending=2, release=None):
+        orchestrator = MagicMock()
+        orchestrator.fork.side_effect = lambda: _FakeAgent(release)
+        orchestrator.search.side_effect = lambda query, limit: [
+            Document(content=f"{query} {i}", meta_data={"page": i}) for i in range(limit)
+        ]
+        self.orchestrator = orchestrator
+        self.server = BrewServer(orchestrator, workers=workers, max_pending=max_pending)
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.server.start("127.0.0.1", 0))
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+    def _request(self, method, path, payload=None):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=5)
+        body = json.dumps(payload) if payload is not None else None
+        conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        data = response.read().decode()
+        conn.close()
+        return response, data
+
+    def test_search(self):
+        self._start()
+
+        response, data = self._request("POST", "/search", {"query": "ipa", "limit": 2})
+
+        self.assertEqual(response.status, 200)
+        docs = json.loads(data)["documents"]
+        self.assertEqual([d["content"] for d in docs], ["ipa 0", "ipa 1"])
+        self.assertEqual(docs[1]["meta_data"], {"page": 1})
+
+    def test_ask(self):
+        self._start()
+
+        response, data = self._request("POST", "/ask", {"question": "O que é IPA?"})
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(
+            json.loads(data),
+            {"answer": "resposta: O que é IPA?", "references": ["ref1"], "degraded": []},
+        )
+        self.assertEqual(self.orchestrator.fork.call_count, 2)
+
+    def test_ask_stream_sends_ndjson_deltas(self):
+        self._start()
+
+        response, data = self._request("POST", "/ask/stream", {"question": "Oi"})
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Transfer-Encoding"), "chunked")
+        lines = [json.loads(line) for line in data.splitlines()]
+        self.assertEqual(lines[:2], [{"delta": "Olá"}, {"delta": ", cervejeiro"}])
+        self.assertEqual(
+            lines[2],
+            {"done": True, "answer": "Olá, cervejeiro", "references": ["ref1"], "degraded": []},
+        )
+
+    def test_errors(self):
+        self._start()
+
+        self.assertEqual(self._request("POST", "/ask", {})[0].status, 400)
+        for limit in (True, 0, "5"):
+            body = {"query": "ipa", "limit": limit}
+            self.assertEqual(self._request("POST", "/search", body)[0].status, 400)
+        self.assertEqual(self._request("GET", "/ask")[0].status, 405)
+        self.assertEqual(self._request("POST", "/nope", {"question": "x"})[0].status, 404)
+
+    def test_backpressure_rejects_requests_beyond_the_queue(self):
+        """Test that requests beyond workers + max_pending get 503 instead of waiting."""
+        release = threading.Event()
+        self._start(workers=1, max_pending=0, release=release)
+        busy = threading.Thread(target=self._request, args=("POST", "/ask", {"question": "a"}))
+        busy.start()
+        try:
+            for _ in range(50):
+                health = json.loads(self._request("GET", "/health")[1])
+                if health["in_flight"] == 1:
+                    break
+                threading.Event().wait(0.05)
+
+            response, _ = self._request("POST", "/ask", {"question": "b"})
+
+            self.assertEqual(response.status, 503)
+            self.assertEqual(response.getheader("Retry-After"), "1")
+        finally:
+            release.set()
+            busy.join(5)
+
+
+if __name__ == "__main__":
+    unittest.main()
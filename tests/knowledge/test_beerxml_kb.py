@@ -1,21 +1,56 @@
+import os
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 from agno.document import Document
 from agno.vectordb.search import SearchType
+from qdrant_client.http import models
 
-from brew_oracle.knowledge.beerxml_kb import build_recipe_kb, ingest_recipes
+from brew_oracle.knowledge.beerxml_kb import (
+    RecipeFilter,
+    build_recipe_kb,
+    ensure_recipe_indexes,
+    ingest_recipes,
+    iter_recipe_documents,
+    search_recipes,
+)
+from brew_oracle.knowledge.recipe_table import RecipeTable
+
+
+def _fake_recipe(name):
+    recipe = MagicMock()
+    recipe.name = name
+    recipe.hops, recipe.fermentables, recipe.yeasts, recipe.miscs = [], [], [], []
+    recipe.og = recipe.fg = recipe.abv = recipe.ibu = 1.0
+    return recipe
 
 
 class TestBeerXMLKnowledgeBase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.checkpoint = os.path.join(self.tmp.name, "checkpoint.json")
+        self.table_path = os.path.join(self.tmp.name, "recipes_table.npz")
+        table_patcher = patch(
+            "brew_oracle.knowledge.beerxml_kb.recipe_table_path", return_value=self.table_path
+        )
+        table_patcher.start()
+        self.addCleanup(table_patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @patch("brew_oracle.knowledge.beerxml_kb.use_shared_clients", side_effect=lambda db, s: db)
     @patch("brew_oracle.knowledge.beerxml_kb.Settings")
-    @patch("brew_oracle.knowledge.beerxml_kb.SentenceTransformerEmbedder")
+    @patch("brew_oracle.knowledge.beerxml_kb.get_embedder")
     @patch("brew_oracle.knowledge.beerxml_kb.Qdrant")
-    def test_build_recipe_kb(self, mock_qdrant, mock_embedder, mock_settings):
+    def test_build_recipe_kb(self, mock_qdrant, mock_embedder, mock_settings, mock_shared):
         """Test that the BeerXMLKnowledgeBase is built correctly."""
         mock_settings_instance = MagicMock()
         mock_settings_instance.EMBEDDER_ID = "fake_embedder"
         mock_settings_instance.EMBEDDER_DIM = 384
+        mock_settings_instance.EMBEDDER_BACKEND = "torch"
         mock_settings_instance.QDRANT_RECIPE_COLLECTION = "recipes"
         mock_settings_instance.QDRANT_URL = "http://localhost:6333"
         mock_settings_instance.DENSE_VECTOR_NAME = "dense"
@@ -26,7 +61,7 @@ class TestBeerXMLKnowledgeBase(unittest.TestCase):
         with patch("os.path.isdir", return_value=False):
             kb = build_recipe_kb()
 
-        mock_embedder.assert_called_once_with(id="fake_embedder", dimensions=384)
+        mock_embedder.assert_called_once_with("fake_embedder", 384, "torch")
         mock_qdrant.assert_called_once_with(
             collection="recipes",
             url="http://localhost:6333",
@@ -38,14 +73,16 @@ class TestBeerXMLKnowledgeBase(unittest.TestCase):
         )
         self.assertEqual(kb, mock_qdrant.return_value)
 
+    @patch("brew_oracle.knowledge.beerxml_kb.use_shared_clients", side_effect=lambda db, s: db)
     @patch("brew_oracle.knowledge.beerxml_kb.Settings")
-    @patch("brew_oracle.knowledge.beerxml_kb.SentenceTransformerEmbedder")
+    @patch("brew_oracle.knowledge.beerxml_kb.get_embedder")
     @patch("brew_oracle.knowledge.beerxml_kb.Qdrant")
-    def test_build_recipe_kb_hybrid(self, mock_qdrant, mock_embedder, mock_settings):
+    def test_build_recipe_kb_hybrid(self, mock_qdrant, mock_embedder, mock_settings, mock_shared):
         """Test that the BeerXMLKnowledgeBase is built correctly with hybrid search."""
         mock_settings_instance = MagicMock()
         mock_settings_instance.EMBEDDER_ID = "fake_embedder"
         mock_settings_instance.EMBEDDER_DIM = 384
+        mock_settings_instance.EMBEDDER_BACKEND = "torch"
         mock_settings_instance.QDRANT_RECIPE_COLLECTION = "recipes_hybrid"
         mock_settings_instance.QDRANT_URL = "http://localhost:6333"
         mock_settings_instance.DENSE_VECTOR_NAME = "dense_hybrid"
@@ -56,7 +93,7 @@ class TestBeerXMLKnowledgeBase(unittest.TestCase):
         with patch("os.path.isdir", return_value=False):
             kb = build_recipe_kb(hybrid=True)
 
-        mock_embedder.assert_called_once_with(id="fake_embedder", dimensions=384)
+        mock_embedder.assert_called_once_with("fake_embedder", 384, "torch")
         mock_qdrant.assert_called_once_with(
             collection="recipes_hybrid",
             url="http://localhost:6333",
@@ -68,20 +105,38 @@ class TestBeerXMLKnowledgeBase(unittest.TestCase):
         )
         self.assertEqual(kb, mock_qdrant.return_value)
 
+    @patch("brew_oracle.knowledge.beerxml_kb.invalidate_collection")
     @patch("brew_oracle.knowledge.beerxml_kb.Settings")
     @patch("brew_oracle.knowledge.beerxml_kb.build_recipe_kb")
     @patch("brew_oracle.knowledge.beerxml_kb.Parser")
     @patch("os.listdir")
     @patch("os.path.join")
-    @patch("qdrant_client.QdrantClient")
+    @patch("brew_oracle.knowledge.beerxml_kb.get_qdrant_client")
+    @patch("brew_oracle.knowledge.beerxml_kb.checkpoint_path")
+    @patch("brew_oracle.knowledge.beerxml_kb.upsert_documents")
     def test_ingest_recipes_success(
-        self, mock_qdrant_client, mock_join, mock_listdir, mock_parser, mock_build_kb, mock_settings
+        self,
+        mock_upsert,
+        mock_checkpoint_path,
+        mock_qdrant_client,
+        mock_join,
+        mock_listdir,
+        mock_parser,
+        mock_build_kb,
+        mock_settings,
+        mock_invalidate,
     ):
         """Test successful ingestion of recipes."""
         mock_settings_instance = MagicMock()
         mock_settings_instance.BEERXML_PATH = "/fake/recipes"
         mock_settings_instance.QDRANT_RECIPE_COLLECTION = "fake_collection"
+        mock_settings_instance.INGEST_BATCH_SIZE = 64
+        mock_settings_instance.EMBEDDING_STORE_DIR = None
+        mock_settings_instance.INGEST_BULK = False
+        mock_settings_instance.INGEST_WORKERS = 1
         mock_settings.return_value = mock_settings_instance
+        mock_checkpoint_path.return_value = self.checkpoint
+        mock_upsert.side_effect = lambda kb, docs, batch_size, store=None: len(docs)
 
         mock_kb = MagicMock()
         mock_build_kb.return_value = mock_kb
@@ -142,28 +197,47 @@ class TestBeerXMLKnowledgeBase(unittest.TestCase):
         with patch("os.makedirs"):
             ingest_recipes()
 
-        mock_build_kb.assert_called_once_with(hybrid=False)
+        mock_build_kb.assert_called_once_with(hybrid=False, s=mock_settings_instance)
         mock_listdir.assert_called_once_with("/fake/recipes")
         mock_parser_instance.parse.assert_called_once_with("/fake/recipes/recipe1.xml")
 
-        self.assertEqual(mock_kb.upsert.call_count, 1)
-        upserted_doc = mock_kb.upsert.call_args[0][0][0]
+        self.assertEqual(mock_upsert.call_count, 1)
+        self.assertIs(mock_upsert.call_args[0][0], mock_kb)
+        upserted_doc = mock_upsert.call_args[0][1][0]
         self.assertIsInstance(upserted_doc, Document)
         self.assertEqual(upserted_doc.content, full_text)
         self.assertEqual(upserted_doc.meta_data["name"], "Test IPA")
+        self.assertFalse(os.path.exists(self.checkpoint))
+        table = RecipeTable.load(self.table_path)
+        self.assertEqual(table.names.tolist(), ["Test IPA"])
+        self.assertEqual(table.summarize().stats["ibu"]["mean"], 70.0)
 
     @patch("brew_oracle.knowledge.beerxml_kb.Settings")
     @patch("brew_oracle.knowledge.beerxml_kb.build_recipe_kb")
     @patch("brew_oracle.knowledge.beerxml_kb.Parser")
     @patch("os.listdir")
     @patch("os.path.join")
+    @patch("brew_oracle.knowledge.beerxml_kb.checkpoint_path")
+    @patch("brew_oracle.knowledge.beerxml_kb.upsert_documents")
     def test_ingest_recipes_malformed_xml(
-        self, mock_join, mock_listdir, mock_parser, mock_build_kb, mock_settings
+        self,
+        mock_upsert,
+        mock_checkpoint_path,
+        mock_join,
+        mock_listdir,
+        mock_parser,
+        mock_build_kb,
+        mock_settings,
     ):
         """Test that malformed XML files are handled gracefully."""
         mock_settings_instance = MagicMock()
         mock_settings_instance.BEERXML_PATH = "/fake/recipes"
+        mock_settings_instance.INGEST_BATCH_SIZE = 64
+        mock_settings_instance.EMBEDDING_STORE_DIR = None
+        mock_settings_instance.INGEST_BULK = False
+        mock_settings_instance.INGEST_WORKERS = 1
         mock_settings.return_value = mock_settings_instance
+        mock_checkpoint_path.return_value = self.checkpoint
 
         mock_kb = MagicMock()
         mock_build_kb.return_value = mock_kb
@@ -175,10 +249,127 @@ class TestBeerXMLKnowledgeBase(unittest.TestCase):
         mock_parser_instance.parse.side_effect = Exception("Malformed XML")
         mock_parser.return_value = mock_parser_instance
 
-        with patch("os.makedirs"), patch("qdrant_client.QdrantClient"):
+        with patch("os.makedirs"), patch("brew_oracle.knowledge.beerxml_kb.get_qdrant_client"):
             ingest_recipes()
 
-        mock_kb.upsert.assert_not_called()
+        mock_upsert.assert_not_called()
+
+    @patch("brew_oracle.knowledge.beerxml_kb.invalidate_collection")
+    @patch("brew_oracle.knowledge.beerxml_kb.Settings")
+    @patch("brew_oracle.knowledge.beerxml_kb.build_recipe_kb")
+    @patch("brew_oracle.knowledge.beerxml_kb.Parser")
+    @patch("os.listdir")
+    @patch("brew_oracle.knowledge.beerxml_kb.checkpoint_path")
+    @patch("brew_oracle.knowledge.beerxml_kb.upsert_documents")
+    def test_ingest_recipes_batches_and_resumes(
+        self,
+        mock_upsert,
+        mock_checkpoint_path,
+        mock_listdir,
+        mock_parser,
+        mock_build_kb,
+        mock_settings,
+        mock_invalidate,
+    ):
+        """Test that recipes are upserted per batch and an interrupted run resumes."""
+        mock_settings_instance = MagicMock()
+        mock_settings_instance.BEERXML_PATH = "/fake/recipes"
+        mock_settings_instance.INGEST_BATCH_SIZE = 2
+        mock_settings_instance.EMBEDDING_STORE_DIR = None
+        mock_settings_instance.INGEST_BULK = False
+        mock_settings_instance.INGEST_WORKERS = 1
+        mock_settings.return_value = mock_settings_instance
+        mock_checkpoint_path.return_value = self.checkpoint
+        mock_listdir.return_value = ["a.xml", "b.xml", "c.xml", "notes.txt"]
+        mock_parser.return_value.parse.side_effect = lambda path: [
+            _fake_recipe(f"{os.path.basename(path)}-1"),
+            _fake_recipe(f"{os.path.basename(path)}-2"),
+        ]
+        mock_upsert.side_effect = [2, RuntimeError("Qdrant down")]
+
+        with patch("os.makedirs"), patch("brew_oracle.knowledge.beerxml_kb.get_qdrant_client"):
+            with self.assertRaises(RuntimeError):
+                ingest_recipes()
+            self.assertTrue(os.path.exists(self.checkpoint))
+
+            mock_upsert.reset_mock(side_effect=True)
+            mock_upsert.side_effect = lambda kb, docs, batch_size, store=None: len(docs)
+            mock_parser.return_value.parse.reset_mock()
+            ingest_recipes()
+
+        parsed = [os.path.basename(c.args[0]) for c in mock_parser.return_value.parse.mock_calls]
+        self.assertEqual(parsed, ["b.xml", "c.xml"])
+        self.assertEqual(mock_upsert.call_count, 2)
+        self.assertTrue(all(len(c.args[1]) == 2 for c in mock_upsert.call_args_list))
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    @patch("brew_oracle.knowledge.beerxml_kb.ProcessPoolExecutor", ThreadPoolExecutor)
+    @patch("brew_oracle.knowledge.beerxml_kb.Parser")
+    def test_iter_recipe_documents_workers_keep_file_order(self, mock_parser):
+        """Test that files parsed by a worker pool come back in input order."""
+        mock_parser.return_value.parse.side_effect = lambda path: [
+            _fake_recipe(os.path.basename(path))
+        ]
+        filenames = [f"{i:02d}.xml" for i in range(20)]
+
+        results = list(iter_recipe_documents(filenames, "/fake/recipes", workers=3))
+
+        self.assertEqual([name for name, _ in results], filenames)
+        self.assertEqual(
+            [docs[0].meta_data["name"] for _, docs in results],
+            filenames,
+        )
+
+
+class TestRecipeFilters(unittest.TestCase):
+    def test_recipe_filter_to_qdrant(self):
+        """Test that styles, required hops and ranges become Qdrant conditions."""
+        query_filter = RecipeFilter(
+            styles=["american ipa"], hops=["Citra", "MOSAIC"], ibu_min=60
+        ).to_qdrant()
+
+        conditions = {(c.key, repr(c.match), repr(c.range)) for c in query_filter.must}
+        self.assertEqual(
+            conditions,
+            {
+                ("meta_data.style_key", repr(models.MatchAny(any=["american ipa"])), "None"),
+                ("meta_data.hops_key", repr(models.MatchValue(value="citra")), "None"),
+                ("meta_data.hops_key", repr(models.MatchValue(value="mosaic")), "None"),
+                ("meta_data.ibu", "None", repr(models.Range(gte=60, lte=None))),
+            },
+        )
+        self.assertIsNone(RecipeFilter().to_qdrant())
+
+    def test_ensure_recipe_indexes_creates_only_missing(self):
+        client = MagicMock()
+        client.get_collection.return_value.payload_schema = {"meta_data.style_key": "keyword"}
+
+        created = ensure_recipe_indexes(client, "recipes")
+
+        self.assertNotIn("meta_data.style_key", created)
+        schemas = {
+            c.kwargs["field_name"]: c.kwargs["field_schema"]
+            for c in client.create_payload_index.call_args_list
+        }
+        self.assertEqual(schemas["meta_data.hops_key"], models.PayloadSchemaType.KEYWORD)
+        self.assertEqual(schemas["meta_data.ibu"], models.PayloadSchemaType.FLOAT)
+        self.assertEqual(len(schemas), 6)
+
+    def test_search_recipes_pushes_filter_into_query(self):
+        """Test that the recipe filter is sent with the vector query, not applied after."""
+        db = MagicMock()
+        db.vector_db = None
+        db.search_type = SearchType.vector
+        db.use_named_vectors = False
+        db.embedder.get_embedding.return_value = [0.1, 0.2]
+
+        search_recipes(db, "ipa cítrica", 3, RecipeFilter(hops=["Citra"]))
+
+        kwargs = db.client.query_points.call_args.kwargs
+        self.assertEqual(kwargs["query"], [0.1, 0.2])
+        self.assertEqual(kwargs["limit"], 3)
+        self.assertEqual(kwargs["query_filter"].must[0].key, "meta_data.hops_key")
+        db._format_filters.assert_not_called()
 
 
 if __name__ == "__main__":
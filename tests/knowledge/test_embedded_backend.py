@@ -0,0 +1,106 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from brew_oracle.knowledge.beerxml_kb import (
+    RecipeFilter,
+    build_recipe_kb,
+    ingest_recipes,
+    search_recipes,
+)
+from brew_oracle.knowledge.recipe_table import RecipeTable, recipe_table_path
+from brew_oracle.utils.config import Settings
+from brew_oracle.utils.qdrant import close_clients
+
+SAMPLE_RECIPE = os.path.join(
+    os.path.dirname(__file__), "..", "..", "knowledge", "recipes", "test_recipe.xml"
+)
+
+
+class _HashEmbedder:
+    """Deterministic offline embedder (no model weights needed)."""
+
+    id = "hash"
+    dimensions = 8
+
+    def get_embedding(self, text):
+        digest = hashlib.sha256(text.encode()).digest()
+        return [b / 255 + 0.01 for b in digest[: self.dimensions]]
+
+
+class TestEmbeddedBackend(unittest.TestCase):
+    def setUp(self):
+        close_clients()
+        self.tmp = tempfile.TemporaryDirectory()
+        recipes = os.path.join(self.tmp.name, "recipes")
+        os.makedirs(recipes)
+        shutil.copy(SAMPLE_RECIPE, recipes)
+        self.settings = Settings(
+            VECTOR_BACKEND="memory",
+            BEERXML_PATH=recipes,
+            INGEST_STATE_DIR=os.path.join(self.tmp.name, "state"),
+            EMBEDDING_STORE_DIR=os.path.join(self.tmp.name, "embeddings"),
+            QDRANT_RECIPE_COLLECTION="test_recipes",
+            EMBEDDER_DIM=_HashEmbedder.dimensions,
+        )
+
+    def tearDown(self):
+        close_clients()
+        self.tmp.cleanup()
+
+    def test_recipe_ingestion_and_filtered_search_without_server(self):
+        """Test that ingestion and filtered search run on the in-memory backend."""
+        with (
+            patch("brew_oracle.knowledge.beerxml_kb.Settings", return_value=self.settings),
+            patch("brew_oracle.knowledge.beerxml_kb.get_embedder", return_value=_HashEmbedder()),
+        ):
+            ingest_recipes()
+            kb = build_recipe_kb()
+
+        self.assertEqual(kb.get_count(), 1)
+        hits = search_recipes(kb, "ipa", 5, RecipeFilter(hops=["Citra"]))
+        misses = search_recipes(kb, "ipa", 5, RecipeFilter(hops=["Saaz"]))
+        lowered = search_recipes(kb, "ipa", 5, RecipeFilter(hops=["citra"]))
+        self.assertEqual([d.meta_data["name"] for d in hits], ["My Test IPA"])
+        self.assertEqual(misses, [])
+        self.assertEqual([d.meta_data["name"] for d in lowered], ["My Test IPA"])
+
+    def test_bulk_recipe_load_without_server(self):
+        """Test that the upload_points path writes the same recipes as the upserts."""
+        self.settings.INGEST_BULK = True
+        with (
+            patch("brew_oracle.knowledge.beerxml_kb.Settings", return_value=self.settings),
+            patch("brew_oracle.knowledge.beerxml_kb.get_embedder", return_value=_HashEmbedder()),
+        ):
+            ingest_recipes()
+            kb = build_recipe_kb()
+
+        self.assertEqual(kb.get_count(), 1)
+        self.assertEqual(len(search_recipes(kb, "ipa", 5, RecipeFilter(hops=["Citra"]))), 1)
+
+    def test_recipe_table_drops_removed_files(self):
+        """Test that the rows of a deleted BeerXML file leave the recipe table."""
+        with open(SAMPLE_RECIPE, encoding="utf-8") as f:
+            xml = f.read().replace("My Test IPA", "Second IPA")
+        second = os.path.join(self.settings.BEERXML_PATH, "second.xml")
+        with open(second, "w", encoding="utf-8") as f:
+            f.write(xml)
+
+        with (
+            patch("brew_oracle.knowledge.beerxml_kb.Settings", return_value=self.settings),
+            patch("brew_oracle.knowledge.beerxml_kb.get_embedder", return_value=_HashEmbedder()),
+        ):
+            ingest_recipes()
+            self.assertEqual(len(RecipeTable.load(recipe_table_path(self.settings))), 2)
+            os.remove(second)
+            ingest_recipes()
+
+        table = RecipeTable.load(recipe_table_path(self.settings))
+        self.assertEqual([row["name"] for row in table.rows()], ["My Test IPA"])
+
+
+if __name__ == "__main__":
+    unittest.main()
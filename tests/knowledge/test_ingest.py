@@ -0,0 +1,140 @@
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from agno.document import Document
+from agno.vectordb.search import SearchType
+from qdrant_client.http import models
+
+from brew_oracle.knowledge.ingest import (
+    build_points,
+    bulk_load,
+    embed_texts,
+    point_id,
+    upload_documents,
+    upsert_documents,
+)
+from brew_oracle.utils.embedding_store import EmbeddingStore
+
+
+class TestIngestHelpers(unittest.TestCase):
+    def test_embed_texts_uses_single_batched_encode(self):
+        """Test that the shared SentenceTransformer encodes the whole list at once."""
+        embedder = MagicMock()
+        embedder.sentence_transformer_client.encode.return_value = [[1, 2], [3, 4]]
+
+        vectors = embed_texts(embedder, ["a", "b"], batch_size=8)
+
+        self.assertEqual(vectors, [[1.0, 2.0], [3.0, 4.0]])
+        embedder.sentence_transformer_client.encode.assert_called_once()
+        embedder.get_embedding.assert_not_called()
+
+    def test_embed_texts_reads_the_store_first(self):
+        """Test that only texts missing from the store reach the encoder, then get stored."""
+        embedder = MagicMock()
+        embedder.sentence_transformer_client.encode.return_value = [[3, 4]]
+        with tempfile.TemporaryDirectory() as tmp:
+            store = EmbeddingStore(tmp, "m", 2)
+            store.put_many(["a"], [[1, 2]])
+
+            vectors = embed_texts(embedder, ["a", "b"], store=store)
+
+            self.assertEqual(vectors, [[1.0, 2.0], [3.0, 4.0]])
+            self.assertEqual(embedder.sentence_transformer_client.encode.call_args[0][0], ["b"])
+            self.assertEqual(store.get_many(["b"]), [[3.0, 4.0]])
+
+    def test_build_points_vector_mode(self):
+        db = MagicMock(search_type=SearchType.vector)
+        doc = Document(name="bjcp", content="IPA", meta_data={"page": 1})
+
+        (point,) = build_points(db, [doc], [[0.1, 0.2]])
+
+        self.assertEqual(point.id, point_id("IPA"))
+        self.assertEqual(point.vector, [0.1, 0.2])
+        self.assertEqual(point.payload["meta_data"], {"page": 1})
+        self.assertEqual(point.payload["content"], "IPA")
+
+    def test_build_points_hybrid_mode(self):
+        db = MagicMock(
+            search_type=SearchType.hybrid, dense_vector_name="dense", sparse_vector_name="sparse"
+        )
+        sparse = MagicMock()
+        sparse.as_object.return_value = {"indices": [1], "values": [0.5]}
+        db.sparse_encoder.embed.return_value = iter([sparse])
+
+        (point,) = build_points(db, [Document(content="IPA")], [[0.1]])
+
+        self.assertEqual(point.vector["dense"], [0.1])
+        self.assertEqual(point.vector["sparse"].indices, [1])
+
+    def test_upsert_documents_in_batches(self):
+        db = MagicMock(search_type=SearchType.vector, collection="books")
+        db.embedder.sentence_transformer_client = None
+        db.embedder.get_embedding.return_value = [0.0]
+        docs = [Document(content=f"doc {i}") for i in range(5)]
+
+        written = upsert_documents(db, docs, batch_size=2)
+
+        self.assertEqual(written, 5)
+        self.assertEqual(db.client.upsert.call_count, 3)
+
+    def test_upload_documents_streams_points(self):
+        """Test that every document goes through one upload_points call with the parallelism."""
+        db = MagicMock(search_type=SearchType.vector, collection="books")
+        db.embedder.sentence_transformer_client = None
+        db.embedder.get_embedding.return_value = [0.0]
+        uploaded = []
+        db.client.upload_points.side_effect = lambda points, **kwargs: uploaded.extend(points)
+        docs = [Document(content=f"doc {i}") for i in range(5)]
+
+        written = upload_documents(db, docs, batch_size=2, upload_batch_size=3, parallel=4)
+
+        self.assertEqual(written, 5)
+        self.assertEqual([p.id for p in uploaded], [point_id(d.content) for d in docs])
+        kwargs = db.client.upload_points.call_args.kwargs
+        self.assertEqual((kwargs["batch_size"], kwargs["parallel"]), (3, 4))
+        db.client.upsert.assert_not_called()
+
+
+class TestBulkLoad(unittest.TestCase):
+    def _client(self, threshold):
+        client = MagicMock()
+        client.get_collection.return_value = SimpleNamespace(
+            config=SimpleNamespace(optimizer_config=SimpleNamespace(indexing_threshold=threshold)),
+            status=models.CollectionStatus.GREEN,
+        )
+        return client
+
+    def _thresholds(self, client):
+        return [
+            c.kwargs["optimizers_config"].indexing_threshold
+            for c in client.update_collection.call_args_list
+        ]
+
+    def test_indexing_is_paused_and_restored(self):
+        """Test that HNSW indexing is off during the load and the old threshold comes back."""
+        client = self._client(10000)
+
+        with self.assertLogs("brew_oracle.knowledge.ingest", "INFO") as logs:
+            with bulk_load(client, "books") as report:
+                self.assertEqual(self._thresholds(client), [0])
+                report.points = 100
+
+        self.assertEqual(self._thresholds(client), [0, 10000])
+        self.assertGreater(report.points_per_second, 0)
+        self.assertIn("pontos/s", logs.output[0])
+
+    @patch("brew_oracle.knowledge.ingest.wait_until_indexed")
+    def test_failed_load_restores_indexing_without_waiting(self, mock_wait):
+        client = self._client(None)
+
+        with self.assertRaises(RuntimeError), bulk_load(client, "books"):
+            raise RuntimeError("upload")
+
+        self.assertEqual(self._thresholds(client), [0, 20000])
+        mock_wait.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
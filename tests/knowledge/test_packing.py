@@ -0,0 +1,94 @@
+import unittest
+
+from agno.document import Document
+
+from brew_oracle.knowledge.packing import ContextPacker, rank_by_position, stitch
+from brew_oracle.utils.tracing import count_tokens
+
+
+def _chunks(text: str, size: int, overlap: int, page: int = 1, name: str = "livro"):
+    """Cut ``text`` like agno's chunking: fixed windows sharing ``overlap`` characters."""
+    docs, start, number = [], 0, 1
+    while start < len(text):
+        end = min(start + size, len(text))
+        docs.append(
+            Document(
+                content=text[start:end],
+                name=name,
+                meta_data={"page": page, "chunk": number, "chunk_size": end - start},
+            )
+        )
+        if end == len(text):
+            break
+        start, number = end - overlap, number + 1
+    return docs
+
+
+class TestContextPacker(unittest.TestCase):
+    def test_stitch_writes_the_overlap_once(self):
+        self.assertEqual(
+            stitch("mostura a 65 graus", "65 graus por uma hora"), "mostura a 65 graus por uma hora"
+        )
+        self.assertEqual(stitch("lúpulo", "levedura"), "lúpulo\nlevedura")
+
+    def test_neighbour_chunks_of_a_page_are_merged(self):
+        """Test that consecutive chunks become the original text, without repeated overlap."""
+        text = " ".join(f"palavra{i}" for i in range(120))
+        chunks = _chunks(text, size=200, overlap=50)
+        other_page = Document(
+            content="outra página", name="livro", meta_data={"page": 2, "chunk": 2}
+        )
+
+        docs, report = ContextPacker().pack(rank_by_position(chunks + [other_page]))
+
+        self.assertEqual(docs[0].content, text)
+        self.assertEqual(docs[0].meta_data["chunks"], list(range(1, len(chunks) + 1)))
+        self.assertEqual(docs[1].content, "outra página")
+        self.assertEqual(report.merged, len(chunks) - 1)
+        self.assertGreater(report.tokens_saved, 0)
+
+    def test_duplicates_keep_the_best_score(self):
+        """Test that the same chunk returned twice is sent once, at its best rank."""
+        a = Document(content="IPA amarga", id="a")
+        b = Document(content="Stout torrada", id="b")
+        a_again = Document(content="IPA amarga", id="a")
+
+        docs, report = ContextPacker().pack([(b, 0.9), (a, 0.5), (a_again, 0.95)])
+
+        self.assertEqual([d.content for d in docs], ["IPA amarga", "Stout torrada"])
+        self.assertEqual(report.duplicates, 1)
+
+    def test_budget_keeps_the_best_documents_that_fit(self):
+        """Test that lower-scored documents are dropped once the token budget is used."""
+        long_doc = Document(content="malte " * 30, id="long")
+        short = Document(content="lúpulo cascade", id="short")
+        medium = Document(content="levedura " * 10, id="medium")
+        packer = ContextPacker(token_budget=15)
+
+        docs, report = packer.pack([(medium, 0.9), (long_doc, 0.8), (short, 0.1)])
+
+        self.assertEqual([d.id for d in docs], ["medium", "short"])
+        self.assertEqual(report.dropped, 1)
+        self.assertLessEqual(report.tokens_out, 15)
+        self.assertEqual(packer.metrics.tokens_saved, report.tokens_saved)
+
+    def test_best_document_is_truncated_when_nothing_fits(self):
+        doc = Document(content="malte " * 30, id="long")
+
+        docs, report = ContextPacker(token_budget=5).pack([(doc, 1.0)])
+
+        self.assertEqual(count_tokens(docs[0].content), 5)
+        self.assertEqual(doc.content, "malte " * 30)
+        self.assertEqual(report.tokens_out, 5)
+
+    def test_rank_by_position_interleaves_collections(self):
+        pdf = ["p1", "p2", "p3"]
+        recipes = ["r1", "r2"]
+
+        ranked = [doc for doc, _ in rank_by_position(pdf, recipes)]
+
+        self.assertEqual(ranked, ["p1", "r1", "p2", "r2", "p3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,37 @@
+import os
+import tempfile
 import unittest
-from unittest.mock import MagicMock, patch
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import ANY, MagicMock, patch
 
-from brew_oracle.knowledge.pdf_kb import build_pdf_kb, ingest_pdfs
+from agno.document import Document
+from agno.knowledge.pdf import PDFReader
+
+from brew_oracle.knowledge.pdf_kb import (
+    PDFIngestionPipeline,
+    build_pdf_kb,
+    ingest_pdfs,
+    ingest_pdfs_incremental,
+)
 
 
 class TestPDFKnowledgeBase(unittest.TestCase):
+    @patch("brew_oracle.knowledge.pdf_kb.use_shared_clients", side_effect=lambda db, s: db)
     @patch("brew_oracle.knowledge.pdf_kb.Settings")
     @patch("brew_oracle.knowledge.pdf_kb.PDFKnowledgeBase")
-    @patch("brew_oracle.knowledge.pdf_kb.SentenceTransformerEmbedder")
+    @patch("brew_oracle.knowledge.pdf_kb.get_embedder")
     @patch("os.path.isdir")
     @patch("os.makedirs")
     def test_build_pdf_kb(
-        self, mock_makedirs, mock_isdir, mock_embedder, mock_pdf_kb, mock_settings
+        self, mock_makedirs, mock_isdir, mock_embedder, mock_pdf_kb, mock_settings, mock_shared
     ):
         """Test that the PDFKnowledgeBase is built correctly."""
         mock_settings_instance = MagicMock()
         mock_settings_instance.PDF_PATH = "/fake/path"
         mock_settings_instance.EMBEDDER_ID = "fake_embedder_id"
         mock_settings_instance.EMBEDDER_DIM = 384
+        mock_settings_instance.EMBEDDER_BACKEND = "torch"
         mock_settings_instance.QDRANT_COLLECTION = "fake_collection"
         mock_settings_instance.QDRANT_URL = "fake_url"
         mock_settings_instance.DENSE_VECTOR_NAME = "fake_dense_vector_name"
@@ -34,13 +48,14 @@ class TestPDFKnowledgeBase(unittest.TestCase):
         kb = build_pdf_kb()
 
         self.assertIsNotNone(kb)
-        mock_embedder.assert_called_once()
+        mock_embedder.assert_called_once_with("fake_embedder_id", 384, "torch")
         mock_pdf_kb.assert_called_once()
         mock_makedirs.assert_called_once_with("/fake/path", exist_ok=True)
 
+    @patch("brew_oracle.knowledge.pdf_kb.invalidate_collection")
     @patch("brew_oracle.knowledge.pdf_kb.build_pdf_kb")
-    @patch("qdrant_client.QdrantClient")
-    def test_ingest_pdfs(self, mock_qdrant_client, mock_build_pdf_kb):
+    @patch("brew_oracle.knowledge.pdf_kb.get_qdrant_client")
+    def test_ingest_pdfs(self, mock_qdrant_client, mock_build_pdf_kb, mock_invalidate):
         """Test that the PDF ingestion process is called correctly."""
         mock_kb = MagicMock()
         mock_build_pdf_kb.return_value = mock_kb
@@ -48,12 +63,208 @@ class TestPDFKnowledgeBase(unittest.TestCase):
         mock_qdrant_client.return_value = mock_client
         mock_client.count.return_value.count = 10
 
-        ingest_pdfs()
+        count = ingest_pdfs(incremental=False)
 
-        mock_build_pdf_kb.assert_called_once_with(hybrid=False)
+        self.assertEqual(count, 10)
+        mock_build_pdf_kb.assert_called_once_with(hybrid=False, s=ANY)
         mock_kb.load.assert_called_once_with(upsert=True)
         mock_qdrant_client.assert_called_once()
         mock_client.count.assert_called_once()
+        mock_invalidate.assert_called_once()
+
+
+@patch("brew_oracle.knowledge.pdf_kb.delete_points", side_effect=lambda db, ids: len(ids))
+@patch("brew_oracle.knowledge.pdf_kb.upsert_documents")
+class TestIncrementalPDFIngestion(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_dir = os.path.join(self.tmp.name, "pdfs")
+        os.makedirs(self.pdf_dir)
+        self.settings = MagicMock()
+        self.settings.PDF_PATH = self.pdf_dir
+        self.settings.QDRANT_COLLECTION = "books"
+        self.settings.INGEST_STATE_DIR = os.path.join(self.tmp.name, "state")
+        self.settings.INGEST_BATCH_SIZE = 64
+        self.settings.INGEST_PAGES_PER_TASK = 8
+        self.settings.INGEST_QUEUE_SIZE = 256
+        self.settings.EMBEDDING_STORE_DIR = None
+
+        self.kb = MagicMock()
+        self.kb.reader = MagicMock(spec=PDFReader)
+        self.kb.vector_db.get_count.return_value = 1
+        self.kb.reader.read.side_effect = self._read
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, text):
+        with open(os.path.join(self.pdf_dir, name), "w") as f:
+            f.write(text)
+
+    @staticmethod
+    def _read(pdf):
+        with open(pdf) as f:
+            return [Document(content=line, meta_data={}) for line in f.read().splitlines()]
+
+    def test_first_run_ingests_everything(self, mock_upsert, mock_delete):
+        self._write("a.pdf", "chunk1\nchunk2")
+        self._write("b.pdf", "chunk3")
+
+        summary = ingest_pdfs_incremental(self.kb, self.settings, hybrid=False)
+
+        self.assertEqual(summary.files_updated, 2)
+        self.assertEqual(summary.chunks_added, 3)
+        self.assertEqual(summary.chunks_deleted, 0)
+        upserted = [d for call in mock_upsert.call_args_list for d in call.args[1]]
+        self.assertEqual({d.meta_data["source"] for d in upserted}, {"a.pdf", "b.pdf"})
+
+    def test_unchanged_files_are_skipped(self, mock_upsert, mock_delete):
+        """Test that a second run neither parses nor embeds unchanged files."""
+        self._write("a.pdf", "chunk1\nchunk2")
+        ingest_pdfs_incremental(self.kb, self.settings, hybrid=False)
+        self.kb.reader.read.reset_mock()
+        mock_upsert.reset_mock()
+
+        summary = ingest_pdfs_incremental(self.kb, self.settings, hybrid=False)
+
+        self.assertEqual(summary.files_skipped, 1)
+        self.assertEqual(summary.chunks_added, 0)
+        self.kb.reader.read.assert_not_called()
+        mock_upsert.assert_not_called()
+
+    def test_changed_and_removed_files(self, mock_upsert, mock_delete):
+        """Test that only new chunks are embedded and stale points are deleted."""
+        self._write("a.pdf", "chunk1\nchunk2")
+        self._write("b.pdf", "chunk3")
+        ingest_pdfs_incremental(self.kb, self.settings, hybrid=False)
+        mock_upsert.reset_mock()
+
+        self._write("a.pdf", "chunk1\nchunk2 edited\nchunk4")
+        os.remove(os.path.join(self.pdf_dir, "b.pdf"))
+        summary = ingest_pdfs_incremental(self.kb, self.settings, hybrid=False)
+
+        upserted = [d.content for d in mock_upsert.call_args.args[1]]
+        self.assertEqual(upserted, ["chunk2 edited", "chunk4"])
+        self.assertEqual(summary.files_updated, 1)
+        self.assertEqual(summary.files_removed, 1)
+        self.assertEqual(summary.chunks_kept, 1)
+        self.assertEqual(summary.chunks_deleted, 2)
+
+    def test_failed_read_keeps_the_ingested_file(self, mock_upsert, mock_delete):
+        """Test that a transient read error neither deletes old chunks nor marks the file done."""
+        self._write("a.pdf", "chunk1\nchunk2")
+        ingest_pdfs_incremental(self.kb, self.settings, hybrid=False)
+        self._write("a.pdf", "chunk1\nchunk3")
+        self.kb.reader.read.side_effect = OSError("disco indisponível")
+
+        with self.assertLogs("brew_oracle.knowledge.pdf_kb", "ERROR"):
+            summary = ingest_pdfs_incremental(self.kb, self.settings, hybrid=False)
+
+        self.assertEqual((summary.files_failed, summary.files_removed), (1, 0))
+        self.assertEqual(summary.chunks_deleted, 0)
+        self.assertEqual(mock_delete.call_args.args[1], [])
+
+        self.kb.reader.read.side_effect = self._read
+        summary = ingest_pdfs_incremental(self.kb, self.settings, hybrid=False)
+
+        self.assertEqual((summary.files_updated, summary.chunks_added), (1, 1))
+        self.assertEqual(summary.chunks_deleted, 1)
+
+    def test_empty_collection_discards_manifest(self, mock_upsert, mock_delete):
+        self._write("a.pdf", "chunk1")
+        ingest_pdfs_incremental(self.kb, self.settings, hybrid=False)
+        self.kb.vector_db.get_count.return_value = 0
+
+        summary = ingest_pdfs_incremental(self.kb, self.settings, hybrid=False)
+
+        self.assertEqual(summary.files_updated, 1)
+        self.assertEqual(summary.chunks_added, 1)
+
+
+@patch("brew_oracle.knowledge.pdf_kb.ProcessPoolExecutor", ThreadPoolExecutor)
+@patch("brew_oracle.knowledge.pdf_kb.extract_pages")
+@patch("brew_oracle.knowledge.pdf_kb.PdfReader")
+class TestPDFIngestionPipeline(unittest.TestCase):
+    def setUp(self):
+        self.reader = MagicMock()
+        self.reader._create_documents.side_effect = (
+            lambda pages, name, use_uuid_for_id, page_number_shift: [
+                Document(content=f"{name}: {page}", meta_data={}) for page in pages
+            ]
+        )
+        self.reader.page_start_numbering_format = "<start page {page_nr}>"
+        self.reader.page_end_numbering_format = "<end page {page_nr}>"
+        self.pages = {"a.pdf": 5, "b.pdf": 3, "c.pdf": 0}
+
+    def _setup_pages(self, mock_pdf_reader, mock_extract):
+        mock_pdf_reader.side_effect = lambda pdf: MagicMock(
+            pages=[None] * self.pages[Path(pdf).name]
+        )
+        mock_extract.side_effect = lambda path, start, stop: [
+            f"page {i} of {Path(path).stem}" for i in range(start, stop)
+        ]
+
+    def test_workers_extract_pages_in_order(self, mock_pdf_reader, mock_extract):
+        self._setup_pages(mock_pdf_reader, mock_extract)
+        pipeline = PDFIngestionPipeline(self.reader, MagicMock(), workers=2, pages_per_task=2)
+
+        results = list(pipeline.iter_documents([Path(name) for name in self.pages]))
+
+        self.assertEqual([(pdf.name, n) for pdf, n, _ in results], list(self.pages.items()))
+        self.assertEqual(
+            [doc.content for doc in results[0][2]],
+            [f"a: page {i} of a" for i in range(5)],
+        )
+        self.assertEqual(results[2][2], [])
+
+    def test_failed_extraction_is_reported(self, mock_pdf_reader, mock_extract):
+        """Test that files whose pages cannot be read yield None instead of no chunks."""
+        self._setup_pages(mock_pdf_reader, mock_extract)
+        mock_extract.side_effect = lambda path, start, stop: (
+            [f"page {i}" for i in range(start, stop)] if "a" in path else 1 / 0
+        )
+        pipeline = PDFIngestionPipeline(self.reader, MagicMock(), workers=2, pages_per_task=2)
+
+        with self.assertLogs("brew_oracle.knowledge.pdf_kb", "ERROR"):
+            results = list(pipeline.iter_documents([Path(name) for name in self.pages]))
+
+        self.assertEqual([docs is None for _, _, docs in results], [False, True, False])
+
+    @patch("brew_oracle.knowledge.pdf_kb.upsert_documents")
+    def test_run_embeds_selected_chunks_in_batches(
+        self, mock_upsert, mock_pdf_reader, mock_extract
+    ):
+        """Test that selected chunks are embedded in batches and counted per stage."""
+        self._setup_pages(mock_pdf_reader, mock_extract)
+        batches = []
+        mock_upsert.side_effect = lambda db, docs, batch_size, store=None: (
+            batches.append(docs) or len(docs)
+        )
+        pipeline = PDFIngestionPipeline(
+            self.reader, MagicMock(), workers=2, pages_per_task=2, queue_size=1, batch_size=3
+        )
+
+        metrics = pipeline.run(
+            [Path(name) for name in self.pages],
+            lambda pdf, docs: [d for d in docs if "page 0 " not in d.content],
+        )
+
+        self.assertEqual([len(batch) for batch in batches], [3, 3])
+        self.assertEqual((metrics.files, metrics.pages, metrics.chunks), (3, 8, 8))
+        self.assertEqual(metrics.vectors, 6)
+
+    @patch("brew_oracle.knowledge.pdf_kb.upsert_documents")
+    def test_run_raises_embedding_errors(self, mock_upsert, mock_pdf_reader, mock_extract):
+        """Test that a failing embedding stage neither hangs extraction nor is ignored."""
+        self._setup_pages(mock_pdf_reader, mock_extract)
+        mock_upsert.side_effect = RuntimeError("Qdrant down")
+        pipeline = PDFIngestionPipeline(
+            self.reader, MagicMock(), workers=2, queue_size=1, batch_size=1
+        )
+
+        with self.assertRaises(RuntimeError):
+            pipeline.run([Path(name) for name in self.pages])
+        mock_upsert.assert_called_once()
 
 
 if __name__ == "__main__":
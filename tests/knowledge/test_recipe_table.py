@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+from brew_oracle.knowledge.beerxml_kb import RecipeFilter
+from brew_oracle.knowledge.recipe_table import RecipeTable, RecipeTableBuilder, RecipeTableCache
+
+
+def _table():
+    builder = RecipeTableBuilder()
+    builder.add(
+        {
+            "name": "Citra IPA",
+            "style": "American IPA",
+            "og": 1.065,
+            "ibu": 70,
+            "abv": 6.8,
+            "hops": ["Citra", "Mosaic"],
+            "yeasts": ["US-05"],
+        },
+        "a.xml",
+    )
+    builder.add(
+        {
+            "name": "Session IPA",
+            "style": "American IPA",
+            "og": 1.045,
+            "ibu": 40,
+            "abv": 4.2,
+            "hops": ["Citra"],
+            "yeasts": ["US-05"],
+        },
+        "a.xml",
+    )
+    builder.add(
+        {
+            "name": "Dry Stout",
+            "style": "Irish Stout",
+            "og": 1.060,
+            "ibu": 35,
+            "abv": None,
+            "hops": [],
+            "yeasts": ["Irish Ale"],
+        },
+        "b.xml",
+    )
+    return builder.build()
+
+
+class TestRecipeTable(unittest.TestCase):
+    def test_mask_combines_styles_hops_and_ranges(self):
+        """Test that style, hop and inclusive range filters match like the Qdrant filter."""
+        table = _table()
+
+        ipas = table.mask(RecipeFilter(styles=["american ipa"], hops=["CITRA"], ibu_min=60))
+        gravity = table.mask(RecipeFilter(og_min=1.060, og_max=1.065))
+        mosaic_stout = table.mask(RecipeFilter(styles=["Irish Stout"], hops=["Mosaic"]))
+
+        self.assertEqual(table.names[ipas].tolist(), ["Citra IPA"])
+        self.assertEqual(table.names[gravity].tolist(), ["Citra IPA", "Dry Stout"])
+        self.assertFalse(mosaic_stout.any())
+
+    def test_summarize_aggregates_and_skips_missing_values(self):
+        stats = _table().summarize(RecipeFilter(), fields=["ibu", "abv"])
+
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.stats["ibu"]["mean"], 48.3333)
+        self.assertEqual(stats.stats["abv"]["count"], 2)
+        self.assertEqual(stats.stats["abv"]["max"], 6.8)
+        with self.assertRaises(ValueError):
+            _table().summarize(fields=["name"])
+
+    def test_save_load_and_extend_round_trip(self):
+        """Test that a saved table reloads and can drop the recipes of re-ingested files."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "recipes.npz")
+            cache = RecipeTableCache(path)
+            self.assertIsNone(cache.get())
+
+            _table().save(path)
+            loaded = cache.get()
+            builder = RecipeTableBuilder()
+            builder.extend(loaded, exclude_files=["a.xml"])
+
+            self.assertIs(cache.get(), loaded)
+            self.assertEqual(len(loaded), 3)
+            rows = list(builder.build().rows())
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(rows[0]["style"], "Irish Stout")
+            self.assertEqual(rows[0]["yeasts"], ["Irish Ale"])
+            self.assertIsNone(rows[0]["abv"])
+            self.assertEqual(rows[0]["file"], "b.xml")
+            self.assertIsInstance(RecipeTable.load(path), RecipeTable)
+
+
+if __name__ == "__main__":
+    unittest.main()
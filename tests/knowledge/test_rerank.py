@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from agno.document import Document
+
+from brew_oracle.knowledge.rerank import Reranker
+
+
+class TestReranker(unittest.TestCase):
+    @patch("brew_oracle.knowledge.rerank.get_cross_encoder")
+    def test_rerank_sorts_by_score_and_caps_candidates(self, mock_get_cross_encoder):
+        """Test that only max_candidates docs are scored, in batches, best first."""
+        mock_model = MagicMock()
+        mock_model.predict.return_value = [0.1, 0.9]
+        mock_get_cross_encoder.return_value = mock_model
+        docs = [Document(content="a"), Document(content="b"), Document(content="c")]
+
+        reranker = Reranker("ce", max_candidates=2, batch_size=8, max_length=128)
+        result = reranker.rerank("query", docs)
+
+        self.assertEqual([d.content for d in result], ["b", "a"])
+        mock_get_cross_encoder.assert_called_once_with("ce", max_length=128)
+        args, kwargs = mock_model.predict.call_args
+        self.assertEqual(args[0], [("query", "a"), ("query", "b")])
+        self.assertEqual(kwargs["batch_size"], 8)
+
+    @patch("brew_oracle.knowledge.rerank.get_cross_encoder")
+    def test_long_chunks_are_truncated(self, mock_get_cross_encoder):
+        """Test that documents are cut to max_chars before scoring."""
+        mock_model = MagicMock()
+        mock_model.predict.return_value = [0.5]
+        mock_get_cross_encoder.return_value = mock_model
+
+        reranker = Reranker("ce", max_chars=10)
+        reranker.rerank("query", [Document(content="x" * 2000)])
+
+        pairs = mock_model.predict.call_args[0][0]
+        self.assertEqual(pairs[0][1], "x" * 10)
+
+    @patch("brew_oracle.knowledge.rerank.get_cross_encoder")
+    def test_scores_are_cached_per_query_and_chunk(self, mock_get_cross_encoder):
+        """Test that known (query, chunk) pairs skip the cross-encoder."""
+        mock_model = MagicMock()
+        mock_model.predict.side_effect = [[0.2, 0.8], [0.5]]
+        mock_get_cross_encoder.return_value = mock_model
+        a, b, c = Document(content="a"), Document(content="b"), Document(content="c")
+
+        reranker = Reranker("ce")
+        reranker.rerank("Query", [a, b])
+        ranked = reranker.score("query", [a, b, c])
+
+        self.assertEqual(mock_model.predict.call_count, 2)
+        self.assertEqual(mock_model.predict.call_args[0][0], [("query", "c")])
+        self.assertEqual([(d.content, s) for d, s in ranked], [("b", 0.8), ("c", 0.5), ("a", 0.2)])
+        self.assertEqual(reranker.metrics.calls, 2)
+        self.assertEqual(reranker.metrics.scored, 3)
+        self.assertEqual(reranker.metrics.cache_hits, 2)
+
+    @patch("brew_oracle.knowledge.rerank.get_cross_encoder")
+    def test_score_many_uses_one_cross_encoder_pass(self, mock_get_cross_encoder):
+        """Test that the pairs of every query are scored in a single predict call."""
+        mock_model = MagicMock()
+        mock_model.predict.return_value = [0.1, 0.9, 0.7]
+        mock_get_cross_encoder.return_value = mock_model
+        a, b, c = Document(content="a"), Document(content="b"), Document(content="c")
+
+        reranker = Reranker("ce")
+        ranked = reranker.score_many(["ipa", "stout"], [[a, b], [c]])
+
+        mock_model.predict.assert_called_once()
+        self.assertEqual(
+            mock_model.predict.call_args[0][0], [("ipa", "a"), ("ipa", "b"), ("stout", "c")]
+        )
+        self.assertEqual([[d.content for d, _ in r] for r in ranked], [["b", "a"], ["c"]])
+        self.assertEqual(reranker.metrics.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,239 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from agno.vectordb.search import SearchType
+
+from brew_oracle.knowledge.retrieval import (
+    ParallelRetriever,
+    embed_queries,
+    get_vector_db,
+    search,
+    search_batch_by_vector,
+    search_by_vector,
+    search_params_from_settings,
+)
+from brew_oracle.utils.cache import TTLCache
+
+
+def _fake_kb(embedder):
+    db = MagicMock()
+    db.vector_db = None
+    db.embedder = embedder
+    db.search_type = SearchType.vector
+    db.use_named_vectors = False
+    return db
+
+
+class TestSearchByVector(unittest.TestCase):
+    def test_get_vector_db_unwraps_knowledge_base(self):
+        """Test that the vector db is taken from a knowledge base wrapper."""
+        pdf_kb = MagicMock()
+        self.assertIs(get_vector_db(pdf_kb), pdf_kb.vector_db)
+
+    def test_vector_search_uses_precomputed_embedding(self):
+        """Test that the dense search does not embed the query again."""
+        db = _fake_kb(MagicMock())
+        db.collection = "books"
+        db._format_filters.return_value = None
+
+        docs = search_by_vector(db, "mash temperature", [0.1, 0.2], 3)
+
+        db.embedder.get_embedding.assert_not_called()
+        kwargs = db.client.query_points.call_args.kwargs
+        self.assertEqual(kwargs["collection_name"], "books")
+        self.assertEqual(kwargs["query"], [0.1, 0.2])
+        self.assertEqual(kwargs["limit"], 3)
+        self.assertIsNone(kwargs["using"])
+        self.assertEqual(docs, db._build_search_results.return_value)
+
+    def test_search_params_from_settings(self):
+        """Test that HNSW ef and quantization oversampling reach the dense search."""
+        s = SimpleNamespace(SEARCH_HNSW_EF=128, SEARCH_OVERSAMPLING=2.0, SEARCH_RESCORE=True)
+        params = search_params_from_settings(s)
+        db = _fake_kb(MagicMock())
+        db.embedder.get_embedding.return_value = [0.3]
+
+        search(db, "lager", 4, None, params)
+
+        kwargs = db.client.query_points.call_args.kwargs
+        self.assertEqual(kwargs["query"], [0.3])
+        self.assertEqual(kwargs["search_params"].hnsw_ef, 128)
+        self.assertEqual(kwargs["search_params"].quantization.oversampling, 2.0)
+        self.assertTrue(kwargs["search_params"].quantization.rescore)
+        unset = SimpleNamespace(SEARCH_HNSW_EF=None, SEARCH_OVERSAMPLING=None, SEARCH_RESCORE=True)
+        self.assertIsNone(search_params_from_settings(unset))
+
+    def test_batch_search_is_one_qdrant_call(self):
+        """Test that many queries become the requests of a single query_batch_points call."""
+        db = _fake_kb(MagicMock())
+        db.collection = "books"
+        db._format_filters.return_value = None
+        db.client.query_batch_points.return_value = [
+            SimpleNamespace(points=[f"p{i}"]) for i in range(3)
+        ]
+        db._build_search_results.side_effect = lambda points, query: [(query, points[0])]
+
+        results = search_batch_by_vector(db, ["a", "b", "c"], [[0.1], [0.2], [0.3]], 5)
+
+        db.client.query_points.assert_not_called()
+        db.client.query_batch_points.assert_called_once()
+        requests = db.client.query_batch_points.call_args.kwargs["requests"]
+        self.assertEqual([r.query for r in requests], [[0.1], [0.2], [0.3]])
+        self.assertTrue(all(r.limit == 5 for r in requests))
+        self.assertEqual(results, [[("a", "p0")], [("b", "p1")], [("c", "p2")]])
+
+    def test_embed_queries_batches_only_the_misses(self):
+        """Test that uncached queries go to the encoder together and are cached."""
+        embedder = MagicMock()
+        embedder.id = "m"
+        embedder.get_embedding.return_value = [[1.0], [3.0]]
+        cache = TTLCache(maxsize=8)
+        cache.set(("m", "b"), [2.0])
+
+        embeddings = embed_queries(embedder, ["a", "B", "c"], cache)
+
+        self.assertEqual(embeddings, [[1.0], [2.0], [3.0]])
+        embedder.get_embedding.assert_called_once_with(["a", "c"])
+        self.assertEqual(cache.get(("m", "c")), [3.0])
+
+
+class TestParallelRetriever(unittest.TestCase):
+    def test_query_is_embedded_once(self):
+        """Test that kbs sharing an embedder trigger a single encoder call."""
+        embedder = MagicMock()
+        embedder.get_embedding.return_value = [0.5]
+        retriever = ParallelRetriever({"pdf": _fake_kb(embedder), "recipes": _fake_kb(embedder)})
+
+        with patch(
+            "brew_oracle.knowledge.retrieval.search_by_vector", return_value=["doc"]
+        ) as mock_search:
+            results = retriever.search("query", 5)
+
+        embedder.get_embedding.assert_called_once_with("query")
+        self.assertEqual(mock_search.call_count, 2)
+        self.assertEqual(results, {"pdf": ["doc"], "recipes": ["doc"]})
+        retriever.close()
+
+    def test_cached_results_skip_embedding_and_search(self):
+        """Test that a repeated query hits the caches instead of the encoder and Qdrant."""
+        embedder = MagicMock()
+        embedder.get_embedding.return_value = [0.5]
+        retriever = ParallelRetriever(
+            {"pdf": _fake_kb(embedder), "recipes": _fake_kb(embedder)},
+            embedding_cache=TTLCache(maxsize=10),
+            search_cache=TTLCache(maxsize=10),
+        )
+
+        with patch(
+            "brew_oracle.knowledge.retrieval.search_by_vector", return_value=["doc"]
+        ) as mock_search:
+            retriever.search("Mash temperature", 5)
+            results = retriever.search("mash  temperature", 5)
+
+        embedder.get_embedding.assert_called_once()
+        self.assertEqual(mock_search.call_count, 2)
+        self.assertEqual(results, {"pdf": ["doc"], "recipes": ["doc"]})
+        retriever.close()
+
+    def test_slow_collection_times_out(self):
+        """Test that a collection slower than the timeout is skipped."""
+        embedder = MagicMock()
+        slow_kb = _fake_kb(embedder)
+        released = threading.Event()
+        timeouts = []
+
+        def fake_search(kb, *args, timeout=None):
+            timeouts.append(timeout)
+            if kb is slow_kb:
+                released.wait(5)
+                return ["slow"]
+            return ["fast"]
+
+        retriever = ParallelRetriever({"pdf": _fake_kb(embedder), "recipes": slow_kb}, timeout=0.1)
+        with patch("brew_oracle.knowledge.retrieval.search_by_vector", side_effect=fake_search):
+            results = retriever.search("query", 5)
+        released.set()
+
+        self.assertEqual(results, {"pdf": ["fast"], "recipes": []})
+        # Qdrant gets the timeout too (whole seconds), so it aborts the slow query.
+        self.assertEqual(timeouts, [1, 1])
+        retriever.close()
+
+    def test_slow_collection_does_not_starve_the_others(self):
+        """Test that searches stuck in one collection never delay another collection."""
+        embedder = MagicMock()
+        slow_kb = _fake_kb(embedder)
+        released = threading.Event()
+
+        def fake_search(kb, *args, timeout=None):
+            if kb is slow_kb:
+                released.wait(5)
+                return ["slow"]
+            return ["fast"]
+
+        retriever = ParallelRetriever({"pdf": _fake_kb(embedder), "recipes": slow_kb}, timeout=0.05)
+        with patch("brew_oracle.knowledge.retrieval.search_by_vector", side_effect=fake_search):
+            results = [retriever.search(f"query {i}", 5) for i in range(4)]
+        released.set()
+
+        self.assertEqual([r["pdf"] for r in results], [["fast"]] * 4)
+        retriever.close()
+
+    def test_time_waiting_for_a_thread_is_not_counted(self):
+        """Test that the timeout starts when the search runs, not when it is queued."""
+        embedder = MagicMock()
+
+        def fake_search(kb, *args, timeout=None):
+            time.sleep(0.3)
+            return ["doc"]
+
+        retriever = ParallelRetriever({"pdf": _fake_kb(embedder)}, timeout=0.5, max_workers=1)
+        retriever._executors["pdf"].submit(time.sleep, 0.3)
+        with patch("brew_oracle.knowledge.retrieval.search_by_vector", side_effect=fake_search):
+            results, degraded = retriever.search_with_status("query", 5)
+        retriever.close()
+
+        self.assertEqual((results, degraded), ({"pdf": ["doc"]}, []))
+
+    def test_failed_collection_is_reported(self):
+        embedder = MagicMock()
+        broken_kb = _fake_kb(embedder)
+
+        def fake_search(kb, *args, timeout=None):
+            if kb is broken_kb:
+                raise ConnectionError("Qdrant down")
+            return ["doc"]
+
+        retriever = ParallelRetriever({"pdf": _fake_kb(embedder), "recipes": broken_kb})
+        with (
+            patch("brew_oracle.knowledge.retrieval.search_by_vector", side_effect=fake_search),
+            self.assertLogs("brew_oracle.knowledge.retrieval", "ERROR"),
+        ):
+            results, degraded = retriever.search_with_status("query", 5)
+        retriever.close()
+
+        self.assertEqual(results, {"pdf": ["doc"], "recipes": []})
+        self.assertEqual(degraded, ["recipes"])
+
+    def test_collections_are_searched_concurrently(self):
+        """Test that both searches run at the same time (each waits for the other)."""
+        embedder = MagicMock()
+        both_running = threading.Barrier(2, timeout=5)
+
+        def fake_search(kb, *args, timeout=None):
+            both_running.wait()
+            return ["doc"]
+
+        retriever = ParallelRetriever({"pdf": _fake_kb(embedder), "recipes": _fake_kb(embedder)})
+        with patch("brew_oracle.knowledge.retrieval.search_by_vector", side_effect=fake_search):
+            results = retriever.search("query", 5)
+        retriever.close()
+
+        self.assertEqual(results, {"pdf": ["doc"], "recipes": ["doc"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,25 @@
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
+from agno.document import Document
+from agno.vectordb.search import SearchType
+
+from brew_oracle.knowledge.recipe_table import RecipeTableBuilder, RecipeTableCache
 from brew_oracle.orchestrator.brewing_orchestrator import BrewingOrchestrator
+from brew_oracle.utils.models import clear_models
+from brew_oracle.utils.tracing import configure_tracing, disable_tracing
 
 
 class TestBrewingOrchestrator(unittest.TestCase):
+    def setUp(self):
+        clear_models()
+
     @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
     @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
     @patch("brew_oracle.orchestrator.brewing_orchestrator.Gemini")
@@ -71,7 +86,8 @@ class TestBrewingOrchestrator(unittest.TestCase):
 
         self.assertTrue(agent.rerank)
         mock_cross_encoder.assert_called_once()
-        self.assertIsNotNone(agent.agent.search_knowledge)
+        self.assertIs(agent.agent.search_knowledge, True)
+        self.assertIsNotNone(agent.agent.retriever)
 
     @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
     @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
@@ -85,7 +101,7 @@ class TestBrewingOrchestrator(unittest.TestCase):
         mock_build_recipe_kb.return_value = mock_recipe_kb
 
         agent = BrewingOrchestrator()
-        agent.agent.search_knowledge("test query")
+        agent._combined_search("test query")
 
         mock_pdf_kb.search.assert_called_once_with("test query")
         mock_recipe_kb.search.assert_called_once_with("test query")
@@ -105,7 +121,7 @@ class TestBrewingOrchestrator(unittest.TestCase):
         mock_recipe_kb.search.return_value = [MagicMock(content="recipe_doc1")]
 
         agent = BrewingOrchestrator()
-        combined_docs = agent.agent.search_knowledge("test query")
+        combined_docs = agent._combined_search("test query")
 
         self.assertEqual(len(combined_docs), 2)
         self.assertEqual(combined_docs[0].content, "pdf_doc1")
@@ -131,7 +147,7 @@ class TestBrewingOrchestrator(unittest.TestCase):
         mock_encoder.predict.return_value = [0.9, 0.1]  # Simulate reranking scores
 
         agent = BrewingOrchestrator(rerank=True)
-        reranked_docs = agent.agent.search_knowledge("test query")
+        reranked_docs = agent._combined_search("test query")
 
         self.assertEqual(len(reranked_docs), 2)
         self.assertEqual(reranked_docs[0].content, "pdf_doc1")
@@ -139,6 +155,127 @@ class TestBrewingOrchestrator(unittest.TestCase):
         mock_cross_encoder.assert_called_once()
         mock_encoder.predict.assert_called_once()
 
+    @patch.dict(os.environ, {"CONTEXT_PACKING": "true"})
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.Gemini")
+    @patch("sentence_transformers.CrossEncoder")
+    def test_ask_traces_each_stage(
+        self, mock_cross_encoder, mock_gemini, mock_build_recipe_kb, mock_build_pdf_kb
+    ):
+        """Test that one question yields a trace with retrieval, rerank and generation."""
+        mock_build_pdf_kb.return_value.search.return_value = [MagicMock(content="pdf_doc1")]
+        mock_build_recipe_kb.return_value.search.return_value = [MagicMock(content="rec_doc1")]
+        mock_cross_encoder.return_value.predict.return_value = [0.2, 0.8]
+        traces = []
+        configure_tracing(sinks=[traces.append])
+        self.addCleanup(disable_tracing)
+
+        agent = BrewingOrchestrator(rerank=True)
+
+        def run(question):
+            agent._combined_search(question)
+            return MagicMock(
+                content="Resposta curta.",
+                references=[],
+                metrics={"time": [0.25], "input_tokens": [120], "output_tokens": [4]},
+            )
+
+        agent.agent.run = MagicMock(side_effect=run)
+        agent.ask_with_refs("Qual o IBU?")
+
+        self.assertEqual(len(traces), 1)
+        spans = {s.name: s for s in traces[0]}
+        self.assertEqual(
+            set(spans),
+            {"ask", "retrieval", "kb_search", "rerank", "cross_encoder", "pack", "generation"},
+        )
+        self.assertEqual(spans["retrieval"].parent_id, spans["ask"].span_id)
+        self.assertEqual(spans["rerank"].parent_id, spans["retrieval"].span_id)
+        self.assertEqual(spans["retrieval"].attributes["docs"], 2)
+        self.assertEqual(spans["generation"].attributes["input_tokens"], 120)
+        self.assertEqual(spans["ask"].attributes["answer_tokens"], 3)
+
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.Gemini")
+    def test_answer_cache_serves_paraphrases(
+        self, mock_gemini, mock_build_recipe_kb, mock_build_pdf_kb
+    ):
+        """Test that a near-duplicate question reuses the answer without running the agent."""
+        vectors = {
+            "Qual o IBU de uma IPA?": [1.0, 0.0, 0.1],
+            "Quanto IBU tem uma IPA?": [0.99, 0.02, 0.1],
+            "Como fazer uma Stout?": [0.0, 1.0, 0.0],
+        }
+        mock_build_pdf_kb.return_value.vector_db.embedder.get_embedding.side_effect = vectors.get
+        mock_build_pdf_kb.return_value.vector_db.collection = "books"
+        mock_build_recipe_kb.return_value.vector_db = None
+        mock_build_recipe_kb.return_value.collection = "recipes"
+        agent = BrewingOrchestrator(answer_cache=True)
+        agent.agent.run = MagicMock(
+            return_value=MagicMock(content="Entre 40 e 70 IBU.", references=["bjcp"])
+        )
+
+        first = agent.ask_with_refs("Qual o IBU de uma IPA?")
+        second = agent.ask_with_refs("Quanto IBU tem uma IPA?")
+        agent.ask_with_refs("Como fazer uma Stout?")
+
+        self.assertEqual(first, second)
+        self.assertEqual(agent.agent.run.call_count, 2)
+        stats = agent.cache_stats()["answers"]
+        self.assertEqual((stats.hits, stats.misses), (1, 2))
+        self.assertEqual(agent.answer_cache.invalidate_collection("recipes"), 2)
+
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.Gemini")
+    def test_ask_many_batches_retrieval_and_bounds_concurrency(
+        self, mock_gemini, mock_build_recipe_kb, mock_build_pdf_kb
+    ):
+        """Test that questions share one search per collection and answers come back in order."""
+        embedder = MagicMock()
+        embedder.get_embedding.side_effect = lambda texts: [[float(len(t))] for t in texts]
+        for kb, name in ((mock_build_pdf_kb, "books"), (mock_build_recipe_kb, "recipes")):
+            db = kb.return_value.vector_db
+            db.collection = name
+            db.embedder = embedder
+            db.search_type = SearchType.vector
+            db.use_named_vectors = False
+            db._format_filters.return_value = None
+            db.client.query_batch_points.side_effect = lambda collection_name, requests: [
+                SimpleNamespace(points=[]) for _ in requests
+            ]
+            db._build_search_results.side_effect = lambda points, query, name=name: [
+                Document(content=f"{name}: {query}", id=f"{name}-{query}")
+            ]
+        agent = BrewingOrchestrator()
+        questions = [f"pergunta {i}" for i in range(6)]
+        lock = threading.Lock()
+        running, peak = [0], [0]
+
+        def ask_with_refs(question):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05 if question.endswith("0") else 0.01)
+            docs = agent._combined_search(question)
+            with lock:
+                running[0] -= 1
+            return question.upper(), [d.content for d in docs]
+
+        agent.fork = MagicMock(side_effect=lambda: SimpleNamespace(ask_with_refs=ask_with_refs))
+
+        results = list(agent.ask_many(questions, concurrency=2))
+
+        self.assertEqual([answer for answer, _ in results], [q.upper() for q in questions])
+        self.assertEqual(set(results[3][1]), {"books: pergunta 3", "recipes: pergunta 3"})
+        self.assertLessEqual(peak[0], 2)
+        embedder.get_embedding.assert_called_once_with(questions)
+        for kb in (mock_build_pdf_kb, mock_build_recipe_kb):
+            kb.return_value.vector_db.client.query_batch_points.assert_called_once()
+            kb.return_value.search.assert_not_called()
+
     @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
     @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
     @patch("brew_oracle.orchestrator.brewing_orchestrator.Gemini")
@@ -150,6 +287,178 @@ class TestBrewingOrchestrator(unittest.TestCase):
         mock_build_pdf_kb.assert_called_once_with(hybrid=True)
         mock_build_recipe_kb.assert_called_once_with(hybrid=True)
 
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.Gemini")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.ParallelRetriever")
+    def test_combined_search_parallel_mode(
+        self, mock_retriever, mock_gemini, mock_build_recipe_kb, mock_build_pdf_kb
+    ):
+        mock_retriever.return_value.search_with_status.return_value = (
+            {"pdf": [MagicMock(content="pdf_doc1")], "recipes": [MagicMock(content="recipe_doc1")]},
+            [],
+        )
+
+        agent = BrewingOrchestrator(parallel=True)
+        combined_docs = agent._combined_search("test query", 3)
+
+        mock_retriever.return_value.search_with_status.assert_called_once_with(
+            "test query", 3, None
+        )
+        mock_build_pdf_kb.return_value.search.assert_not_called()
+        self.assertEqual([d.content for d in combined_docs], ["pdf_doc1", "recipe_doc1"])
+
+        agent.search("other query")
+        mock_retriever.return_value.search_with_status.assert_called_with(
+            "other query", agent.num_documents, None
+        )
+
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.Gemini")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.ParallelRetriever")
+    def test_agent_knowledge_lookup_goes_through_combined_search(
+        self, mock_retriever, mock_gemini, mock_build_recipe_kb, mock_build_pdf_kb
+    ):
+        """Test that agno's own knowledge lookup uses the parallel retrieval."""
+        mock_retriever.return_value.search_with_status.return_value = (
+            {"pdf": [Document(content="pdf_doc1")], "recipes": [Document(content="recipe_doc1")]},
+            [],
+        )
+        mock_build_pdf_kb.return_value.validate_filters.return_value = ({}, [])
+
+        agent = BrewingOrchestrator(parallel=True)
+        docs = agent.agent.get_relevant_docs_from_knowledge("test query", num_documents=3)
+
+        mock_retriever.return_value.search_with_status.assert_called_once_with(
+            "test query", 3, None
+        )
+        self.assertEqual([d["content"] for d in docs], ["pdf_doc1", "recipe_doc1"])
+
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.Gemini")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.ParallelRetriever")
+    def test_timed_out_collection_is_reported(
+        self, mock_retriever, mock_gemini, mock_build_recipe_kb, mock_build_pdf_kb
+    ):
+        """Test that a collection that timed out is flagged to the model and the caller."""
+        mock_retriever.return_value.search_with_status.return_value = (
+            {"pdf": [], "recipes": [Document(content="recipe_doc1")]},
+            ["pdf"],
+        )
+        mock_build_pdf_kb.return_value.validate_filters.return_value = ({}, [])
+
+        agent = BrewingOrchestrator(parallel=True)
+        self.assertGreaterEqual(mock_retriever.call_args.kwargs["max_workers"], 1)
+        seen = []
+
+        def run(question):
+            seen.extend(agent.agent.get_relevant_docs_from_knowledge(question, num_documents=3))
+            return SimpleNamespace(content="resposta", references=[])
+
+        agent.agent.run = run
+        answer, _ = agent.ask_with_refs("test query")
+
+        self.assertEqual(answer, "resposta")
+        self.assertEqual(agent.degraded, ["pdf"])
+        self.assertIn("pdf", seen[0])
+        self.assertEqual(seen[1]["content"], "recipe_doc1")
+
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.Gemini")
+    def test_combined_search_uses_cache(self, mock_gemini, mock_build_recipe_kb, mock_build_pdf_kb):
+        """Test that repeated questions are served from the search cache."""
+        mock_pdf_kb = MagicMock()
+        mock_recipe_kb = MagicMock()
+        mock_build_pdf_kb.return_value = mock_pdf_kb
+        mock_build_recipe_kb.return_value = mock_recipe_kb
+        mock_pdf_kb.search.return_value = [MagicMock(content="pdf_doc1")]
+        mock_recipe_kb.search.return_value = []
+
+        agent = BrewingOrchestrator()
+        agent._combined_search("Qual a temperatura de mostura para IPA?")
+        docs = agent._combined_search("qual a temperatura  de mostura para ipa?")
+
+        mock_pdf_kb.search.assert_called_once()
+        mock_recipe_kb.search.assert_called_once()
+        self.assertEqual(docs[0].content, "pdf_doc1")
+        self.assertEqual(agent.cache_stats()["search"].hits, 2)
+
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.Gemini")
+    def test_ask_stream_single_run(self, mock_gemini, mock_build_recipe_kb, mock_build_pdf_kb):
+        """Test that ask_stream yields tokens and returns text and refs from one run."""
+        agent = BrewingOrchestrator()
+        events = [
+            MagicMock(event="RunStarted", content=None),
+            MagicMock(event="RunResponseContent", content="Olá, "),
+            MagicMock(event="RunResponseContent", content="cervejeiro!"),
+        ]
+        agent.agent.run = MagicMock(return_value=iter(events))
+        agent.agent.run_response = MagicMock(
+            references=None, extra_data=MagicMock(references=["ref1"])
+        )
+
+        stream = agent.ask_stream("Test question")
+        tokens = []
+        while True:
+            try:
+                tokens.append(next(stream))
+            except StopIteration as stop:
+                text, refs = stop.value
+                break
+
+        self.assertEqual(tokens, ["Olá, ", "cervejeiro!"])
+        self.assertEqual(text, "Olá, cervejeiro!")
+        self.assertEqual(refs, ["ref1"])
+        agent.agent.run.assert_called_once_with("Test question", stream=True)
+
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.Gemini")
+    def test_ask_runs_agent_once(self, mock_gemini, mock_build_recipe_kb, mock_build_pdf_kb):
+        """Test that ask does not call the model twice."""
+        agent = BrewingOrchestrator()
+        agent.agent.run = MagicMock(
+            return_value=iter([MagicMock(event="RunResponseContent", content="Resposta")])
+        )
+        agent.agent.print_response = MagicMock()
+
+        with patch("builtins.print"):
+            text = agent.ask("Test question")
+
+        self.assertEqual(text, "Resposta")
+        agent.agent.run.assert_called_once()
+        agent.agent.print_response.assert_not_called()
+
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_pdf_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.build_recipe_kb")
+    @patch("brew_oracle.orchestrator.brewing_orchestrator.Gemini")
+    def test_recipe_statistics_tool(self, mock_gemini, mock_build_recipe_kb, mock_build_pdf_kb):
+        """Test that aggregate recipe questions are answered from the recipe table."""
+        agent = BrewingOrchestrator()
+        tool = next(t for t in agent.agent.tools if t.__name__ == "recipe_statistics")
+        builder = RecipeTableBuilder()
+        for name, ibu in (("IPA 1", 60), ("IPA 2", 70)):
+            builder.add({"name": name, "style": "American IPA", "ibu": ibu}, "a.xml")
+        builder.add({"name": "Stout", "style": "Irish Stout", "ibu": 30}, "a.xml")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "recipes.npz")
+            agent.recipe_table = RecipeTableCache(path)
+            self.assertIn("error", json.loads(tool(styles=["American IPA"])))
+
+            builder.build().save(path)
+            result = json.loads(tool(styles=["American IPA"], fields=["ibu"]))
+
+        self.assertEqual(result["count"], 2)
+        self.assertEqual(result["stats"]["ibu"]["mean"], 65.0)
+        self.assertEqual(result["names"], ["IPA 1", "IPA 2"])
+        mock_build_recipe_kb.return_value.client.query_points.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
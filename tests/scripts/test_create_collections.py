@@ -1,17 +1,21 @@
 import unittest
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
+from qdrant_client.http.models import BinaryQuantization, ScalarQuantization
+
 from brew_oracle.scripts.create_collections import main
 
 
 class TestCreateCollections(unittest.TestCase):
     @patch("brew_oracle.scripts.create_collections.Settings")
-    @patch("brew_oracle.scripts.create_collections.QdrantClient")
+    @patch("brew_oracle.scripts.create_collections.get_qdrant_client")
     def test_main_create_collection(self, mock_qdrant_client, mock_settings):
         """Test that a new collection is created when it doesn't exist."""
         mock_settings.return_value.QDRANT_COLLECTION = "test_collection"
         mock_settings.return_value.QDRANT_URL = "http://localhost:6333"
         mock_settings.return_value.EMBEDDER_DIM = 384
+        mock_settings.return_value.COLLECTION_PROFILE = None
         mock_client = MagicMock()
         mock_qdrant_client.return_value = mock_client
         mock_client.collection_exists.return_value = False
@@ -22,12 +26,13 @@ class TestCreateCollections(unittest.TestCase):
         self.assertIn("criada", result)
 
     @patch("brew_oracle.scripts.create_collections.Settings")
-    @patch("brew_oracle.scripts.create_collections.QdrantClient")
+    @patch("brew_oracle.scripts.create_collections.get_qdrant_client")
     def test_main_collection_exists(self, mock_qdrant_client, mock_settings):
         """Test that the collection is not created when it already exists."""
         mock_settings.return_value.QDRANT_COLLECTION = "test_collection"
         mock_settings.return_value.QDRANT_URL = "http://localhost:6333"
         mock_settings.return_value.EMBEDDER_DIM = 384
+        mock_settings.return_value.COLLECTION_PROFILE = None
         mock_client = MagicMock()
         mock_qdrant_client.return_value = mock_client
         mock_client.collection_exists.return_value = True
@@ -38,12 +43,13 @@ class TestCreateCollections(unittest.TestCase):
         self.assertIn("já existe", result)
 
     @patch("brew_oracle.scripts.create_collections.Settings")
-    @patch("brew_oracle.scripts.create_collections.QdrantClient")
+    @patch("brew_oracle.scripts.create_collections.get_qdrant_client")
     def test_main_force_recreate(self, mock_qdrant_client, mock_settings):
         """Test that the collection is recreated when force_recreate is True."""
         mock_settings.return_value.QDRANT_COLLECTION = "test_collection"
         mock_settings.return_value.QDRANT_URL = "http://localhost:6333"
         mock_settings.return_value.EMBEDDER_DIM = 384
+        mock_settings.return_value.COLLECTION_PROFILE = None
         mock_client = MagicMock()
         mock_qdrant_client.return_value = mock_client
         mock_client.collection_exists.side_effect = [True, False]
@@ -57,12 +63,13 @@ class TestCreateCollections(unittest.TestCase):
         self.assertIn("criada", result)
 
     @patch("brew_oracle.scripts.create_collections.Settings")
-    @patch("brew_oracle.scripts.create_collections.QdrantClient")
+    @patch("brew_oracle.scripts.create_collections.get_qdrant_client")
     def test_main_hybrid_collection(self, mock_qdrant_client, mock_settings):
         """Test that a hybrid collection is created with correct configs."""
         mock_settings.return_value.QDRANT_COLLECTION = "test_hybrid_collection"
         mock_settings.return_value.QDRANT_URL = "http://localhost:6333"
         mock_settings.return_value.EMBEDDER_DIM = 384
+        mock_settings.return_value.COLLECTION_PROFILE = None
         mock_settings.return_value.DENSE_VECTOR_NAME = "dense_test"
         mock_settings.return_value.SPARSE_VECTOR_NAME = "sparse_test"
         mock_settings.return_value.SPARSE_MODEL_ID = "Qdrant/bm25"
@@ -83,12 +90,13 @@ class TestCreateCollections(unittest.TestCase):
         self.assertIn("sparse_test", call_args["sparse_vectors_config"])
 
     @patch("brew_oracle.scripts.create_collections.Settings")
-    @patch("brew_oracle.scripts.create_collections.QdrantClient")
+    @patch("brew_oracle.scripts.create_collections.get_qdrant_client")
     def test_main_custom_collection_name(self, mock_qdrant_client, mock_settings):
         """Test that a collection is created with a custom name."""
         mock_settings.return_value.QDRANT_COLLECTION = "default_collection"
         mock_settings.return_value.QDRANT_URL = "http://localhost:6333"
         mock_settings.return_value.EMBEDDER_DIM = 384
+        mock_settings.return_value.COLLECTION_PROFILE = None
 
         mock_client = MagicMock()
         mock_qdrant_client.return_value = mock_client
@@ -102,6 +110,78 @@ class TestCreateCollections(unittest.TestCase):
         self.assertIn("criada", result)
         self.assertEqual(call_args["collection_name"], custom_name)
 
+    @patch("brew_oracle.scripts.create_collections.Settings")
+    @patch("brew_oracle.scripts.create_collections.get_qdrant_client")
+    def test_main_profiles(self, mock_qdrant_client, mock_settings):
+        """Test that a profile sets HNSW, quantization and on-disk storage."""
+        mock_settings.return_value.QDRANT_COLLECTION = "test_collection"
+        mock_settings.return_value.EMBEDDER_DIM = 384
+        mock_settings.return_value.DENSE_VECTOR_NAME = "dense"
+        mock_settings.return_value.SPARSE_VECTOR_NAME = "sparse"
+        mock_settings.return_value.COLLECTION_PROFILE = "low-latency"
+        mock_client = MagicMock()
+        mock_qdrant_client.return_value = mock_client
+        mock_client.collection_exists.return_value = False
+
+        main()
+        call_args = mock_client.create_collection.call_args[1]
+        vectors = call_args["vectors_config"]
+        self.assertEqual(vectors.hnsw_config.m, 32)
+        self.assertIsInstance(vectors.quantization_config, ScalarQuantization)
+        self.assertFalse(vectors.on_disk)
+        self.assertFalse(call_args["on_disk_payload"])
+
+        main(hybrid=True, profile="low-memory")
+        call_args = mock_client.create_collection.call_args[1]
+        dense = call_args["vectors_config"]["dense"]
+        self.assertIsInstance(dense.quantization_config, BinaryQuantization)
+        self.assertTrue(dense.on_disk)
+        self.assertTrue(dense.hnsw_config.on_disk)
+        self.assertTrue(call_args["sparse_vectors_config"]["sparse"].index.on_disk)
+        self.assertTrue(call_args["on_disk_payload"])
+
+        with self.assertRaises(ValueError):
+            main(profile="fastest")
+
+    @patch("brew_oracle.scripts.create_collections.ensure_recipe_indexes")
+    @patch("brew_oracle.scripts.create_collections.Settings")
+    @patch("brew_oracle.scripts.create_collections.get_qdrant_client")
+    def test_main_recipe_collection_gets_payload_indexes(
+        self, mock_qdrant_client, mock_settings, mock_indexes
+    ):
+        """Test that payload indexes are created only for the recipe collection."""
+        mock_settings.return_value.QDRANT_COLLECTION = "books"
+        mock_settings.return_value.QDRANT_RECIPE_COLLECTION = "recipes"
+        mock_settings.return_value.VECTOR_BACKEND = "server"
+        mock_settings.return_value.EMBEDDER_DIM = 384
+        mock_settings.return_value.COLLECTION_PROFILE = None
+        mock_client = MagicMock()
+        mock_qdrant_client.return_value = mock_client
+        mock_client.collection_exists.return_value = False
+
+        main()
+        mock_indexes.assert_not_called()
+
+        main(collection_name="recipes")
+        mock_indexes.assert_called_once_with(mock_client, "recipes")
+
+    @patch("brew_oracle.scripts.create_collections.Settings")
+    @patch("brew_oracle.scripts.create_collections.get_qdrant_client")
+    def test_main_force_refuses_an_alias(self, mock_qdrant_client, mock_settings):
+        """Test that an alias is never deleted by force_recreate (use the reindex)."""
+        mock_settings.return_value.QDRANT_COLLECTION = "brew_books"
+        mock_settings.return_value.COLLECTION_PROFILE = None
+        mock_client = MagicMock()
+        mock_qdrant_client.return_value = mock_client
+        mock_client.get_aliases.return_value.aliases = [
+            SimpleNamespace(alias_name="brew_books", collection_name="brew_books_v2")
+        ]
+
+        with self.assertRaises(ValueError):
+            main(force_recreate=True)
+
+        mock_client.delete_collection.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
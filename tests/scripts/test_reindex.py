@@ -0,0 +1,176 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from qdrant_client.http import models
+
+from brew_oracle.knowledge.beerxml_kb import build_recipe_kb, ingest_recipes
+from brew_oracle.knowledge.recipe_table import recipe_table_path
+from brew_oracle.scripts.reindex import garbage_collect, list_versions, reindex, verify_counts
+from brew_oracle.utils.config import Settings
+from brew_oracle.utils.qdrant import alias_target, close_clients, get_qdrant_client
+
+SAMPLE_RECIPE = os.path.join(
+    os.path.dirname(__file__), "..", "..", "knowledge", "recipes", "test_recipe.xml"
+)
+
+
+class _HashEmbedder:
+    id = "hash"
+    dimensions = 8
+
+    def get_embedding(self, text):
+        digest = hashlib.sha256(text.encode()).digest()
+        return [b / 255 + 0.01 for b in digest[: self.dimensions]]
+
+
+class TestReindex(unittest.TestCase):
+    def setUp(self):
+        close_clients()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.recipes = os.path.join(self.tmp.name, "recipes")
+        os.makedirs(self.recipes)
+        shutil.copy(SAMPLE_RECIPE, self.recipes)
+        self.settings = Settings(
+            VECTOR_BACKEND="memory",
+            BEERXML_PATH=self.recipes,
+            INGEST_STATE_DIR=os.path.join(self.tmp.name, "state"),
+            EMBEDDING_STORE_DIR=None,
+            QDRANT_RECIPE_COLLECTION="recipes",
+            EMBEDDER_DIM=_HashEmbedder.dimensions,
+            COLLECTION_PROFILE=None,
+            REINDEX_KEEP_VERSIONS=1,
+        )
+        self.client = get_qdrant_client(self.settings)
+        patches = [
+            patch("brew_oracle.scripts.reindex.Settings", return_value=self.settings),
+            patch("brew_oracle.knowledge.beerxml_kb.Settings", return_value=self.settings),
+            patch("brew_oracle.knowledge.beerxml_kb.get_embedder", return_value=_HashEmbedder()),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        close_clients()
+        self.tmp.cleanup()
+
+    def _versions(self):
+        return [name for _, name in list_versions(self.client, "recipes")]
+
+    def test_reindex_swaps_alias_and_keeps_previous_version(self):
+        """Test that searches follow the alias and only one old version is kept."""
+        report = reindex("recipes")
+
+        self.assertEqual(
+            (report.collection, report.points, report.previous), ("recipes_v1", 1, None)
+        )
+        self.assertEqual(alias_target(self.client, "recipes"), "recipes_v1")
+        self.assertEqual(build_recipe_kb().get_count(), 1)
+        self.assertTrue(os.path.exists(recipe_table_path(self.settings)))
+
+        reindex("recipes")
+        report = reindex("recipes")
+
+        self.assertEqual(report.previous, "recipes_v2")
+        self.assertEqual(report.deleted, ["recipes_v1"])
+        self.assertEqual(self._versions(), ["recipes_v2", "recipes_v3"])
+        self.assertEqual(alias_target(self.client, "recipes"), "recipes_v3")
+
+    def test_default_bulk_reindex_uploads_through_the_upload_client(self):
+        """Test that the bulk load sends its parallel upload through get_upload_client."""
+        uploader = MagicMock(wraps=self.client)
+        with patch("brew_oracle.knowledge.beerxml_kb.get_upload_client", return_value=uploader):
+            report = reindex("recipes")
+
+        self.assertEqual(report.points, 1)
+        kwargs = uploader.upload_points.call_args.kwargs
+        self.assertEqual(kwargs["collection_name"], "recipes_v1")
+        self.assertEqual(kwargs["parallel"], self.settings.INGEST_UPLOAD_PARALLEL)
+
+    def test_failed_count_check_keeps_the_live_version(self):
+        reindex("recipes")
+        os.remove(os.path.join(self.recipes, "test_recipe.xml"))
+
+        with self.assertRaises(RuntimeError):
+            reindex("recipes")
+
+        self.assertEqual(alias_target(self.client, "recipes"), "recipes_v1")
+        self.assertEqual(build_recipe_kb().get_count(), 1)
+
+        shutil.copy(SAMPLE_RECIPE, self.recipes)
+        report = reindex("recipes")
+
+        # The failed version goes away; the one that was live stays for rollback.
+        self.assertEqual(report.deleted, ["recipes_v2"])
+        self.assertEqual(self._versions(), ["recipes_v1", "recipes_v3"])
+
+    def test_plain_collection_is_only_replaced_on_request(self):
+        self.client.create_collection(
+            "recipes",
+            vectors_config=models.VectorParams(size=8, distance=models.Distance.COSINE),
+        )
+        self.client.upsert("recipes", [models.PointStruct(id=1, vector=[0.1] * 8)])
+
+        with self.assertRaises(ValueError):
+            reindex("recipes")
+        self.assertEqual(self._versions(), [])
+
+        reindex("recipes", replace_collection=True)
+
+        self.assertEqual(alias_target(self.client, "recipes"), "recipes_v1")
+        names = {c.name for c in self.client.get_collections().collections}
+        self.assertEqual(names, {"recipes_v1"})
+
+    def test_incremental_ingest_after_reindex_writes_through_the_alias(self):
+        """Test that a plain ingestion after a swap updates the live version."""
+        reindex("recipes")
+        with open(SAMPLE_RECIPE, encoding="utf-8") as f:
+            xml = f.read().replace("My Test IPA", "Second IPA")
+        with open(os.path.join(self.recipes, "second.xml"), "w", encoding="utf-8") as f:
+            f.write(xml)
+
+        # Like a server: collection_exists is False for an alias.
+        def collection_exists(collection_name):
+            return collection_name in {c.name for c in self.client.get_collections().collections}
+
+        with patch.object(self.client, "collection_exists", side_effect=collection_exists):
+            ingest_recipes()
+
+        names = {c.name for c in self.client.get_collections().collections}
+        self.assertEqual(names, {"recipes_v1"})
+        self.assertEqual(alias_target(self.client, "recipes"), "recipes_v1")
+        self.assertEqual(self.client.count("recipes_v1", exact=True).count, 2)
+
+    def test_garbage_collect_without_alias_deletes_nothing(self):
+        self.client.create_collection(
+            "recipes_v1",
+            vectors_config=models.VectorParams(size=8, distance=models.Distance.COSINE),
+        )
+
+        self.assertEqual(garbage_collect(self.client, "recipes", keep=0), [])
+        self.assertEqual(self._versions(), ["recipes_v1"])
+
+
+class TestVerifyCounts(unittest.TestCase):
+    def _client(self, **counts):
+        client = MagicMock()
+        client.count.side_effect = lambda name, exact: SimpleNamespace(count=counts[name])
+        return client
+
+    def test_counts(self):
+        client = self._client(new=95, live=100)
+
+        self.assertEqual(verify_counts(client, "new", expected=95, previous="live"), 95)
+        with self.assertRaises(RuntimeError):
+            verify_counts(client, "new", expected=96)
+        with self.assertRaises(RuntimeError):
+            verify_counts(client, "new", previous="live", min_ratio=0.99)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from brew_oracle.utils.cache import (
+    Generations,
+    TTLCache,
+    bump_generation,
+    invalidate_collection,
+    normalize_query,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats().evictions, 1)
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after the configured TTL."""
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=5.0, clock=clock)
+        cache.set("a", 1)
+
+        clock.now = 4.0
+        self.assertEqual(cache.get("a"), 1)
+        clock.now = 6.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_hit_miss_counters(self):
+        """Test that hits, misses and hit rate are tracked."""
+        cache = TTLCache(maxsize=10)
+        cache.get("a")
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("a")
+
+        stats = cache.stats()
+        self.assertEqual((stats.hits, stats.misses), (2, 1))
+        self.assertAlmostEqual(stats.hit_rate, 2 / 3)
+
+    def test_zero_maxsize_disables_cache(self):
+        cache = TTLCache(maxsize=0)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_invalidate_collection(self):
+        """Test that only entries of the changed collection are dropped."""
+        scoped = TTLCache(maxsize=10, collection_scoped=True)
+        scoped.set(("brew_books", "ipa", 5, False, ()), ["doc"])
+        scoped.set(("brew_recipes", "ipa", 5, False, ()), ["recipe"])
+
+        removed = invalidate_collection("brew_books")
+
+        self.assertEqual(removed, 1)
+        self.assertIsNone(scoped.get(("brew_books", "ipa", 5, False, ())))
+        self.assertEqual(scoped.get(("brew_recipes", "ipa", 5, False, ())), ["recipe"])
+
+    def test_ingestion_in_another_process_invalidates(self):
+        """Test that a generation bumped by another process drops the collection's entries."""
+        clock = FakeClock()
+        with tempfile.TemporaryDirectory() as state_dir:
+            bump_generation(state_dir, "brew_recipes")
+            scoped = TTLCache(
+                maxsize=10,
+                collection_scoped=True,
+                generations=Generations(state_dir, interval=5, clock=clock),
+            )
+            scoped.set(("brew_books", "ipa"), ["doc"])
+            scoped.set(("brew_recipes", "ipa"), ["recipe"])
+
+            code = (
+                "from brew_oracle.utils.cache import invalidate_collection; "
+                f"invalidate_collection('brew_books', {state_dir!r})"
+            )
+            env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+            subprocess.run([sys.executable, "-c", code], check=True, env=env)
+
+            self.assertEqual(scoped.get(("brew_books", "ipa")), ["doc"])  # not checked yet
+            clock.now = 5
+            self.assertIsNone(scoped.get(("brew_books", "ipa")))
+            self.assertEqual(scoped.get(("brew_recipes", "ipa")), ["recipe"])
+
+    def test_normalize_query(self):
+        self.assertEqual(
+            normalize_query("  Qual a temperatura  de\tmostura para IPA? "),
+            "qual a temperatura de mostura para ipa?",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from brew_oracle.utils.embedding_store import (
+    EmbeddingStore,
+    clear_embedding_stores,
+    get_embedding_store,
+    store_path,
+)
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        clear_embedding_stores()
+        self.tmp.cleanup()
+
+    def test_embeddings_survive_a_reopen(self):
+        """Test that stored vectors are found by text after the store is opened again."""
+        store = EmbeddingStore(self.root, "minilm", 3)
+        self.assertEqual(
+            store.put_many(["ipa", "stout", "ipa"], [[1, 2, 3], [4, 5, 6], [0, 0, 0]]), 2
+        )
+
+        reopened = EmbeddingStore(self.root, "minilm", 3)
+        found = reopened.get_many(["stout", "lager", "ipa"])
+
+        self.assertEqual(found, [[4.0, 5.0, 6.0], None, [1.0, 2.0, 3.0]])
+        self.assertEqual((reopened.hits, reopened.misses), (2, 1))
+        self.assertEqual(len(reopened), 2)
+        self.assertIn("ipa", reopened)
+
+    def test_rows_added_after_reads_are_visible(self):
+        """Test that the memmap is re-opened when the file grows."""
+        store = EmbeddingStore(self.root, "minilm", 2)
+        store.put_many(["a"], [[1, 1]])
+        store.get_many(["a"])
+        store.put_many(["b"], [[2, 2]])
+
+        self.assertEqual(store.get_many(["b", "a"]), [[2.0, 2.0], [1.0, 1.0]])
+
+    def test_partial_write_is_discarded(self):
+        """Test that a vector without its key (interrupted write) is dropped on open."""
+        store = EmbeddingStore(self.root, "minilm", 2)
+        store.put_many(["a"], [[1, 1]])
+        with open(os.path.join(store.path, "vectors.bin"), "ab") as f:
+            f.write(b"\0" * 5)
+
+        with self.assertLogs("brew_oracle.utils.embedding_store", "WARNING"):
+            reopened = EmbeddingStore(self.root, "minilm", 2)
+        reopened.put_many(["b"], [[2, 2]])
+
+        self.assertEqual(reopened.get_many(["a", "b"]), [[1.0, 1.0], [2.0, 2.0]])
+
+    def test_writers_sharing_a_store_see_each_other_rows(self):
+        """Test that a store opened by another process indexes its rows before appending."""
+        first = EmbeddingStore(self.root, "minilm", 2)
+        second = EmbeddingStore(self.root, "minilm", 2)
+        first.put_many(["a"], [[1, 1]])
+
+        self.assertEqual(second.put_many(["a", "b"], [[9, 9], [2, 2]]), 1)
+        self.assertEqual(first.put_many(["c"], [[3, 3]]), 1)
+
+        reopened = EmbeddingStore(self.root, "minilm", 2)
+        self.assertEqual(len(reopened), 3)
+        self.assertEqual(reopened.get_many(["a", "b", "c"]), [[1.0, 1.0], [2.0, 2.0], [3.0, 3.0]])
+        self.assertEqual(second.get_many(["a"]), [[1.0, 1.0]])
+
+    def test_models_and_dtypes_are_kept_apart(self):
+        """Test that each (model id, dtype) gets its own folder and dimensions are checked."""
+        torch_store = get_embedding_store(self.root, "/models/minilm", 2)
+        onnx_store = get_embedding_store(self.root, "/models/minilm#onnx-int8", 2, "float16")
+        torch_store.put_many(["a"], [[0.1, 0.2]])
+
+        self.assertIs(get_embedding_store(self.root, "/models/minilm", 2), torch_store)
+        self.assertEqual(onnx_store.get_many(["a"]), [None])
+        self.assertNotEqual(store_path(self.root, "a/m"), store_path(self.root, "b/m"))
+        onnx_store.put_many(["a"], [[0.1, 0.2]])
+        self.assertAlmostEqual(onnx_store.get_many(["a"])[0][0], 0.1, places=3)
+        with self.assertRaises(ValueError):
+            EmbeddingStore(self.root, "/models/minilm", 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
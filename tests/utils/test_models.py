@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from brew_oracle.utils import models
+
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        models.clear_models()
+
+    def tearDown(self):
+        models.clear_models()
+
+    @patch("sentence_transformers.SentenceTransformer")
+    def test_embedder_is_shared(self, mock_st):
+        """Test that the embedding model is loaded once and shared by every caller."""
+        first = models.get_embedder("fake_model", 384)
+        second = models.get_embedder("fake_model", 384)
+
+        self.assertIs(first, second)
+        mock_st.assert_called_once_with("fake_model")
+        self.assertIs(first.sentence_transformer_client, mock_st.return_value)
+
+    @patch("sentence_transformers.SentenceTransformer")
+    def test_onnx_backend_loads_the_exported_file(self, mock_st):
+        """Test that each backend is a separate model loaded from its ONNX file."""
+        mock_st.side_effect = lambda *args, **kwargs: MagicMock()
+
+        torch_embedder = models.get_embedder("fake_model", 384)
+        int8_embedder = models.get_embedder("fake_model", 384, "onnx-int8")
+
+        self.assertIsNot(torch_embedder, int8_embedder)
+        self.assertEqual(int8_embedder.id, "fake_model#onnx-int8")
+        mock_st.assert_called_with(
+            "fake_model", backend="onnx", model_kwargs={"file_name": "onnx/model_qint8.onnx"}
+        )
+        with self.assertRaises(ValueError):
+            models.get_embedder("fake_model", 384, "tensorrt")
+
+    @patch("sentence_transformers.CrossEncoder")
+    def test_cross_encoder_is_keyed_by_kwargs(self, mock_cross_encoder):
+        """Test that cross-encoders are cached per model id and kwargs."""
+        mock_cross_encoder.side_effect = lambda *args, **kwargs: MagicMock()
+
+        a = models.get_cross_encoder("ce", max_length=256)
+        b = models.get_cross_encoder("ce", max_length=256)
+        c = models.get_cross_encoder("ce", max_length=512)
+
+        self.assertIs(a, b)
+        self.assertIsNot(a, c)
+        self.assertEqual(mock_cross_encoder.call_count, 2)
+
+    @patch("sentence_transformers.SentenceTransformer")
+    def test_model_stats_report_load_time_and_memory(self, mock_st):
+        """Test that load time and weight memory are recorded per model."""
+        tensor = MagicMock()
+        tensor.numel.return_value = 1000
+        tensor.element_size.return_value = 4
+        mock_st.return_value.parameters.return_value = [tensor]
+        mock_st.return_value.buffers.return_value = []
+
+        models.get_embedder("fake_model", 384)
+        stats = models.model_stats()
+
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0].kind, "sentence_transformer")
+        self.assertEqual(stats[0].model_id, "fake_model")
+        self.assertEqual(stats[0].memory_bytes, 4000)
+        self.assertGreaterEqual(stats[0].load_seconds, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import pickle
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import httpx
+from qdrant_client.http import models
+
+from brew_oracle.utils import qdrant
+
+
+def _settings(**overrides):
+    values = {
+        "VECTOR_BACKEND": "server",
+        "QDRANT_LOCAL_PATH": ".brew_oracle/qdrant",
+        "QDRANT_URL": "http://localhost:6333",
+        "QDRANT_API_KEY": None,
+        "QDRANT_PREFER_GRPC": False,
+        "QDRANT_GRPC_PORT": 6334,
+        "QDRANT_TIMEOUT": 10,
+        "QDRANT_RETRIES": 3,
+        "QDRANT_POOL_SIZE": 16,
+        "QDRANT_KEEPALIVE_SECONDS": 30.0,
+    }
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class TestQdrantClients(unittest.TestCase):
+    def setUp(self):
+        qdrant.close_clients()
+
+    def tearDown(self):
+        qdrant.close_clients()
+
+    def test_client_kwargs_keep_connections_alive_and_retry(self):
+        kwargs = qdrant.client_kwargs(_settings())
+
+        self.assertEqual(kwargs["url"], "http://localhost:6333")
+        self.assertIsInstance(kwargs["transport"], httpx.HTTPTransport)
+        pool = kwargs["transport"]._pool
+        self.assertEqual(pool._max_keepalive_connections, 16)
+        self.assertEqual(pool._keepalive_expiry, 30.0)
+        self.assertEqual(pool._retries, 3)
+        self.assertEqual(kwargs["grpc_options"]["grpc.enable_retries"], 1)
+
+        async_kwargs = qdrant.client_kwargs(_settings(), asynchronous=True)
+        self.assertIsInstance(async_kwargs["transport"], httpx.AsyncHTTPTransport)
+
+    def test_upload_client_arguments_can_be_pickled(self):
+        """Test that upload_points(parallel > 1) can send the REST arguments to its workers."""
+        from qdrant_client import QdrantClient
+
+        kwargs = qdrant.client_kwargs(_settings(), picklable=True)
+        client = QdrantClient(**kwargs, check_compatibility=False)
+
+        self.assertNotIn("transport", kwargs)
+        self.assertEqual(kwargs["limits"].max_keepalive_connections, 16)
+        pickle.dumps(kwargs)
+        pickle.dumps(client._client._rest_args)
+
+    @patch("qdrant_client.QdrantClient")
+    def test_upload_client_is_separate_on_a_server_only(self, mock_client):
+        mock_client.side_effect = lambda **kwargs: MagicMock()
+
+        self.assertIsNot(
+            qdrant.get_upload_client(_settings()), qdrant.get_qdrant_client(_settings())
+        )
+        self.assertNotIn("transport", mock_client.call_args_list[0].kwargs)
+        embedded = _settings(VECTOR_BACKEND="memory")
+        self.assertIs(qdrant.get_upload_client(embedded), qdrant.get_qdrant_client(embedded))
+
+    @patch("qdrant_client.QdrantClient")
+    def test_client_is_shared_per_connection_settings(self, mock_client):
+        """Test that callers with the same settings get one client, and others a new one."""
+        mock_client.side_effect = lambda **kwargs: MagicMock()
+
+        a = qdrant.get_qdrant_client(_settings())
+        b = qdrant.get_qdrant_client(_settings())
+        c = qdrant.get_qdrant_client(_settings(QDRANT_PREFER_GRPC=True))
+
+        self.assertIs(a, b)
+        self.assertIsNot(a, c)
+        self.assertEqual(mock_client.call_count, 2)
+
+    @patch("qdrant_client.AsyncQdrantClient")
+    @patch("qdrant_client.QdrantClient")
+    def test_use_shared_clients_and_close(self, mock_client, mock_async_client):
+        db = MagicMock()
+
+        result = qdrant.use_shared_clients(db, _settings())
+
+        self.assertIs(result, db)
+        self.assertIs(db._client, mock_client.return_value)
+        self.assertIs(db._async_client, mock_async_client.return_value)
+
+        qdrant.close_clients()
+
+        mock_client.return_value.close.assert_called_once()
+        qdrant.get_qdrant_client(_settings())
+        self.assertEqual(mock_client.call_count, 2)
+
+
+class TestEmbeddedBackend(unittest.TestCase):
+    def setUp(self):
+        qdrant.close_clients()
+
+    def tearDown(self):
+        qdrant.close_clients()
+
+    def test_memory_backend_is_one_shared_store(self):
+        """Test that every caller of the process sees the same in-memory store."""
+        s = _settings(VECTOR_BACKEND="memory")
+        db = SimpleNamespace(_client=None, _async_client=None)
+
+        qdrant.use_shared_clients(db, s)
+        qdrant.get_qdrant_client(s).create_collection(
+            "books", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE)
+        )
+
+        self.assertEqual(qdrant.client_kwargs(s), {"location": ":memory:"})
+        self.assertTrue(db._client.collection_exists("books"))
+        self.assertIsNone(db._async_client)
+        self.assertEqual(qdrant.backend_location(s), ":memory:")
+        with self.assertRaises(ValueError):
+            qdrant.get_async_qdrant_client(s)
+
+    def test_local_backend_persists_between_clients(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            s = _settings(VECTOR_BACKEND="local", QDRANT_LOCAL_PATH=os.path.join(tmp, "qdrant"))
+            qdrant.get_qdrant_client(s).create_collection(
+                "books",
+                vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE),
+            )
+            qdrant.close_clients()
+
+            self.assertTrue(qdrant.get_qdrant_client(s).collection_exists("books"))
+            qdrant.close_clients()
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            qdrant.get_qdrant_client(_settings(VECTOR_BACKEND="faiss"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import tempfile
+import unittest
+
+from brew_oracle.utils.cache import Generations, bump_generation, invalidate_collection
+from brew_oracle.utils.semantic_cache import SemanticAnswerCache, numeric_tokens
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSemanticAnswerCache(unittest.TestCase):
+    def test_similar_question_hits_and_distant_one_misses(self):
+        """Test that the cosine threshold decides between a hit and a miss."""
+        cache = SemanticAnswerCache(maxsize=10, threshold=0.9)
+        cache.set([1.0, 0.0, 0.0], "Qual o IBU de uma IPA?", "40-70", ["ref"], ("books",))
+
+        hit = cache.get([0.95, 0.1, 0.0])
+        miss = cache.get([0.5, 0.5, 0.5])
+
+        self.assertEqual(hit.answer, "40-70")
+        self.assertEqual(hit.references, ["ref"])
+        self.assertGreater(hit.similarity, 0.9)
+        self.assertIsNone(miss)
+        stats = cache.stats()
+        self.assertEqual((stats.hits, stats.misses, stats.size), (1, 1, 1))
+        self.assertAlmostEqual(stats.hit_rate, 0.5)
+
+    def test_least_recently_used_answer_is_replaced(self):
+        cache = SemanticAnswerCache(maxsize=2, threshold=0.99)
+        cache.set([1.0, 0.0], "a", "A")
+        cache.set([0.0, 1.0], "b", "B")
+        cache.get([1.0, 0.0])
+        cache.set([-1.0, 0.0], "c", "C")
+
+        self.assertEqual(cache.get([1.0, 0.0]).answer, "A")
+        self.assertIsNone(cache.get([0.0, 1.0]))
+        self.assertEqual(cache.get([-1.0, 0.0]).answer, "C")
+        self.assertEqual(cache.stats().evictions, 1)
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = SemanticAnswerCache(maxsize=2, ttl=10.0, clock=clock)
+        cache.set([1.0, 0.0], "a", "A")
+
+        clock.now = 11.0
+
+        self.assertIsNone(cache.get([1.0, 0.0]))
+        self.assertEqual(len(cache), 0)
+
+    def test_reingesting_a_source_collection_drops_its_answers(self):
+        """Test that invalidate_collection reaches the answers built from that collection."""
+        cache = SemanticAnswerCache(maxsize=10)
+        cache.set([1.0, 0.0], "a", "A", sources=("semantic_books", "semantic_recipes"))
+        cache.set([0.0, 1.0], "b", "B", sources=("semantic_other",))
+
+        removed = invalidate_collection("semantic_recipes")
+
+        self.assertEqual(removed, 1)
+        self.assertIsNone(cache.get([1.0, 0.0]))
+        self.assertEqual(cache.get([0.0, 1.0]).answer, "B")
+
+    def test_reingest_in_another_process_drops_its_answers(self):
+        """Test that a generation bumped by an ingestion elsewhere drops the answers."""
+        with tempfile.TemporaryDirectory() as state_dir:
+            cache = SemanticAnswerCache(maxsize=10, generations=Generations(state_dir, 0))
+            cache.set([1.0, 0.0], "a", "A", sources=("semantic_books",))
+
+            bump_generation(state_dir, "semantic_books")
+
+            self.assertIsNone(cache.get([1.0, 0.0]))
+
+    def test_questions_differing_in_a_number_miss(self):
+        """Test that near-identical embeddings with other numbers are not served."""
+        cache = SemanticAnswerCache(maxsize=10, threshold=0.95)
+        cache.set([1.0, 0.0], "Receita de IPA com 60 IBU para 20 L", "A")
+
+        for question in ("Receita de IPA com 70 IBU para 20 L", "Receita de IPA com 60 IBU"):
+            self.assertIsNone(cache.get([0.99, 0.01], question))
+        hit = cache.get([0.99, 0.01], "receita de uma IPA para 20 L com 60 IBU")
+        self.assertEqual(hit.answer, "A")
+        self.assertEqual(numeric_tokens("OG 1,050 e 5 %"), ("1.050", "5"))
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = SemanticAnswerCache(maxsize=0)
+        cache.set([1.0], "a", "A")
+
+        self.assertIsNone(cache.get([1.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
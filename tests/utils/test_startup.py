@@ -0,0 +1,52 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from brew_oracle.utils.models import ModelStats
+from brew_oracle.utils.startup import BackgroundLoader, StartupProfile
+
+
+class TestBackgroundLoader(unittest.TestCase):
+    def test_result_waits_for_the_factory(self):
+        release = threading.Event()
+        loader = BackgroundLoader(lambda: release.wait(5) and "ready")
+
+        self.assertFalse(loader.ready())
+        release.set()
+
+        self.assertEqual(loader.result(timeout=5), "ready")
+        self.assertTrue(loader.ready())
+
+    def test_result_reraises_factory_errors(self):
+        def factory():
+            raise RuntimeError("boom")
+
+        loader = BackgroundLoader(factory)
+
+        with self.assertRaises(RuntimeError):
+            loader.result(timeout=5)
+
+
+class TestStartupProfile(unittest.TestCase):
+    @patch("brew_oracle.utils.startup.model_stats")
+    def test_report_lists_imports_and_models(self, mock_model_stats):
+        mock_model_stats.return_value = [
+            ModelStats("sentence_transformer", "mini", load_seconds=1.5, memory_bytes=2 * 1024**2)
+        ]
+        profile = StartupProfile()
+        profile.import_module("json")
+        with profile.step("build"):
+            pass
+        profile.mark_prompt()
+
+        report = profile.report()
+
+        self.assertIn("prompt exibido", report)
+        self.assertIn("import json", report)
+        self.assertIn("build", report)
+        self.assertIn("sentence_transformer mini", report)
+        self.assertIn("2.0 MB", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from brew_oracle.utils.tracing import (
+    JsonlSink,
+    Tracer,
+    configure_tracing,
+    count_tokens,
+    disable_tracing,
+    format_trace,
+    get_tracer,
+    load_spans,
+    record_generation,
+    span,
+    stage_summary,
+)
+
+
+class TestTracer(unittest.TestCase):
+    def tearDown(self):
+        disable_tracing()
+
+    def test_spans_nest_and_trace_is_emitted_once(self):
+        """Test that child spans share the trace and the sink gets the whole trace at the end."""
+        traces = []
+        tracer = Tracer([traces.append])
+
+        with tracer.span("ask") as root:
+            with tracer.span("retrieval", tokens=3) as child:
+                child.set(docs=8)
+            self.assertEqual(traces, [])
+
+        self.assertEqual(len(traces), 1)
+        spans = {s.name: s for s in traces[0]}
+        self.assertEqual(spans["retrieval"].parent_id, root.span_id)
+        self.assertEqual(spans["retrieval"].trace_id, root.trace_id)
+        self.assertEqual(spans["retrieval"].attributes, {"tokens": 3, "docs": 8})
+        self.assertIsNone(spans["ask"].parent_id)
+        self.assertGreaterEqual(spans["ask"].seconds, spans["retrieval"].seconds)
+
+    def test_disabled_tracer_records_nothing(self):
+        """Test that the default tracer is off and yields a span that ignores attributes."""
+        self.assertFalse(get_tracer().enabled)
+        with span("ask") as s:
+            s.set(docs=1)
+        record_generation({"time": [1.0]})
+
+    def test_errors_are_recorded_and_reraised(self):
+        """Test that a failing stage keeps its span with the exception type."""
+        traces = []
+        tracer = Tracer([traces.append])
+
+        with self.assertRaises(KeyError), tracer.span("search"):
+            raise KeyError("x")
+
+        self.assertEqual(traces[0][0].attributes["error"], "KeyError")
+
+    def test_thread_pool_work_joins_the_trace(self):
+        """Test that spans opened in a copied context attach to the caller's span."""
+        traces = []
+        tracer = Tracer([traces.append])
+
+        def work():
+            with tracer.span("qdrant_query"):
+                pass
+
+        with ThreadPoolExecutor(2) as executor, tracer.span("retrieval") as root:
+            for future in [executor.submit(copy_context().run, work) for _ in range(2)]:
+                future.result()
+
+        children = [s for s in traces[0] if s.name == "qdrant_query"]
+        self.assertEqual(len(children), 2)
+        self.assertTrue(all(s.parent_id == root.span_id for s in children))
+
+    def test_record_generation_sums_agno_metrics(self):
+        """Test that the per-call model metrics of a run become one generation span."""
+        traces = []
+        configure_tracing(sinks=[traces.append])
+
+        with span("ask"):
+            record_generation(
+                {
+                    "time": [0.5, 1.0],
+                    "input_tokens": [100, 250],
+                    "output_tokens": [10, 40],
+                    "time_to_first_token": [0.2],
+                }
+            )
+
+        generation = next(s for s in traces[0] if s.name == "generation")
+        self.assertAlmostEqual(generation.seconds, 1.5)
+        self.assertEqual(
+            generation.attributes,
+            {"calls": 2, "input_tokens": 350, "output_tokens": 50, "time_to_first_token": 0.2},
+        )
+
+    def test_jsonl_sink_round_trip_and_summary(self):
+        """Test that the JSONL sink writes one line per span that aggregates offline."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "traces", "t.jsonl")
+            tracer = Tracer([JsonlSink(path)])
+            for docs in (4, 6):
+                with tracer.span("ask"), tracer.span("retrieval", docs=docs):
+                    pass
+
+            with open(path, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f]
+            spans = load_spans(path)
+
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(len({line["trace_id"] for line in lines}), 2)
+        summary = stage_summary(spans)
+        self.assertEqual(summary["retrieval"]["count"], 2)
+        self.assertEqual(summary["retrieval"]["mean_docs"], 5)
+        self.assertIn("p95_ms", summary["ask"])
+        self.assertIn("  retrieval", format_trace(spans[:2]))
+
+    def test_count_tokens(self):
+        self.assertEqual(count_tokens("Qual o IBU da IPA?"), 6)
+        self.assertEqual(count_tokens(""), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()